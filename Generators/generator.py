@@ -9,6 +9,10 @@ class Generator(ScreenArt):
     The base class for all image generators. 
     Inherits config, paths, and logging from ScreenArt.
     """
+    # "cpu" generators render locally and run on a process pool; "io"
+    # generators mostly wait on the network or disk and run on a thread pool.
+    WORKLOAD: str = "cpu"
+
     def __init__(self, out_dir: str):
         # Initializes the ScreenArt superclass
         super().__init__()
@@ -25,6 +25,8 @@ PRODUCTS = {
 MAX_WORKERS = 6  # max is len(PRODUCTS)
 
 class GoesGenerator(DrawGenerator):
+    WORKLOAD = "io"
+
     def __init__(self, out_dir: str):
         super().__init__(out_dir)
 
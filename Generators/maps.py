@@ -54,6 +54,8 @@ LAYERS = {
 MAX_TILE_WORKERS = 9  # grid_size² = 3×3
 
 class NasaMapGenerator(DrawGenerator):
+    WORKLOAD = "io"
+
     def __init__(self, out_dir: str):
         super().__init__(out_dir)
 
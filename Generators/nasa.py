@@ -27,6 +27,7 @@ class Nasa(Source):
         self.session.mount("https://", adapter)
         socket.getaddrinfo("apod.nasa.gov", 443)  # warm DNS cache
 
+    WORKLOAD = "io"
     MIN_YEAR = 2002
     INPUT_SOURCE = "nasa"
     MAX_WORKERS = 5
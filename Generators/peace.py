@@ -793,8 +793,10 @@ class Peace(DrawGenerator):
     def _subtle_texture(self, img: Image.Image, theme: dict) -> Image.Image:
         """Add very faint noise to background to avoid flat look."""
         import numpy as np
+        from ..Transformers.RasterTransformers.noiseBank import NOISE
         arr = np.array(img, dtype=np.float32)
-        noise = np.random.normal(0, 4, arr.shape).astype(np.float32)
+        # std-4 white noise from the shared noise bank, at offsets drawn from this generator's stream
+        noise = NOISE.gaussian(np.random.default_rng(random.getrandbits(64)), arr.shape) * np.float32(4)
         arr = np.clip(arr + noise, 0, 255).astype(np.uint8)
         return Image.fromarray(arr)
 
@@ -10,6 +10,8 @@ class StaticGenerator(DrawGenerator):
     Base class for generators that copy pre-saved images from a
     static source directory into an output directory.
     """
+    WORKLOAD = "io"  # file copies only
+
     def __init__(self, out_dir: str):
         super().__init__(out_dir)
 
@@ -15,6 +15,8 @@ from .drawGenerator import DrawGenerator
 MAX_WORKERS = 10
 
 class Wiki(DrawGenerator):
+    WORKLOAD = "io"
+
     def __init__(self, out_dir: str):
         super().__init__(out_dir)
 
@@ -1,28 +1,48 @@
-from .anamorphicTransformer import AnamorphicTransformer
-from .chromaticAberrationTransformer import ChromaticAberrationTransformer
-from .colormapTransformer import ColormapTransformer
-from .dataMoshTransformer import DataMoshTransformer
-from .duotoneTransformer import DuotoneTransformer
-from .fisheyeTransformer import FisheyeTransformer
-from .flipWilsonTransformer import FlipWilsonTransformer
-from .fluidWarpTransformer import FluidWarpTransformer
-from .fractalWarpTransformer import FractalWarpTransformer
-from .glitchWarpTransformer import GlitchWarpTransformer
-from .halftoneTransformer import HalftoneTransformer
-from .invertRGBTransformer import InvertRGBTransformer
-from .kaleidoscopeTransformer import KaleidoscopeTransformer
-from .meltMorphTransformer import MeltMorphTransformer
-from .nullTransformer import NullTransformer
-from .oilPaintingTransformer import OilPaintingTransformer
-from .pixelSortTransformer import PixelSortTransformer
-from .posterizationTransformer import PosterizationTransformer
-from .radialWarpTransformer import RadialWarpTransformer
-from .stippleTransformer import StippleTransformer
-from .swirlWarpTransformer import SwirlWarpTransformer
-from .thermalImagingTransformer import ThermalImagingTransformer
-from .threeDExtrusionTransformer import ThreeDExtrusionTransformer
-from .tritoneTransformer import TritoneTransformer
-from .voronoiTransformer import VoronoiTransformer
-from .watercolorTransformer import WatercolorTransformer
-from .wheelTransformer import WheelTransformer
-from .xrayTransformer import XrayTransformer
+import importlib
+
+# Submodules are imported on first attribute access (PEP 562), so importing
+# one transformer no longer pulls in every other transformer's dependencies.
+_LAZY_MODULES = {
+    "AnamorphicTransformer": ".anamorphicTransformer",
+    "ChromaticAberrationTransformer": ".chromaticAberrationTransformer",
+    "ColormapTransformer": ".colormapTransformer",
+    "DataMoshTransformer": ".dataMoshTransformer",
+    "DuotoneTransformer": ".duotoneTransformer",
+    "FisheyeTransformer": ".fisheyeTransformer",
+    "FlipWilsonTransformer": ".flipWilsonTransformer",
+    "FluidWarpTransformer": ".fluidWarpTransformer",
+    "FractalWarpTransformer": ".fractalWarpTransformer",
+    "GlitchWarpTransformer": ".glitchWarpTransformer",
+    "HalftoneTransformer": ".halftoneTransformer",
+    "InvertRGBTransformer": ".invertRGBTransformer",
+    "KaleidoscopeTransformer": ".kaleidoscopeTransformer",
+    "MeltMorphTransformer": ".meltMorphTransformer",
+    "NullTransformer": ".nullTransformer",
+    "OilPaintingTransformer": ".oilPaintingTransformer",
+    "PixelSortTransformer": ".pixelSortTransformer",
+    "PosterizationTransformer": ".posterizationTransformer",
+    "RadialWarpTransformer": ".radialWarpTransformer",
+    "StippleTransformer": ".stippleTransformer",
+    "SwirlWarpTransformer": ".swirlWarpTransformer",
+    "ThermalImagingTransformer": ".thermalImagingTransformer",
+    "ThreeDExtrusionTransformer": ".threeDExtrusionTransformer",
+    "TritoneTransformer": ".tritoneTransformer",
+    "VoronoiTransformer": ".voronoiTransformer",
+    "WatercolorTransformer": ".watercolorTransformer",
+    "WheelTransformer": ".wheelTransformer",
+    "XrayTransformer": ".xrayTransformer",
+}
+
+__all__ = list(_LAZY_MODULES)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_MODULES:
+        value = getattr(importlib.import_module(_LAZY_MODULES[name], __name__), name)
+        globals()[name] = value  # cache so __getattr__ is not hit again
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES))
@@ -1,8 +1,8 @@
 import numpy as np
 import cv2
-import random
 
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .imageContext import CONTEXTS
 
 DEFAULT_COUNT = 1
 DEFAULT_BRIGHTNESS_THRESHOLD = 80  # was 95 — too restrictive, only top 5% generated streaks
@@ -14,6 +14,8 @@ class AnamorphicTransformer(RasterTransformer):
     """
     Applies an anamorphic lens flare effect using vectorized row accumulation.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
@@ -24,18 +26,14 @@ class AnamorphicTransformer(RasterTransformer):
             return tuple(int(hex_str[i:i+2], 16) for i in (0, 2, 4))
         return (255, 255, 255) 
 
-    def get_random_rgb(self) -> tuple:
+    def get_random_rgb(self, rng: np.random.Generator) -> tuple:
         """Helper to generate random RGB tuples natively."""
-        return (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+        return tuple(int(v) for v in rng.integers(0, 256, size=3))
 
-    # FIX: Adopt the new standard run() contract
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
-        
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         # Access the config directly from the inherited ecosystem
         t_config = self.config.get("anamorphictransformer", {})
 
-        height, width = img_np.shape[:2]
-
         # --- Parameter Setup ---
         count = t_config.get("count", DEFAULT_COUNT)
         
@@ -53,16 +51,12 @@ class AnamorphicTransformer(RasterTransformer):
         intensity_input = t_config.get("streak_intensity", DEFAULT_STREAK_INTENSITY)
         intensities = to_list(intensity_input, count, DEFAULT_STREAK_INTENSITY)
 
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["thresh"] = thresh_input
-        self.metadata_dictionary["intensity"] = intensity_input
-
         # Colors
         colors = t_config.get("streak_colors", None)
         final_colors = []
         
         if colors is None:
-            final_colors = [self.get_random_rgb() for _ in range(count)]
+            final_colors = [self.get_random_rgb(rng) for _ in range(count)]
         else:
             for c in colors:
                 if isinstance(c, str):
@@ -72,27 +66,37 @@ class AnamorphicTransformer(RasterTransformer):
             
             # Pad if the config provided too few colors
             while len(final_colors) < count:
-                final_colors.append(self.get_random_rgb())
+                final_colors.append(self.get_random_rgb(rng))
             final_colors = final_colors[:count]
-        
+
+        as_tuple = lambda v: tuple(v) if isinstance(v, list) else v
+        return TransformParams(thresh=as_tuple(thresh_input), intensity=as_tuple(intensity_input), count=count,
+                               thresholds=tuple(thresholds), intensities=tuple(intensities),
+                               colors=tuple(tuple(c) for c in final_colors))
+
+    def describe(self, params: TransformParams) -> dict:
+        return {"thresh": params.thresh, "intensity": params.intensity}
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        height, width = img_np.shape[:2]
+        count, thresholds, intensities, final_colors = (
+            params.count, params.thresholds, params.intensities, params.colors)
+
         # --- Optimized Processing ---
         img_np = self.to_uint8(img_np)
-        if img_np.ndim == 3:
-            gray_f32 = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY).astype(np.float32)
-        else:
-            gray_f32 = img_np.astype(np.float32)
+        context = CONTEXTS.of(img_np)
+        gray_f32 = context.gray(cv2.COLOR_RGB2GRAY).astype(np.float32)
 
         row_accumulator = np.zeros((height, 3), dtype=np.float32)
 
-        # Precompute once for use in percentile calculation
         n_pixels = gray_f32.size
-        flat_gray = gray_f32.ravel()
 
         for i in range(count):
             try:
-                # np.partition is ~9x faster than np.percentile for threshold lookup
+                # k-th smallest gray level, read off the context's histogram
                 k = min(int(thresholds[i] / 100.0 * n_pixels), n_pixels - 1)
-                thresh_val = np.partition(flat_gray, k)[k]
+                thresh_val = context.kth_smallest(k, cv2.COLOR_RGB2GRAY)
                 mask = gray_f32 > thresh_val
                 
                 num_bright = np.count_nonzero(mask)
@@ -119,4 +123,4 @@ class AnamorphicTransformer(RasterTransformer):
         streak_overlay = np.clip(row_accumulator[:, np.newaxis, :], 0, 255).astype(np.uint8)
         output_np = cv2.add(img_np, np.broadcast_to(streak_overlay, img_np.shape).copy())
 
-        return self.to_float32(output_np)
+        return output_np
@@ -1,7 +1,7 @@
 import numpy as np
 import cv2
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES
 
 
 class ChromaticAberrationTransformer(RasterTransformer):
@@ -12,47 +12,50 @@ class ChromaticAberrationTransformer(RasterTransformer):
     well on space images, bubbles, and high-contrast subjects.
     """
 
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("chromaticaberrationtransformer", {})
 
         # Shift magnitude in pixels (float → subpixel via remap)
         shift = t_config.get("shift")
         if not isinstance(shift, (int, float)):
-            shift = random.uniform(4.0, 18.0)
-        shift = float(shift)
+            shift = rng.uniform(4.0, 18.0)
 
         # Angle of the shift axis in degrees (0=horizontal, 90=vertical)
         angle = t_config.get("angle")
         if not isinstance(angle, (int, float)):
-            angle = random.uniform(0.0, 360.0)
-        angle_rad = float(angle) * np.pi / 180.0
+            angle = rng.uniform(0.0, 360.0)
 
         # Edge fade: blend aberration to zero toward image centre so it looks lens-like
         edge_fade = t_config.get("edge_fade", True)
         if isinstance(edge_fade, str):
             edge_fade = True
 
-        self.metadata_dictionary["shift"] = round(shift, 1)
-        self.metadata_dictionary["angle"] = round(float(angle), 1)
-        self.metadata_dictionary["edge_fade"] = int(edge_fade)
+        return TransformParams(shift=float(shift), angle=float(angle), edge_fade=int(edge_fade))
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        angle_rad = params.angle * np.pi / 180.0
+        edge_fade = params.edge_fade
 
         img = self.to_uint8(img_np)   # uint8 BGR
         h, w = img.shape[:2]
 
-        dx = shift * np.cos(angle_rad)
-        dy = shift * np.sin(angle_rad)
+        shift_px = self.scale_px(params.shift, scale, minimum=0.0)
+        dx = shift_px * np.cos(angle_rad)
+        dy = shift_px * np.sin(angle_rad)
 
         # Build remap grids for R (+shift) and B (-shift), G stays put
-        base_x, base_y = np.meshgrid(np.arange(w, dtype=np.float32),
-                                     np.arange(h, dtype=np.float32))
+        base_x, base_y = COORDINATES.grid(h, w)
 
         if edge_fade:
             # Radial weight: 0 at centre, 1 at corners
             cx, cy = w / 2.0, h / 2.0
-            dist = np.sqrt(((base_x - cx) / cx) ** 2 + ((base_y - cy) / cy) ** 2)
+            dist, _ = COORDINATES.polar(h, w, cx, cy, cx, cy)
             weight = np.clip(dist, 0.0, 1.0).astype(np.float32)
         else:
             weight = np.ones((h, w), dtype=np.float32)
@@ -70,4 +73,4 @@ class ChromaticAberrationTransformer(RasterTransformer):
                               borderMode=cv2.BORDER_REFLECT_101)
 
         out = cv2.merge([b_shifted, g, r_shifted])
-        return self.to_float32(out)
+        return out
@@ -0,0 +1,171 @@
+import cv2
+import numpy as np
+
+from .imageContext import CONTEXTS, ImageContext, gray_histogram
+
+# Gray-driven transformers read intensity as COLOR_RGB2GRAY of the pipeline's BGR array
+GRAY_CODE = cv2.COLOR_RGB2GRAY
+
+_IDENTITY = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+
+
+def to_gray(img_np: np.ndarray) -> np.ndarray:
+    """The uint8 intensity image gray-driven LUTs are indexed by."""
+    if img_np.ndim == 2:
+        return img_np
+    if img_np.shape[2] == 1:
+        return img_np[:, :, 0]
+    return cv2.cvtColor(img_np, GRAY_CODE)
+
+
+def equalize_from_histogram(hist: np.ndarray) -> np.ndarray:
+    """The 256-entry table cv2.equalizeHist would apply to an image with this histogram."""
+    lut = np.zeros(256, dtype=np.uint8)
+    nonzero = np.flatnonzero(hist)
+    if len(nonzero) == 0:
+        return lut
+    first = nonzero[0]
+    total = hist.sum()
+    if hist[first] == total:
+        lut[:] = first
+        return lut
+    scale = np.float32(255.0 / (total - hist[first]))
+    lut[first + 1:] = np.clip(np.rint(np.cumsum(hist[first + 1:]).astype(np.float32) * scale), 0, 255)
+    return lut
+
+
+def _widen(table: np.ndarray) -> np.ndarray:
+    table = np.asarray(table, dtype=np.uint8)
+    return np.ascontiguousarray(np.repeat(table[:, None], 3, axis=1) if table.ndim == 1 else table)
+
+
+def _table_gray(table: np.ndarray, code: int = GRAY_CODE) -> np.ndarray:
+    """cv2.cvtColor(colour, code) of each of the 256 BGR colours in a table (to_gray() by default)."""
+    return cv2.cvtColor(table.reshape(256, 1, 3), code).ravel()
+
+
+class ColorLUT:
+    """
+    A per-pixel colour mapping: a (256, 3) uint8 table looked up on each
+    channel, optionally followed by a (256, 3) uint8 BGR colour for each
+    to_gray() intensity of the result. Per-channel and gray-driven maps are
+    closed under then(), so any run of them composes exactly into at most
+    two cv2.LUT passes.
+    """
+    def __init__(self, channels: np.ndarray | None = None, gray: np.ndarray | None = None):
+        self.channels = _IDENTITY if channels is None else _widen(channels)
+        self.gray = None if gray is None else _widen(gray)
+
+    @classmethod
+    def from_channels(cls, table: np.ndarray) -> "ColorLUT":
+        """(256, 3) per-channel tables, or (256,) shared by all three."""
+        return cls(channels=table)
+
+    @classmethod
+    def from_gray(cls, table: np.ndarray) -> "ColorLUT":
+        """(256, 3) BGR colours, or (256,) levels, indexed by intensity."""
+        return cls(gray=table)
+
+    @property
+    def maps_channels(self) -> bool:
+        return self.channels is not _IDENTITY and not np.array_equal(self.channels, _IDENTITY)
+
+    @property
+    def is_identity(self) -> bool:
+        return self.gray is None and not self.maps_channels
+
+    def then(self, other: "ColorLUT") -> "ColorLUT":
+        """The mapping that applies self, then other."""
+        if self.gray is None:
+            channels = other.channels[self.channels, np.arange(3)] if other.maps_channels else self.channels
+            return ColorLUT(channels, other.gray)
+        # every output colour is a row of self.gray: map the rows instead of the pixels
+        gray = other.channels[self.gray, np.arange(3)]
+        if other.gray is not None:
+            gray = other.gray[_table_gray(gray)]
+        return ColorLUT(self.channels, gray)
+
+    def apply(self, img_np: np.ndarray, gray: np.ndarray | None = None) -> np.ndarray:
+        """
+        Map a uint8 BGR image. `gray` may pass in an already computed
+        to_gray() of the channel-mapped image.
+        """
+        if img_np.ndim == 2 or img_np.shape[2] == 1:
+            img_np = cv2.cvtColor(img_np, cv2.COLOR_GRAY2BGR)
+        if self.gray is None:
+            return cv2.LUT(img_np, self.channels[:, None, :]) if self.maps_channels else img_np
+        if gray is None:
+            gray = to_gray(cv2.LUT(img_np, self.channels[:, None, :]) if self.maps_channels else img_np)
+        return cv2.LUT(cv2.merge([gray, gray, gray]), self.gray[:, None, :])
+
+
+class LutChain:
+    """
+    Point operations composed over one image: append() each stage's
+    ColorLUT, then apply() the composed table once. Stages that fold
+    per-image statistics into their table (equalisation, percentile
+    stretch) read the gray histogram of the image as they will see it,
+    with every earlier stage applied, from gray_histogram(). hand_on()
+    passes the gray planes and histograms of a gray-driven result on to
+    its context.
+    """
+    def __init__(self, img_np: np.ndarray):
+        self.img = img_np
+        self.lut = ColorLUT()
+        self.stages = 0
+        # to_gray() of the source through channel table _gray_of, and its histogram
+        self._gray_of: np.ndarray | None = None
+        self._gray: np.ndarray | None = None
+        self._histogram: np.ndarray | None = None
+
+    def _mapped_gray(self) -> np.ndarray:
+        """Gray image of the source through the current channel table."""
+        if self._gray_of is not self.lut.channels:
+            if self.lut.maps_channels:
+                self._gray = to_gray(ColorLUT(self.lut.channels).apply(self.img))
+            else:
+                self._gray = CONTEXTS.of(self.img).gray(GRAY_CODE)
+            self._gray_of, self._histogram = self.lut.channels, None
+        return self._gray
+
+    def _channel_gray(self) -> tuple[np.ndarray, np.ndarray]:
+        """Gray image and histogram of the source through the current channel table."""
+        gray = self._mapped_gray()
+        if self._histogram is None:
+            self._histogram = (gray_histogram(gray) if self.lut.maps_channels
+                               else CONTEXTS.of(self.img).histogram(GRAY_CODE))
+        return gray, self._histogram
+
+    def gray_histogram(self) -> np.ndarray:
+        """Histogram of to_gray() of the source with the stages so far applied."""
+        _, histogram = self._channel_gray()
+        if self.lut.gray is None:
+            return histogram
+        # exact: every pixel of intensity i becomes the colour gray[i]
+        return np.bincount(_table_gray(self.lut.gray), weights=histogram, minlength=256)
+
+    def append(self, lut: ColorLUT) -> None:
+        self.lut = self.lut.then(lut)
+        self.stages += 1
+
+    def apply(self) -> np.ndarray:
+        if self.lut.is_identity:
+            return self.img
+        return self.lut.apply(self.img, gray=self._mapped_gray() if self.lut.gray is not None else None)
+
+    def hand_on(self, context: ImageContext):
+        """
+        Give `context`, that of apply()'s result, the gray planes of a
+        gray-driven result and, if a stage read it, their histograms: every
+        pixel of intensity i is the colour lut.gray[i], so they are one
+        single-channel cv2.LUT and one 256-bin bincount away.
+        """
+        if self.lut.gray is None or self._gray_of is not self.lut.channels:
+            return
+        gray, histogram = self._gray, self._histogram
+        for code in (cv2.COLOR_BGR2GRAY, cv2.COLOR_RGB2GRAY):
+            levels = _table_gray(self.lut.gray, code)
+            context.hand_on("gray", code, lambda levels=levels: cv2.LUT(gray, levels))
+            if histogram is not None:
+                context.hand_on("histogram", code,
+                                lambda levels=levels: np.bincount(levels, weights=histogram, minlength=256))
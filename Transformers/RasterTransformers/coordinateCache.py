@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+def snap(value: float) -> float:
+    """Centres and scales snap to half a pixel so near-identical requests share an entry."""
+    return round(value * 2.0) / 2.0
+
+
+class CoordinateCache:
+    """
+    Process-wide LRU of read-only float32 coordinate fields, keyed by frame
+    size and centre. Most generators emit the same frame size, so warps
+    reuse the same grids image after image instead of rebuilding them.
+
+    Fields are returned with writeable=False; callers that modify a field
+    in place must copy it first. Entries larger than max_bytes are built
+    but not kept.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries: OrderedDict[tuple, tuple[np.ndarray, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple, build: Callable[[], tuple[np.ndarray, ...]]) -> tuple[np.ndarray, ...]:
+        with self._lock:
+            fields = self._entries.get(key)
+            if fields is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fields
+            self.misses += 1
+
+        fields = build()
+        for field in fields:
+            field.flags.writeable = False
+        size = sum(field.nbytes for field in fields)
+        if size > self.max_bytes:
+            return fields
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = fields
+                self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= sum(field.nbytes for field in evicted)
+        return fields
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def fields(self, key: tuple, build: Callable[[], tuple[np.ndarray, ...]]) -> tuple[np.ndarray, ...]:
+        """
+        Fields of any other kind: the arrays build() returns, kept under
+        `key`. Start the key with the caller's name so entries cannot collide.
+        """
+        return self._get(key, build)
+
+    def grid(self, h: int, w: int) -> tuple[np.ndarray, np.ndarray]:
+        """Pixel coordinates (x, y), each (h, w): x[i, j] == j, y[i, j] == i."""
+        def build():
+            return tuple(np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32)))
+        return self._get(("grid", h, w), build)
+
+    def normalised(self, h: int, w: int, cx: float, cy: float,
+                   sx: float = 1.0, sy: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+        """((x - cx) / sx, (y - cy) / sy) with the centre snapped to half a pixel."""
+        cx, cy, sx, sy = snap(cx), snap(cy), max(snap(sx), 0.5), max(snap(sy), 0.5)
+
+        def build():
+            x, y = self.grid(h, w)
+            return (x - np.float32(cx)) / np.float32(sx), (y - np.float32(cy)) / np.float32(sy)
+        return self._get(("norm", h, w, cx, cy, sx, sy), build)
+
+    def polar(self, h: int, w: int, cx: float, cy: float,
+              sx: float = 1.0, sy: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+        """(r, theta) of the normalised field; theta from arctan2 in [-pi, pi]."""
+        cx, cy, sx, sy = snap(cx), snap(cy), max(snap(sx), 0.5), max(snap(sy), 0.5)
+
+        def build():
+            nx, ny = self.normalised(h, w, cx, cy, sx, sy)
+            return np.sqrt(nx * nx + ny * ny), np.arctan2(ny, nx)
+        return self._get(("polar", h, w, cx, cy, sx, sy), build)
+
+
+COORDINATES = CoordinateCache()
@@ -1,6 +1,6 @@
-import numpy as np 
-import random
-from .rasterTransformer import RasterTransformer
+import cv2
+import numpy as np
+from .rasterTransformer import RasterTransformer, TransformParams
 
 MAX_LIGHT_MOSH_INTENSITY = 0.025  # was 0.004 — 0.4% shift is invisible; 2.5% is visible
 
@@ -8,57 +8,50 @@ class DataMoshTransformer(RasterTransformer):
     """
     Applies a data mosh effect by displacing pixels based on their relationship
     to areas of high change.
+
+    Each block of pixels reads from a random offset, wrapping around the
+    frame edges: one nearest-pixel cv2.remap.
     """
+    NATIVE_DTYPE = None  # remaps either dtype
+    FRAME_NOISE = True
+
     def __init__(self):
-        super().__init__() 
+        super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("datamoshtransformer", {})
 
         # --- Parameter Handling ---
-        mosh_intensity = t_config.get("mosh_intensity", "?") 
-        if isinstance(mosh_intensity, float):
-            self.mosh_intensity = mosh_intensity
-        else:
-            self.mosh_intensity = random.uniform(0.005, MAX_LIGHT_MOSH_INTENSITY)
+        mosh_intensity = t_config.get("mosh_intensity", "?")
+        if not isinstance(mosh_intensity, float):
+            mosh_intensity = float(rng.uniform(0.005, MAX_LIGHT_MOSH_INTENSITY))
 
         # Clamp the intensity to the valid range [0.0, 1.0]
-        self.mosh_intensity = max(0.0, min(1.0, self.mosh_intensity))
-        
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["intensity"] = self.mosh_intensity
-        
+        return TransformParams(intensity=max(0.0, min(1.0, mosh_intensity)))
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
         height, width = img_np.shape[:2]
+        # Offsets are drawn in full-resolution blocks and pixels, then resampled
+        (noise_h, noise_w), noise_scale = self.noise_frame(params, (height, width), scale)
 
-        # Generate a grid of coordinates
-        y_coords, x_coords = np.indices((height, width))
-        
         # Calculate the maximum shift based on intensity
-        max_shift_x = int(width * self.mosh_intensity)
-        max_shift_y = int(height * self.mosh_intensity)
+        max_shift_x = int(noise_w * params.intensity)
+        max_shift_y = int(noise_h * params.intensity)
 
-        # Generate random shifts at reduced resolution and upsample.
+        # Random shifts at reduced resolution, one per block.
         # Shift values are small relative to image size, so per-pixel uniqueness is not visible.
-        DOWNSAMPLE = 8
-        small_h = max(1, -(-height // DOWNSAMPLE))  # ceiling division
-        small_w = max(1, -(-width // DOWNSAMPLE))   # ceiling division
-        shift_x = np.repeat(
-            np.repeat(np.random.randint(-max_shift_x, max_shift_x + 1, size=(small_h, small_w)), DOWNSAMPLE, axis=0),
-            DOWNSAMPLE, axis=1
-        )[:height, :width]
-        shift_y = np.repeat(
-            np.repeat(np.random.randint(-max_shift_y, max_shift_y + 1, size=(small_h, small_w)), DOWNSAMPLE, axis=0),
-            DOWNSAMPLE, axis=1
-        )[:height, :width]
-
-        # Calculate the new coordinates with wrapping
-        new_x = (x_coords + shift_x) % width
-        new_y = (y_coords + shift_y) % height
-
-        # Use vectorized indexing to map pixels from their new positions to their old ones
-        if img_np.ndim == 3:
-            output_np = img_np[new_y, new_x, :]
-        else:
-            output_np = img_np[new_y, new_x]
-
-        return output_np.astype(np.float32)  # ensure pipeline contract: float32 [0,1]
+        DOWNSAMPLE = self.scale_px(8, noise_scale)
+        small_h = max(1, -(-noise_h // DOWNSAMPLE))  # ceiling division
+        small_w = max(1, -(-noise_w // DOWNSAMPLE))  # ceiling division
+        shift_x = rng.integers(-max_shift_x, max_shift_x + 1, size=(small_h, small_w))
+        shift_y = rng.integers(-max_shift_y, max_shift_y + 1, size=(small_h, small_w))
+        if (noise_h, noise_w) != (height, width):
+            shift_x = np.rint(shift_x * (width / noise_w))
+            shift_y = np.rint(shift_y * (height / noise_h))
+
+        # Every pixel reads from (x + shift_x, y + shift_y); BORDER_WRAP wraps
+        # the coordinates like % width and % height
+        block = (DOWNSAMPLE * height / noise_h, DOWNSAMPLE * width / noise_w)
+        map_x, map_y = self.block_maps(height, width, block, shift_x, shift_y)
+        return cv2.remap(img_np, map_x, map_y, cv2.INTER_NEAREST, borderMode=cv2.BORDER_WRAP)
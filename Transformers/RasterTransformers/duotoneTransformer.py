@@ -1,7 +1,6 @@
-import cv2
 import numpy as np 
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .colorLut import ColorLUT, LutChain
 
 DEFAULT_SHADOW_HEX = "#FFFF00"
 DEFAULT_HILIGHT_HEX = "#0000FF"
@@ -10,11 +9,13 @@ class DuotoneTransformer(RasterTransformer):
     """
     Applies a duotone colorization effect to an image.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
-    def get_random_hex(self) -> str:
-        return '#{:06x}'.format(random.randint(0, 0xFFFFFF))
+    def get_random_hex(self, rng: np.random.Generator) -> str:
+        return '#{:06x}'.format(int(rng.integers(0, 0xFFFFFF, endpoint=True)))
 
     def _hex_to_rgb(self, hex_str: str) -> tuple:
         """Helper to replace the external hex_to_rgb dependency."""
@@ -23,7 +24,7 @@ class DuotoneTransformer(RasterTransformer):
             return tuple(int(hex_str[i:i+2], 16) for i in (0, 2, 4))
         return (255, 255, 255) 
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("duotonetransformer", {})
 
         shadow_hex = t_config.get("shadow_hex")
@@ -31,47 +32,21 @@ class DuotoneTransformer(RasterTransformer):
         if not isinstance(shadow_hex, str) or not isinstance(hilight_hex, str):
             # Regenerate until shadow and highlight are perceptually distinct
             for _ in range(20):
-                shadow_hex = self.get_random_hex()
-                hilight_hex = self.get_random_hex()
+                shadow_hex = self.get_random_hex(rng)
+                hilight_hex = self.get_random_hex(rng)
                 s = self._hex_to_rgb(shadow_hex)
                 h = self._hex_to_rgb(hilight_hex)
                 if sum(abs(a - b) for a, b in zip(s, h)) > 180:
                     break
         
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["shadow"] = shadow_hex
-        self.metadata_dictionary["highlight"] = hilight_hex
-        
-        # Convert hex codes to RGB tuples and store them natively
-        self.shadow_rgb = self._hex_to_rgb(shadow_hex)
-        self.highlight_rgb = self._hex_to_rgb(hilight_hex)
-
-        img_np = self.to_uint8(img_np)
-
-        if img_np.ndim < 3 or img_np.shape[2] < 3:
-            # If grayscale passed in, convert to pseudo-RGB so we can colorize it
-            if img_np.ndim == 2:
-                img_np = cv2.cvtColor(img_np, cv2.COLOR_GRAY2RGB)
-            else:
-                # Use inherited self.log
-                self.log.error("Input image must have at least 3 channels (RGB).")
-                return img_np
-
-        # Step 1: Convert to grayscale (luminosity method)
-        grayscale_np = np.dot(img_np[...,:3], [0.299, 0.587, 0.114]).astype(np.uint8)
-
-        # Step 2: Create an empty output array
-        output_np = np.zeros_like(img_np)
-
-        # Step 3: Map grayscale intensity to duotone gradient
-        shadow_np = np.array(self.shadow_rgb, dtype=np.float32)
-        highlight_np = np.array(self.highlight_rgb, dtype=np.float32)
+        return TransformParams(shadow=shadow_hex, highlight=hilight_hex)
 
-        # Normalize grayscale values to 0-1
-        normalized_grayscale = grayscale_np.astype(np.float32) / 255.0
+    def point_lut(self, params: TransformParams, stats: LutChain) -> ColorLUT:
+        # Convert hex codes to RGB tuples
+        shadow_np = np.array(self._hex_to_rgb(params.shadow), dtype=np.float32)
+        highlight_np = np.array(self._hex_to_rgb(params.highlight), dtype=np.float32)
 
-        # Perform the linear interpolation for each color channel
-        # Better - single vectorized operation, reshape once
-        t = normalized_grayscale[..., np.newaxis].astype(np.float32)
-        output_np = (shadow_np * (1 - t) + highlight_np * t)
-        return self.to_float32(np.clip(output_np, 0, 255).astype(np.uint8))
+        # Linear interpolation from shadow to highlight for each gray level
+        t = (np.arange(256, dtype=np.float32) / 255.0)[:, np.newaxis]
+        lut = shadow_np * (1 - t) + highlight_np * t
+        return ColorLUT.from_gray(np.clip(lut, 0, 255).astype(np.uint8))
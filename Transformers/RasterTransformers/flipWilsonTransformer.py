@@ -1,118 +1,104 @@
-from .rasterTransformer import RasterTransformer
+import functools
+
+import cv2
 import numpy as np
-import random
-from PIL import Image, ImageOps
+from .rasterTransformer import RasterTransformer, TransformParams
+
+# Replicated margin around the mirrored half, so bicubic taps at its edges
+# read edge pixels instead of black
+_MARGIN = 2
+
 
 class FlipWilsonTransformer(RasterTransformer):
     """
     Reflects a specific half (or corner) of an image onto the rest,
     applying a perspective warp (trapezoid effect) to the reflection.
+
+    The mirror is folded into the homography, so each reflection is one
+    cv2.warpPerspective from the kept half straight into the other half
+    of the output; pixels outside the trapezoid keep what was there
+    (BORDER_TRANSPARENT).
     """
-    
+
+    KEEP_OPTIONS = (
+        'left', 'right', 'top', 'bottom',
+        'top_left', 'top_right', 'bottom_left', 'bottom_right')
+
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self, keep: str | None = None):
         super().__init__()
+        self.keep = keep  # fixed side for every image, or None to sample per image
 
-        keep_options = [
-            'left', 'right', 'top', 'bottom',
-            'top_left', 'top_right', 'bottom_left', 'bottom_right']
-        self.keep = keep or random.choice(keep_options)
-        
-        self.narrow_factor = random.uniform(0.2, 0.5)
-
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["keep"] = self.keep
-        self.metadata_dictionary["narrow"] = round(self.narrow_factor, 2)
-
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
-        if isinstance(img_np, np.ndarray):
-            img = Image.fromarray(self.to_uint8(img_np))
-        elif isinstance(img_np, Image.Image):
-            img = img_np.copy()
-        else:
-            return img_np
-
-        if self.keep == "left":
-            self._reflect_horizontal(img, keep_left=True)
-        elif self.keep == "right":
-            self._reflect_horizontal(img, keep_left=False)
-        elif self.keep == "top":
-            self._reflect_vertical(img, keep_top=True)
-        elif self.keep == "bottom":
-            self._reflect_vertical(img, keep_top=False)
-        elif self.keep == "top_left":
-            self._reflect_vertical(img, keep_top=True)
-            self._reflect_horizontal(img, keep_left=True)
-        elif self.keep == "top_right":
-            self._reflect_vertical(img, keep_top=True)
-            self._reflect_horizontal(img, keep_left=False)
-        elif self.keep == "bottom_left":
-            self._reflect_vertical(img, keep_top=False)
-            self._reflect_horizontal(img, keep_left=True)
-        elif self.keep == "bottom_right":
-            self._reflect_vertical(img, keep_top=False)
-            self._reflect_horizontal(img, keep_left=False)
-
-        return self.to_float32(np.array(img))
-
-    def _reflect_horizontal(self, img: Image.Image, keep_left: bool) -> None:
-        w, h = img.size
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
+        keep = self.keep or str(rng.choice(self.KEEP_OPTIONS))
+        return TransformParams(keep=keep, narrow=float(rng.uniform(0.2, 0.5)))
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        keep, narrow = params.keep, params.narrow
+        out = img_np.copy()
+        if keep in ("top", "top_left", "top_right"):
+            self._reflect_vertical(out, narrow, keep_top=True)
+        elif keep in ("bottom", "bottom_left", "bottom_right"):
+            self._reflect_vertical(out, narrow, keep_top=False)
+        if keep in ("left", "top_left", "bottom_left"):
+            self._reflect_horizontal(out, narrow, keep_left=True)
+        elif keep in ("right", "top_right", "bottom_right"):
+            self._reflect_horizontal(out, narrow, keep_left=False)
+        return out
+
+    def _reflect_horizontal(self, img: np.ndarray, narrow: float, keep_left: bool) -> None:
+        h, w = img.shape[:2]
         mid = w // 2
-        
         if keep_left:
-            source = img.crop((0, 0, mid, h))
-            mirror = ImageOps.mirror(source)
-            mirror = self._warp_trapezoid(mirror, narrow_side='right')
-            img.paste(mirror, (mid, 0), mirror)
+            source, target = img[:, :mid], img[:, mid:2 * mid]
         else:
-            source = img.crop((mid, 0, w, h))
-            mirror = ImageOps.mirror(source)
-            mirror = self._warp_trapezoid(mirror, narrow_side='left')
-            img.paste(mirror, (0, 0), mirror)
+            source, target = img[:, mid:], img[:, :w - mid]
+        inset = int(h * narrow / 2)
+        _warp_into(source, target, _homography(source.shape[1], h, "right" if keep_left else "left", inset))
 
-    def _reflect_vertical(self, img: Image.Image, keep_top: bool) -> None:
-        w, h = img.size
+    def _reflect_vertical(self, img: np.ndarray, narrow: float, keep_top: bool) -> None:
+        h, w = img.shape[:2]
         mid = h // 2
-        
         if keep_top:
-            source = img.crop((0, 0, w, mid))
-            flip = ImageOps.flip(source)
-            flip = self._warp_trapezoid(flip, narrow_side='bottom')
-            img.paste(flip, (0, mid), flip)
-        else:
-            source = img.crop((0, mid, w, h))
-            flip = ImageOps.flip(source)
-            flip = self._warp_trapezoid(flip, narrow_side='top')
-            img.paste(flip, (0, 0), flip)
-
-    def _warp_trapezoid(self, img: Image.Image, narrow_side: str) -> Image.Image:
-        w, h = img.size
-        img = img.convert("RGBA")
-        
-        dx = int((w * self.narrow_factor) / 2)
-        dy = int((h * self.narrow_factor) / 2)
-        
-        if narrow_side == 'top':
-            dest_corners = [(dx, 0), (w - dx, 0), (w, h), (0, h)]
-        elif narrow_side == 'bottom':
-            dest_corners = [(0, 0), (w, 0), (w - dx, h), (dx, h)]
-        elif narrow_side == 'left':
-            dest_corners = [(0, dy), (w, 0), (w, h), (0, h - dy)]
-        elif narrow_side == 'right':
-            dest_corners = [(0, 0), (w, dy), (w, h - dy), (0, h)]
+            source, target = img[:mid], img[mid:2 * mid]
         else:
-            return img
-
-        src_corners = [(0, 0), (w, 0), (w, h), (0, h)]
-        coeffs = self._find_coeffs(dest_corners, src_corners)
-        
-        return img.transform((w, h), Image.PERSPECTIVE, coeffs, Image.BICUBIC)
-
-    def _find_coeffs(self, pa: list[tuple[float, float]], pb: list[tuple[float, float]]) -> np.ndarray:
-        matrix = []
-        for p1, p2 in zip(pa, pb):
-            matrix.append([p1[0], p1[1], 1, 0, 0, 0, -p2[0]*p1[0], -p2[0]*p1[1]])
-            matrix.append([0, 0, 0, p1[0], p1[1], 1, -p2[1]*p1[0], -p2[1]*p1[1]])
-        A = np.matrix(matrix, dtype=np.float32)
-        B = np.array(pb).reshape(8)
-        res = np.linalg.solve(A, B)
-        return np.array(res).reshape(8)
+            source, target = img[mid:], img[:h - mid]
+        inset = int(w * narrow / 2)
+        _warp_into(source, target, _homography(w, source.shape[0], "bottom" if keep_top else "top", inset))
+
+
+def _warp_into(source: np.ndarray, target: np.ndarray, homography: np.ndarray) -> None:
+    """Warp source (plus a replicated margin) into the target view in place."""
+    padded = cv2.copyMakeBorder(source, _MARGIN, _MARGIN, _MARGIN, _MARGIN, cv2.BORDER_REPLICATE)
+    cv2.warpPerspective(padded, homography, (target.shape[1], target.shape[0]), dst=target,
+                        flags=cv2.INTER_CUBIC | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_TRANSPARENT)
+
+
+@functools.lru_cache(maxsize=512)
+def _homography(w: int, h: int, narrow_side: str, inset: int) -> np.ndarray:
+    """
+    Pixel-index homography from the reflected w x h half to the margin-padded
+    source half: the trapezoid with `narrow_side` pulled in by `inset` pixels
+    at both ends, mirrored back across that side's axis.
+    """
+    if narrow_side == "top":
+        trapezoid = [(inset, 0), (w - inset, 0), (w, h), (0, h)]
+    elif narrow_side == "bottom":
+        trapezoid = [(0, 0), (w, 0), (w - inset, h), (inset, h)]
+    elif narrow_side == "left":
+        trapezoid = [(0, inset), (w, 0), (w, h), (0, h - inset)]
+    else:
+        trapezoid = [(0, 0), (w, inset), (w, h - inset), (0, h)]
+    corners = [(0, 0), (w, 0), (w, h), (0, h)]
+    if narrow_side in ("left", "right"):
+        mirrored = [(w - x, y) for x, y in corners]
+    else:
+        mirrored = [(x, h - y) for x, y in corners]
+    # corners are in continuous coordinates; pixel centres sit at +0.5
+    dst = np.float32(trapezoid) - 0.5
+    src = np.float32(mirrored) - 0.5 + _MARGIN
+    homography = cv2.getPerspectiveTransform(dst, src)
+    homography.flags.writeable = False
+    return homography
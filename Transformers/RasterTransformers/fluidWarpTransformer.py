@@ -1,73 +1,82 @@
+import math
+
 import numpy as np
 import cv2
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES
+from .noiseBank import NOISE, blurred_std
 
 
 MAX_ALPHA = 20.0
 MAX_SIGMA = 8.0  # was 100; large sigma → huge blur kernel → sharpness floor failures
 
 class FluidWarpTransformer(RasterTransformer):
+    NATIVE_DTYPE = None  # remaps either dtype
+    FRAME_NOISE = True
+
     def __init__(self):
         super().__init__()
 
-    def _generate_perlin_noise(self, shape: tuple, octaves: int = 1, persistence: float = 0.5) -> np.ndarray:
-        noise = (np.random.rand(*shape) * 2 - 1).astype(np.float32)
-        ksize = max(1, int(6 * self.sigma + 1)) | 1  # must be odd
-        return cv2.GaussianBlur(noise, (ksize, ksize), self.sigma)
-
-    def _create_displacement_map(self, shape: tuple) -> tuple:
-        rows, cols = shape
-        dx = self._generate_perlin_noise(shape) * self.alpha
-        dy = self._generate_perlin_noise(shape) * self.alpha
-
-        x, y = np.meshgrid(np.arange(cols), np.arange(rows))
-
-        indices_x = x + dx
-        indices_y = y + dy
+    def _generate_perlin_noise(self, rng: np.random.Generator, shape: tuple, sigma: float,
+                               octaves: int = 1, persistence: float = 0.5, noise_source: str = "fresh") -> np.ndarray:
+        if noise_source == "bank":
+            # same std and correlation as blurring the uniform [-1, 1] noise below (std 1/sqrt(3))
+            return NOISE.gaussian(rng, shape, sigma) * np.float32(blurred_std(sigma) / math.sqrt(3))
+        noise = (rng.random(shape) * 2 - 1).astype(np.float32)
+        ksize = max(1, int(6 * sigma + 1)) | 1  # must be odd
+        return cv2.GaussianBlur(noise, (ksize, ksize), sigma)
 
-        return indices_y, indices_x
-
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("fluidwarptransformer", {})
 
         # --- Parameter Handling ---
-        self.alpha = t_config.get("alpha")
-        if self.alpha is None or not isinstance(self.alpha, (int, float)):
-            self.alpha = random.uniform(0.01, MAX_ALPHA)
+        alpha = t_config.get("alpha")
+        if alpha is None or not isinstance(alpha, (int, float)):
+            alpha = rng.uniform(0.01, MAX_ALPHA)
 
         sigma = t_config.get("sigma")
         if sigma is None or not isinstance(sigma, (int, float)):
-            self.sigma = random.uniform(0.5, MAX_SIGMA)
-        else:
-            self.sigma = min(float(sigma), MAX_SIGMA)
-            
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["alpha"] = round(self.alpha, 2)
-        self.metadata_dictionary["sigma"] = round(self.sigma, 2)
-            
-        image_type = t_config.get("image_type", "default")
-        
-        if image_type == "text":
-            interpolation_order = 0  # Nearest Neighbor (crisp)
+            sigma = rng.uniform(0.5, MAX_SIGMA)
         else:
-            interpolation_order = 1  # Bilinear (blurry)
-           
-        if img_np.ndim < 2 or img_np.ndim > 3:
-           raise ValueError("Input image must be 2D (grayscale) or 3D (color).")
+            sigma = min(float(sigma), MAX_SIGMA)
+
+        # Noise source: "bank" (windows of the shared noise bank) or "fresh" (drawn and blurred per image)
+        noise = t_config.get("noise")
+        if noise not in ("bank", "fresh"):
+            noise = "bank"
 
-        rows, cols = img_np.shape[:2]
-        displacement_map = self._create_displacement_map((rows, cols))
+        return TransformParams(alpha=float(alpha), sigma=float(sigma), noise=noise)
+
+    def build_map(self, shape: tuple[int, int], params: TransformParams,
+                  rng: np.random.Generator, scale: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+        rows, cols = shape
+        # The noise is drawn on the grid warp_map() evaluates a full-resolution
+        # render on, then resized to this one, so every render size shares it
+        (noise_h, noise_w), noise_scale = self.noise_frame(params, shape, scale)
+        if params.get("noise_size") is not None:
+            step = self.map_step(params, 1.0)
+            noise_h, noise_w = -(-noise_h // step), -(-noise_w // step)
+            noise_scale = noise_w / params.noise_size[1]
+        sigma = self.scale_px(params.sigma, noise_scale, minimum=0.1)
+        alpha = self.scale_px(params.alpha, scale, minimum=0.0)
+        noise_source = params.get("noise", "fresh")
 
-        map_x = displacement_map[1].astype(np.float32)
-        map_y = displacement_map[0].astype(np.float32)
+        x, y = COORDINATES.grid(rows, cols)
+        maps = []
+        for grid in (x, y):
+            noise = self._generate_perlin_noise(rng, (noise_h, noise_w), sigma, noise_source=noise_source)
+            if (noise_h, noise_w) != (rows, cols):
+                shrinking = noise_h * noise_w > rows * cols
+                noise = cv2.resize(noise, (cols, rows), interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_CUBIC)
+            maps.append((grid + noise * alpha).astype(np.float32))
+        return maps[0], maps[1]
 
-        interp = cv2.INTER_NEAREST if interpolation_order == 0 else cv2.INTER_LINEAR
+    def map_step(self, params: TransformParams, scale: float) -> int:
+        # The noise is blurred by sigma px; a coarser grid than that would lose detail
+        return max(1, min(self.MAP_STEP, int(self.scale_px(params.sigma, scale, minimum=0.0))))
 
-        img_f = img_np.astype(np.float32)
-        if img_f.max() > 1.5:
-            img_f = img_f / 255.0
-        warped_img = cv2.remap(img_f, map_x, map_y,
-                               interpolation=interp,
-                               borderMode=cv2.BORDER_REFLECT)
-        return warped_img.astype(np.float32)
+    def remap_mode(self) -> tuple[int, int]:
+        image_type = self.config.get("fluidwarptransformer", {}).get("image_type", "default")
+        # Nearest neighbour keeps text crisp; bilinear otherwise
+        interpolation = cv2.INTER_NEAREST if image_type == "text" else cv2.INTER_LINEAR
+        return interpolation, cv2.BORDER_REFLECT
@@ -1,97 +1,209 @@
-import cv2
+import math
+
 import numpy as np
-from .rasterTransformer import RasterTransformer
-import random
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is only in requirements-linux.txt; maps fall back to whole-frame numpy
+    njit = None
+    prange = range
 
 DEFAULT_SCALE = 1.0
 DEFAULT_ITERATIONS = 15
 
 class FractalWarpTransformer(RasterTransformer):
     """
-    Applies a fractal warp (kaleidoscope) effect to an image using vectorized operations.
+    Applies a fractal warp (kaleidoscope) effect to an image.
+
+    Each pixel's normalised position is iterated: its angle is multiplied
+    by `scale` and block noise (one ±0.01 value per 8×8 block and
+    iteration) is added, until it escapes or the iterations run out. A
+    numba kernel iterates every pixel on its own, in parallel over rows,
+    and stops it the moment it escapes; without numba the same arithmetic
+    runs on whole float32 frames.
     """
 
+    NATIVE_DTYPE = None  # remaps either dtype
+    MAP_STEP = 1  # escape-time edges and block noise are not smooth
+    FRAME_NOISE = True
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("fractalwarptransformer", {})
 
         # --- Parameter Handling ---
         iterations = t_config.get("iterations")
         if not isinstance(iterations, int):
-            iterations = random.randint(8, 20)
+            iterations = int(rng.integers(8, 20, endpoint=True))
         
         scale = t_config.get("scale")
         if scale is None or not isinstance(scale, (int, float)):
-            scale = random.uniform(0.5, DEFAULT_SCALE * 1.5)
-        
-        seed = t_config.get("seed")
-        if seed is None:
-            seed = np.random.randint(0, 1000000)
-        np.random.seed(seed)
-        
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["iter"] = iterations
-        self.metadata_dictionary["scale"] = round(scale, 2)
-        #self.metadata_dictionary["seed"] = seed
-        
+            scale = rng.uniform(0.5, DEFAULT_SCALE * 1.5)
+
+        # A configured seed pins the noise field too; otherwise it comes from the call's rng
+        return TransformParams(iter=iterations, scale=float(scale), seed=t_config.get("seed"))
+
+    def warm_up(self) -> None:
+        # compiles _iterate_maps, or loads it from the numba cache, for the types build_map() passes
+        if njit is not None:
+            self.build_map((8, 8), TransformParams(iter=1, scale=1.0, seed=0), np.random.default_rng(0))
+
+    def describe(self, params: TransformParams) -> dict:
+        return {"iter": params.iter, "scale": params.scale}
+
+    def build_map(self, shape: tuple[int, int], params: TransformParams,
+                  rng: np.random.Generator, scale: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+        t_config = self.config.get("fractalwarptransformer", {})
+        if params.seed is not None:
+            rng = np.random.default_rng(params.seed)
+        iterations = params.iter
         image_type = t_config.get("image_type", "default")
         apply_noise = (image_type != "text")
 
-        height, width = img_np.shape[:2]
-
-        # --- VECTORIZED LOGIC ---
-        map_x, map_y = np.meshgrid(np.arange(width, dtype=np.float32),
-                                   np.arange(height, dtype=np.float32))
+        height, width = shape
 
         center_x = width / 2.0
         center_y = height / 2.0
-        
-        nx = (map_x - center_x) / width
-        ny = (map_y - center_y) / height
-
-        active_mask = np.ones((height, width), dtype=bool)
-
-        # Pre-compute downsampled noise dimensions once outside the loop.
-        # Noise range is ±0.01, so per-pixel uniqueness has no visible benefit.
-        _D = 8
-        _sh = max(1, -(-height // _D))  # ceiling division
-        _sw = max(1, -(-width // _D))   # ceiling division
-
-        for _ in range(iterations):
-            r_sq = nx * nx + ny * ny
-            escaped_now = r_sq > 4
-            active_mask = active_mask & (~escaped_now)
-            
-            if not np.any(active_mask):
-                break
-
-            angle = np.arctan2(ny, nx)
-            r = np.sqrt(r_sq)
-
-            nx_new = r * np.cos(scale * angle)
-            ny_new = r * np.sin(scale * angle)
-
-            if apply_noise:
-                noise_x = np.repeat(np.repeat(
-                    np.random.uniform(-0.01, 0.01, (_sh, _sw)).astype(np.float32), _D, axis=0), _D, axis=1)[:height, :width]
-                noise_y = np.repeat(np.repeat(
-                    np.random.uniform(-0.01, 0.01, (_sh, _sw)).astype(np.float32), _D, axis=0), _D, axis=1)[:height, :width]
-                nx_new += noise_x
-                ny_new += noise_y
-            
-            np.copyto(nx, nx_new, where=active_mask)
-            np.copyto(ny, ny_new, where=active_mask)
-
-        map_x = (nx * width + center_x).astype(np.float32)
-        map_y = (ny * height + center_y).astype(np.float32)
-
-        img_np = self.to_uint8(img_np)
-        try:
-            warped = cv2.remap(img_np, map_x, map_y, interpolation=cv2.INTER_LINEAR)
-            return self.to_float32(warped)
-        except Exception as e:
-            # Replaced global log with self.log
-            self.log.critical(f"Error during FractalWarp remap: {e}")
-            return self.to_float32(img_np)
+        nx, ny = COORDINATES.normalised(height, width, center_x, center_y, width, height)
+
+        # Noise range is ±0.01, so one value per block and iteration is plenty.
+        # Drawn up front in the order the iterations use it: x then y, per iteration,
+        # in blocks of the full-resolution frame, which each pixel then looks up.
+        (frame_h, frame_w), noise_scale = self.noise_frame(params, shape, scale)
+        block = self.scale_px(8, noise_scale)
+        noise_h = max(1, -(-frame_h // block))  # ceiling division
+        noise_w = max(1, -(-frame_w // block))
+        if apply_noise:
+            noise = rng.uniform(-0.01, 0.01, (iterations, 2, noise_h, noise_w)).astype(np.float32)
+        else:
+            noise = np.zeros((0, 2, 1, 1), dtype=np.float32)
+        noise_rows = self.cell_index(height, block * height / frame_h, noise_h)
+        noise_cols = self.cell_index(width, block * width / frame_w, noise_w)
+
+        map_x = np.empty((height, width), dtype=np.float32)
+        map_y = np.empty((height, width), dtype=np.float32)
+        iterate = _iterate_maps if njit is not None else _iterate_maps_numpy
+        iterate(nx, ny, noise, noise_rows, noise_cols, iterations, np.float32(params.scale),
+                np.float32(width), np.float32(height), np.float32(center_x), np.float32(center_y), map_x, map_y)
+        return map_x, map_y
+
+
+def _atan2f(y, x):
+    """float32 atan2 (SLEEF's polynomial, within 3 ulp of np.arctan2 for finite inputs) that vectorises without SVML."""
+    ax = abs(x)
+    ay = abs(y)
+    a = min(ax, ay) / max(ax, ay) if max(ax, ay) > np.float32(0.0) else np.float32(0.0)
+    t = a * a
+    u = np.float32(0.00282363896258175373077393)
+    u = u * t + np.float32(-0.0159569028764963150024414)
+    u = u * t + np.float32(0.0425049886107444763183594)
+    u = u * t + np.float32(-0.0748900920152664184570312)
+    u = u * t + np.float32(0.106347933411598205566406)
+    u = u * t + np.float32(-0.142027363181114196777344)
+    u = u * t + np.float32(0.199926957488059997558594)
+    u = u * t + np.float32(-0.333331018686294555664062)
+    r = a + a * (t * u)
+    if ay > ax:
+        r = np.float32(1.57079637050628662109375) - r
+    if x < np.float32(0.0):
+        r = np.float32(3.1415927410125732421875) - r
+    return np.float32(math.copysign(r, y))
+
+
+def _sincosf(d):
+    """
+    float32 (sin, cos): quadrant by Cody-Waite reduction, then minimax
+    polynomials; within 1e-7 of np.sin/np.cos for |d| <= 1000, far beyond
+    the angles the kernel produces.
+    """
+    q = np.float32(math.floor(d * np.float32(0.636619772367581343) + np.float32(0.5)))
+    e = d - q * np.float32(1.5703125)
+    e = e - q * np.float32(0.0004838705062866211)
+    e = e - q * np.float32(-4.371138828673793e-08)
+    s = e * e
+    u = np.float32(-0.000195169282960705459117889)
+    u = u * s + np.float32(0.00833215750753879547119141)
+    u = u * s + np.float32(-0.166666537523269653320312)
+    sin = e + e * s * u
+    u = np.float32(2.44331568061886355280876e-05)
+    u = u * s + np.float32(-0.00138873036485165357589722)
+    u = u * s + np.float32(0.0416666232049465179443359)
+    cos = np.float32(1.0) + s * (np.float32(-0.5) + s * u)
+    quadrant = np.int32(q) & 3
+    if quadrant & 1:
+        sin, cos = cos, -sin
+    if quadrant & 2:
+        sin, cos = -sin, -cos
+    return sin, cos
+
+
+def _iterate_maps_py(nx, ny, noise, noise_rows, noise_cols, iterations, angle_scale, width, height,
+                     center_x, center_y, map_x, map_y):
+    """
+    Iterate each pixel from (nx, ny) and write its source coordinate, in
+    parallel over rows. A pixel stops changing once r² > 4; within a row
+    the iterations run as one branch-free pass over the columns so the
+    loop vectorises. float32 throughout, like the numpy path. Pixel (y, x)
+    adds noise block (noise_rows[y], noise_cols[x]).
+    """
+    rows, cols = nx.shape
+    use_noise = noise.shape[0] > 0
+    for y in prange(rows):
+        px = nx[y].copy()
+        py = ny[y].copy()
+        noise_x = np.zeros(cols, dtype=np.float32)
+        noise_y = np.zeros(cols, dtype=np.float32)
+        noise_row = noise_rows[y]
+        for i in range(iterations):
+            if use_noise:
+                for x in range(cols):
+                    noise_x[x] = noise[i, 0, noise_row, noise_cols[x]]
+                    noise_y[x] = noise[i, 1, noise_row, noise_cols[x]]
+            for x in range(cols):
+                a = px[x]
+                b = py[x]
+                r_sq = a * a + b * b
+                sin, cos = _sincosf(angle_scale * _atan2f(b, a))
+                r = np.float32(math.sqrt(r_sq))
+                escaped = r_sq > np.float32(4.0)
+                px[x] = a if escaped else r * cos + noise_x[x]
+                py[x] = b if escaped else r * sin + noise_y[x]
+        for x in range(cols):
+            map_x[y, x] = px[x] * width + center_x
+            map_y[y, x] = py[x] * height + center_y
+
+
+if njit is not None:
+    _atan2f = njit(inline="always")(_atan2f)
+    _sincosf = njit(inline="always")(_sincosf)
+    _iterate_maps = njit(parallel=True, cache=True)(_iterate_maps_py)
+
+
+def _iterate_maps_numpy(nx, ny, noise, noise_rows, noise_cols, iterations, angle_scale, width, height,
+                        center_x, center_y, map_x, map_y):
+    """_iterate_maps on whole frames: every iteration updates the pixels not yet escaped."""
+    rows, cols = nx.shape
+    nx, ny = nx.copy(), ny.copy()
+    active_mask = np.ones((rows, cols), dtype=bool)
+    for i in range(iterations):
+        r_sq = nx * nx + ny * ny
+        active_mask &= ~(r_sq > 4)
+        if not np.any(active_mask):
+            break
+        angle = angle_scale * np.arctan2(ny, nx)
+        r = np.sqrt(r_sq)
+        nx_new = r * np.cos(angle)
+        ny_new = r * np.sin(angle)
+        if noise.shape[0]:
+            nx_new += noise[i, 0][np.ix_(noise_rows, noise_cols)]
+            ny_new += noise[i, 1][np.ix_(noise_rows, noise_cols)]
+        np.copyto(nx, nx_new, where=active_mask)
+        np.copyto(ny, ny_new, where=active_mask)
+    np.multiply(nx, width, out=map_x)
+    map_x += center_x
+    np.multiply(ny, height, out=map_y)
+    map_y += center_y
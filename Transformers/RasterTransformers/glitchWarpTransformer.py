@@ -1,42 +1,45 @@
+import cv2
 import numpy as np
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES
 
 class GlitchWarpTransformer(RasterTransformer):
     """
     Applies a glitch warp effect to an image by randomly shifting horizontal rows
     of pixels.
+
+    The rows are rolled by one nearest-pixel cv2.remap, with BORDER_WRAP
+    doing the wrap-around.
     """
+    NATIVE_DTYPE = None  # remaps either dtype
+    FRAME_NOISE = True
+    PROXY_SAFE = False  # one shift per row: a proxy row blends two unrelated ones
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("glitchwarptransformer", {})
 
-        self.warp_intensity = t_config.get("warp_intensity")
-        if not isinstance(self.warp_intensity, (int, float)):
-            self.warp_intensity = random.uniform(0.05, 0.35)
+        warp_intensity = t_config.get("warp_intensity")
+        if not isinstance(warp_intensity, (int, float)):
+            warp_intensity = rng.uniform(0.05, 0.35)
 
         # Clamp the intensity to the valid range [0, 1]
-        self.warp_intensity = max(0.0, min(1.0, self.warp_intensity))
-        
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["intensity"] = round(self.warp_intensity, 2)
-
-        # Set the random seed for reproducible glitches
-        seed = random.randint(0, 1000000)
-        np.random.seed(seed)
-        height, width = img_np.shape[:2]
-
-        max_shift = int(width * self.warp_intensity)
-        shifts = np.random.randint(-max_shift, max_shift + 1, size=height)
+        return TransformParams(intensity=max(0.0, min(1.0, float(warp_intensity))))
 
-        x_indices = np.arange(width)
-        
-        # Broadcasting shift
-        new_x_indices = (x_indices - shifts[:, np.newaxis]) % width
-
-        # Advanced indexing
-        output_np = img_np[np.arange(height)[:, np.newaxis], new_x_indices]
-
-        return output_np.astype(np.float32)  # ensure pipeline contract: float32 [0,1]
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        height, width = img_np.shape[:2]
+        # Shifts are drawn per full-resolution row, in its pixels, then resampled
+        (noise_h, noise_w), _ = self.noise_frame(params, (height, width), scale)
+
+        max_shift = int(noise_w * params.intensity)
+        shifts = rng.integers(-max_shift, max_shift + 1, size=noise_h)
+        if (noise_h, noise_w) != (height, width):
+            shifts = np.rint(shifts[self.cell_index(height, height / noise_h, noise_h)] * (width / noise_w))
+
+        # Row y reads from x - shifts[y], wrapped like % width
+        grid_x, grid_y = COORDINATES.grid(height, width)
+        map_x = np.subtract(grid_x, shifts[:, np.newaxis].astype(np.float32))
+        return cv2.remap(img_np, map_x, grid_y, cv2.INTER_NEAREST, borderMode=cv2.BORDER_WRAP)
@@ -1,6 +1,5 @@
 import numpy as np
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
 
 DEFAULT_DOT_SIZE = 3
 
@@ -11,17 +10,16 @@ class HalftoneTransformer(RasterTransformer):
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("halftonetransformer", {})
        
         dot_size = t_config.get("dot_size")
         if not isinstance(dot_size, int):
-            dot_size = random.randint(4, 12)
-        self.dot_size = max(2, dot_size)
-        
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["size"] = self.dot_size
+            dot_size = int(rng.integers(4, 12, endpoint=True))
+        return TransformParams(size=max(2, dot_size))
 
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
         # Convert to grayscale. Input is float32 [0,1]; scale to [0,255] for quantization.
         img_255 = np.clip(img_np, 0.0, 1.0) * 255.0
         if img_np.ndim == 3:
@@ -30,7 +28,7 @@ class HalftoneTransformer(RasterTransformer):
             grayscale_np = img_255
             
         height, width = grayscale_np.shape
-        step = self.dot_size
+        step = self.scale_px(params.size, scale, minimum=2)
 
         trimmed_height = height - (height % step)
         trimmed_width = width - (width % step)
@@ -0,0 +1,187 @@
+import threading
+import weakref
+from typing import Callable
+
+import cv2
+import numpy as np
+
+# Per-channel weights of the float gray planes, in the image's channel order
+_GRAY_WEIGHTS = {
+    cv2.COLOR_BGR2GRAY: (0.114, 0.587, 0.299),
+    cv2.COLOR_RGB2GRAY: (0.299, 0.587, 0.114),
+}
+
+
+def gray_histogram(gray: np.ndarray) -> np.ndarray:
+    """256-bin float64 histogram of a uint8 gray image."""
+    return cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+
+
+def percentile_from_histogram(hist: np.ndarray, q: float) -> float:
+    """np.percentile(pixels, q) (linear method) of the pixels counted in hist."""
+    cumulative = np.cumsum(hist)
+    position = q / 100.0 * (cumulative[-1] - 1)
+    lo = np.floor(position)
+    v_lo = float(np.searchsorted(cumulative, lo, side="right"))
+    if position == lo:
+        return v_lo
+    v_hi = float(np.searchsorted(cumulative, lo + 1, side="right"))
+    return v_lo + (position - lo) * (v_hi - v_lo)
+
+
+class ImageContext:
+    """
+    Data derived from one image: gray planes, HSV, the 256-bin luminance
+    histogram and percentiles, downscaled copies and Gaussian-pyramid
+    levels. Each is computed on first use and kept while the image lives,
+    so a transformer and the grader that look at the same image share them.
+
+    Only read-only images keep anything. The pipeline freezes every image it
+    passes along the chain, so new pixels always arrive as a new array with
+    a new context, and nothing cached can go stale. A writeable array gets a
+    context that computes every plane but keeps none. Planes are returned
+    read-only; copy one before modifying it in place.
+
+    The step that made an image can hand_on() planes it can derive from
+    what it already had more cheaply than from the pixels (a gray-driven
+    colour table, for one, knows its result's gray levels); they are built
+    from that on first use.
+    """
+    def __init__(self, img_np: np.ndarray, registry: "ImageContexts"):
+        self._image = weakref.ref(img_np)
+        self._registry = registry
+        self.cached = not img_np.flags.writeable
+        self._planes: dict[tuple, np.ndarray] = {}
+        self._handed: dict[tuple, Callable[[], np.ndarray]] = {}
+
+    @property
+    def img(self) -> np.ndarray:
+        return self._image()
+
+    def _get(self, key: tuple, build: Callable[[], np.ndarray]) -> np.ndarray:
+        plane = self._planes.get(key)
+        if plane is not None:
+            self._registry.count("hits")
+            return plane
+        handed = self._handed.pop(key, None)
+        self._registry.count("misses" if handed is None else "handed")
+        plane = (handed or build)()
+        if self.cached:
+            plane.flags.writeable = False
+            self._planes[key] = plane
+        return plane
+
+    def hand_on(self, kind: str, code: int, build: Callable[[], np.ndarray]):
+        """
+        Have the `kind` ("gray" or "histogram") plane for `code` built by
+        `build` instead of from the pixels; it must return exactly what
+        gray(code) or histogram(code) would. Ignored by a context that keeps
+        nothing and for planes already kept.
+        """
+        if self.cached and (kind, code) not in self._planes:
+            self._handed[(kind, code)] = build
+
+    def gray(self, code: int = cv2.COLOR_BGR2GRAY) -> np.ndarray:
+        """
+        cv2.cvtColor(img, code), in the image's dtype. Pass COLOR_RGB2GRAY for
+        the swapped weights most transformers use on the pipeline's BGR data.
+        float32 images are weighted in plain float32 arithmetic, channel by
+        channel, so results match the expressions transformers used before.
+        """
+        def build():
+            img = self.img
+            if img.ndim == 2:
+                return img.copy()
+            if img.shape[2] == 1:
+                return img[:, :, 0].copy()
+            if img.dtype != np.uint8 and code in _GRAY_WEIGHTS:
+                w0, w1, w2 = _GRAY_WEIGHTS[code]
+                return img[..., 0] * w0 + img[..., 1] * w1 + img[..., 2] * w2
+            return cv2.cvtColor(img, code)
+        return self._get(("gray", code), build)
+
+    def gray_u8(self, code: int = cv2.COLOR_BGR2GRAY) -> np.ndarray:
+        """gray(code) as uint8 (float32 [0, 1] images are scaled by 255 and truncated)."""
+        gray = self.gray(code)
+        if gray.dtype == np.uint8:
+            return gray
+        return self._get(("gray_u8", code), lambda: np.clip(gray * 255.0, 0, 255).astype(np.uint8))
+
+    def hsv(self) -> np.ndarray:
+        """cv2.cvtColor(img, COLOR_BGR2HSV)."""
+        return self._get(("hsv",), lambda: cv2.cvtColor(self.img, cv2.COLOR_BGR2HSV))
+
+    def histogram(self, code: int = cv2.COLOR_BGR2GRAY) -> np.ndarray:
+        """256-bin float64 histogram of gray_u8(code)."""
+        return self._get(("histogram", code), lambda: gray_histogram(self.gray_u8(code)))
+
+    def percentile(self, q: float, code: int = cv2.COLOR_BGR2GRAY) -> float:
+        """np.percentile(gray_u8(code), q), read off the histogram."""
+        return percentile_from_histogram(self.histogram(code), q)
+
+    def kth_smallest(self, k: int, code: int = cv2.COLOR_BGR2GRAY) -> int:
+        """np.partition(gray_u8(code).ravel(), k)[k], read off the histogram."""
+        return int(np.searchsorted(np.cumsum(self.histogram(code)), k, side="right"))
+
+    def downscaled(self, size: tuple[int, int], interpolation: int = cv2.INTER_LINEAR) -> np.ndarray:
+        """cv2.resize(img, size) with size as (width, height)."""
+        return self._get(("resize", size, interpolation),
+                         lambda: cv2.resize(self.img, size, interpolation=interpolation))
+
+    def pyramid(self, level: int) -> np.ndarray:
+        """Gaussian-pyramid level: 0 is the image, each further level one cv2.pyrDown."""
+        if level <= 0:
+            return self.img
+        return self._get(("pyramid", level), lambda: cv2.pyrDown(self.pyramid(level - 1)))
+
+
+class ImageContexts:
+    """
+    Process-wide map from a read-only image to its ImageContext. Entries
+    are dropped when the image is garbage-collected; `hits` and `misses`
+    count planes served from and added to any context, `handed` the planes
+    built from what the previous step handed on.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.handed = 0
+        self.misses = 0
+        self._contexts: dict[int, ImageContext] = {}
+        self._lock = threading.Lock()
+
+    def count(self, outcome: str):
+        """Add one to `outcome`: "hits", "handed" or "misses"."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def of(self, img_np: np.ndarray) -> ImageContext:
+        """The context of img_np; a fresh, non-caching one if img_np is writeable."""
+        if img_np.flags.writeable:
+            return ImageContext(img_np, self)
+        key = id(img_np)
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None and context.img is img_np:
+                return context
+            context = ImageContext(img_np, self)
+            self._contexts[key] = context
+        weakref.finalize(img_np, self._forget, key, context)
+        return context
+
+    def _forget(self, key: int, context: ImageContext):
+        with self._lock:
+            if self._contexts.get(key) is context:
+                del self._contexts[key]
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+
+def freeze(img_np: np.ndarray) -> np.ndarray:
+    """Mark img_np read-only so ImageContexts caches its planes; returns it."""
+    img_np.flags.writeable = False
+    return img_np
+
+
+CONTEXTS = ImageContexts()
@@ -1,7 +1,7 @@
 import numpy as np
 import cv2
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES, snap
 
 
 class KaleidoscopeTransformer(RasterTransformer):
@@ -12,42 +12,43 @@ class KaleidoscopeTransformer(RasterTransformer):
     Spectacular on bubbles, cubes, and peripheral_drift.
     """
 
+    NATIVE_DTYPE = None  # remaps either dtype
+    REMAP_BORDER = cv2.BORDER_REFLECT_101
+    MAP_STEP = 1  # wedge seams would smear on a coarse grid
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("kaleidoscopetransformer", {})
 
         # Number of mirror segments (must be even; 4/6/8/12 work best)
         segments = t_config.get("segments")
         if not isinstance(segments, int):
-            segments = random.choice([4, 6, 8, 8, 12])
+            segments = int(rng.choice([4, 6, 8, 8, 12]))
 
         # Centre offset from image centre as fraction [-0.3, 0.3]
         cx_offset = t_config.get("cx_offset")
         cy_offset = t_config.get("cy_offset")
         if not isinstance(cx_offset, (int, float)):
-            cx_offset = random.uniform(-0.2, 0.2)
+            cx_offset = rng.uniform(-0.2, 0.2)
         if not isinstance(cy_offset, (int, float)):
-            cy_offset = random.uniform(-0.2, 0.2)
+            cy_offset = rng.uniform(-0.2, 0.2)
+
+        return TransformParams(segments=segments, cx_off=float(cx_offset), cy_off=float(cy_offset))
 
-        self.metadata_dictionary["segments"] = segments
-        self.metadata_dictionary["cx_off"]   = round(float(cx_offset), 2)
-        self.metadata_dictionary["cy_off"]   = round(float(cy_offset), 2)
+    def build_map(self, shape: tuple[int, int], params: TransformParams,
+                  rng: np.random.Generator, scale: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+        segments, cx_offset, cy_offset = params.segments, params.cx_off, params.cy_off
 
-        img = self.to_uint8(img_np)
-        h, w = img.shape[:2]
+        h, w = shape
 
         cx = w / 2.0 + cx_offset * w
         cy = h / 2.0 + cy_offset * h
 
-        # Build polar coordinate maps
-        yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
-        dx = xx - cx
-        dy = yy - cy
-
-        r     = np.sqrt(dx * dx + dy * dy)
-        theta = np.arctan2(dy, dx)  # [-π, π]
+        # Polar coordinate maps (shared cache; the centre snaps to half a pixel)
+        cx, cy = snap(cx), snap(cy)
+        r, theta = COORDINATES.polar(h, w, cx, cy)  # theta in [-π, π]
 
         # Fold theta into [0, 2π/segments] wedge, then mirror
         wedge = 2.0 * np.pi / segments
@@ -63,6 +64,4 @@ class KaleidoscopeTransformer(RasterTransformer):
         src_x = (cx + r * np.cos(theta_mirror)).astype(np.float32)
         src_y = (cy + r * np.sin(theta_mirror)).astype(np.float32)
 
-        out = cv2.remap(img, src_x, src_y, cv2.INTER_LINEAR,
-                        borderMode=cv2.BORDER_REFLECT_101)
-        return self.to_float32(out)
+        return src_x, src_y
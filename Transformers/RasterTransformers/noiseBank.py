@@ -0,0 +1,155 @@
+import math
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Blur sigma (px) of each band's tiles; band 0 is white noise
+BANDS = (0.0, 1.0, 2.0, 4.0)
+TILE = 2048
+TILES_PER_BAND = 2
+# Part of the cache file name: bump it whenever the tiles would come out differently
+VERSION = 1
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "screenart")
+
+
+def blur_kernel(sigma: float) -> np.ndarray:
+    """The 1-D kernel cv2.GaussianBlur applies for `sigma` at ksize int(6 * sigma + 1) | 1."""
+    ksize = max(1, int(6 * sigma + 1)) | 1
+    return cv2.getGaussianKernel(ksize, sigma).ravel()
+
+
+def blurred_std(sigma: float) -> float:
+    """Std of unit-std white noise after a blur_kernel(sigma) GaussianBlur (1.0 for sigma 0)."""
+    if sigma <= 0:
+        return 1.0
+    # the 2-D kernel is k k^T, so its L2 norm is sum(k^2)
+    return float(np.sum(blur_kernel(sigma) ** 2))
+
+
+def _spans(offset: int, length: int, period: int):
+    """(dst, src, n) runs that read `length` entries from `offset` on, wrapping at `period`."""
+    dst = 0
+    while dst < length:
+        src = (offset + dst) % period
+        n = min(length - dst, period - src)
+        yield dst, src, n
+        dst += n
+
+
+class NoiseBank:
+    """
+    Pre-generated Gaussian noise, white and blurred to a few sigma bands,
+    kept as TILES_PER_BAND periodic TILE x TILE tiles per band in one
+    memory-mapped .npy under cache_dir, so worker processes share its
+    pages. The file is built from fixed seeds on first use; hosts with the
+    same numpy and OpenCV build the same tiles.
+
+    Callers get fresh-looking noise by reading windows at offsets, flips
+    and transposes drawn from their own rng, so a seed still replays
+    exactly. Tiles wrap around, so any window up to TILE x TILE is
+    seamless and never repeats within itself.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_DIR):
+        self.cache_dir = cache_dir
+        self._tiles: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.cache_dir, f"noise-bank-v{VERSION}-{TILE}.npy")
+
+    def tiles(self) -> np.ndarray:
+        """float32 (len(BANDS), TILES_PER_BAND, TILE, TILE), read-only; loaded or built on first use."""
+        with self._lock:
+            if self._tiles is None:
+                self._tiles = self._load()
+            if self._tiles is None:
+                self._tiles = self._build()
+            return self._tiles
+
+    def _load(self) -> np.ndarray | None:
+        try:
+            tiles = np.load(self.path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if tiles.shape != (len(BANDS), TILES_PER_BAND, TILE, TILE) or tiles.dtype != np.float32:
+            return None
+        return tiles
+
+    def _build(self) -> np.ndarray:
+        tiles = np.empty((len(BANDS), TILES_PER_BAND, TILE, TILE), dtype=np.float32)
+        for band, sigma in enumerate(BANDS):
+            for i in range(TILES_PER_BAND):
+                white = np.random.default_rng([VERSION, band, i]).standard_normal((TILE, TILE), dtype=np.float32)
+                if sigma <= 0:
+                    tiles[band, i] = white
+                    continue
+                # blur across the wrapped edges so the tile stays periodic
+                pad = len(blur_kernel(sigma)) // 2
+                wrapped = cv2.copyMakeBorder(white, pad, pad, pad, pad, cv2.BORDER_WRAP)
+                blurred = cv2.GaussianBlur(wrapped, (2 * pad + 1, 2 * pad + 1), sigma)
+                tiles[band, i] = blurred[pad:pad + TILE, pad:pad + TILE] / np.float32(blurred_std(sigma))
+        # write under a private name and rename, so concurrent builders never see a partial file
+        part = f"{self.path}.{os.getpid()}.part"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(part, "wb") as f:
+                np.save(f, tiles)
+            os.replace(part, self.path)
+        except OSError:
+            pass
+        loaded = self._load()
+        if loaded is None:
+            tiles.flags.writeable = False
+            return tiles
+        return loaded
+
+    def gaussian(self, rng: np.random.Generator, shape: tuple[int, ...], sigma: float = 0.0) -> np.ndarray:
+        """
+        float32 zero-mean, unit-std noise of `shape` ((h, w) or (h, w, channels)):
+        white for sigma 0, otherwise white noise GaussianBlurred by `sigma` px
+        (blur_kernel) and rescaled to unit std. Windows come from the band
+        just below `sigma` and are blurred the rest of the way. Frames larger
+        than a tile, where a window would repeat itself, start from white
+        noise drawn from `rng` instead.
+        """
+        h, w = shape[:2]
+        from_bank = max(h, w) <= TILE
+        band = max(i for i, s in enumerate(BANDS) if s <= sigma) if from_bank else 0
+        residual = math.sqrt(max(0.0, sigma * sigma - BANDS[band] ** 2))
+        if residual > 0:
+            band_kernel = blur_kernel(BANDS[band]) if band else np.ones(1)
+            kernel = blur_kernel(residual)
+            # unit-std band noise is white noise * band_kernel / blurred_std(band)
+            gain = np.float32(np.sum(band_kernel ** 2) / np.sum(np.convolve(band_kernel, kernel) ** 2))
+
+        planes = []
+        for _ in range(shape[2] if len(shape) == 3 else 1):
+            plane = self._window(rng, band, h, w) if from_bank else rng.standard_normal((h, w), dtype=np.float32)
+            if residual > 0:
+                plane = cv2.GaussianBlur(plane, (len(kernel), len(kernel)), residual)
+                plane *= gain
+            planes.append(plane)
+        return planes[0] if len(shape) == 2 else cv2.merge(planes)
+
+    def _window(self, rng: np.random.Generator, band: int, h: int, w: int) -> np.ndarray:
+        """An h x w window of a random tile of `band`, at a random offset (wrapping) and orientation."""
+        tile = self.tiles()[band, int(rng.integers(TILES_PER_BAND))]
+        oy, ox, orientation = (int(v) for v in rng.integers(0, (TILE, TILE, 8)))
+        transpose, flip = orientation >= 4, orientation % 4
+        rows, cols = (w, h) if transpose else (h, w)
+        window = np.empty((rows, cols), dtype=np.float32)
+        for dy, sy, ny in _spans(oy, rows, TILE):
+            for dx, sx, nx in _spans(ox, cols, TILE):
+                window[dy:dy + ny, dx:dx + nx] = tile[sy:sy + ny, sx:sx + nx]
+        if transpose:
+            window = cv2.transpose(window)
+        if flip:
+            # 1: mirror left-right, 2: upside down, 3: both
+            window = cv2.flip(window, {1: 1, 2: 0, 3: -1}[flip])
+        return window
+
+
+NOISE = NoiseBank()
@@ -1,13 +1,14 @@
 import numpy as np
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
 
 class NullTransformer(RasterTransformer):
     """
     A pass-through transformer that does nothing. Useful for testing or disabling slots.
     """
+    NATIVE_DTYPE = None  # returns its input unchanged, in either dtype
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
-        self.metadata_dictionary["null"] = True
-        return img_np
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
+        return TransformParams(null=True)
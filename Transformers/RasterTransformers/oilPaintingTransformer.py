@@ -1,7 +1,6 @@
 import numpy as np
 import cv2
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
 
 
 class OilPaintingTransformer(RasterTransformer):
@@ -11,32 +10,36 @@ class OilPaintingTransformer(RasterTransformer):
     stronger colour saturation, harder brush strokes, more vivid output.
     """
 
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("oilpaintingtransformer", {})
 
         # Brush size (neighbourhood radius): 1-9, odd preferred
         size = t_config.get("size")
         if not isinstance(size, int):
-            size = random.choice([3, 4, 5, 6, 7, 8])
+            size = int(rng.choice([3, 4, 5, 6, 7, 8]))
 
         # Histogram bins: higher = more colour detail preserved
         dyn_ratio = t_config.get("dyn_ratio")
         if not isinstance(dyn_ratio, int):
-            dyn_ratio = random.randint(1, 8)
+            dyn_ratio = int(rng.integers(1, 8, endpoint=True))
 
-        self.metadata_dictionary["size"]      = size
-        self.metadata_dictionary["dyn_ratio"] = dyn_ratio
+        return TransformParams(size=size, dyn_ratio=dyn_ratio)
 
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
         img = self.to_uint8(img_np)
+        size = self.scale_px(params.size, scale)
 
         # cv2.xphoto.oilPainting expects uint8 BGR
         try:
-            out = cv2.xphoto.oilPainting(img, size, dyn_ratio)
+            out = cv2.xphoto.oilPainting(img, size, params.dyn_ratio)
         except AttributeError:
             # xphoto not available — fall back to bilateral filter approximation
             out = cv2.bilateralFilter(img, size * 2 + 1, 75, 75)
 
-        return self.to_float32(out)
+        return out
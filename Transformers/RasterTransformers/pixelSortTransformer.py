@@ -1,6 +1,7 @@
+import cv2
 import numpy as np
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .imageContext import CONTEXTS
 
 
 class PixelSortTransformer(RasterTransformer):
@@ -13,38 +14,39 @@ class PixelSortTransformer(RasterTransformer):
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("pixelsorttransformer", {})
 
         # Direction: rows (horizontal streaks) or cols (vertical streaks)
         direction = t_config.get("direction")
         if not isinstance(direction, str) or direction not in ("rows", "cols"):
-            direction = random.choice(("rows", "cols"))
+            direction = str(rng.choice(("rows", "cols")))
 
         # Sort key: brightness, saturation, or red/green/blue channel
         sort_key = t_config.get("sort_key")
         if not isinstance(sort_key, str) or sort_key not in ("brightness", "saturation", "red", "green", "blue"):
-            sort_key = random.choice(("brightness", "brightness", "saturation", "red", "green", "blue"))
+            sort_key = str(rng.choice(("brightness", "brightness", "saturation", "red", "green", "blue")))
 
         # Threshold: only pixels with key value in [low, high] are sorted
         low  = t_config.get("threshold_low")
         high = t_config.get("threshold_high")
         if not isinstance(low, (int, float)):
-            low = random.uniform(0.05, 0.35)
+            low = rng.uniform(0.05, 0.35)
         if not isinstance(high, (int, float)):
-            high = random.uniform(0.55, 0.95)
+            high = rng.uniform(0.55, 0.95)
         low, high = float(min(low, high)), float(max(low, high))
 
-        self.metadata_dictionary["direction"] = direction
-        self.metadata_dictionary["sort_key"]  = sort_key
-        self.metadata_dictionary["low"]       = round(low, 2)
-        self.metadata_dictionary["high"]      = round(high, 2)
+        return TransformParams(direction=direction, sort_key=sort_key, low=low, high=high)
 
-        img = img_np.copy()  # float32 [0,1], BGR channel order from pipeline
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        direction, sort_key, low, high = params.direction, params.sort_key, params.low, params.high
+
+        img = img_np  # float32 [0,1], BGR channel order from pipeline; not modified
 
         # Build sort-key map (float32 [0,1], same H×W)
         if sort_key == "brightness":
-            key_map = img[..., 0] * 0.114 + img[..., 1] * 0.587 + img[..., 2] * 0.299
+            key_map = CONTEXTS.of(img_np).gray(cv2.COLOR_BGR2GRAY)
         elif sort_key == "saturation":
             cmax = img.max(axis=2)
             cmin = img.min(axis=2)
@@ -59,28 +61,49 @@ class PixelSortTransformer(RasterTransformer):
         mask = (key_map >= low) & (key_map <= high)
 
         if direction == "rows":
-            for y in range(img.shape[0]):
-                indices = np.where(mask[y])[0]
-                if len(indices) < 2:
-                    continue
-                for run in _contiguous_runs(indices):
-                    order = np.argsort(key_map[y, run])
-                    img[y, run] = img[y, run[order]]
-        else:
-            for x in range(img.shape[1]):
-                indices = np.where(mask[:, x])[0]
-                if len(indices) < 2:
-                    continue
-                for run in _contiguous_runs(indices):
-                    order = np.argsort(key_map[run, x])
-                    img[run, x] = img[run, x][order]
-
-        return img
-
-
-def _contiguous_runs(indices: np.ndarray) -> list[np.ndarray]:
-    """Split sorted index array into contiguous runs using vectorized numpy."""
-    if len(indices) < 2:
-        return [indices] if len(indices) == 1 else []
-    breaks = np.where(np.diff(indices) > 1)[0] + 1
-    return np.split(indices, breaks)
+            return _sort_runs(img, key_map, mask)
+        # columns are sorted as the rows of a transposed contiguous copy
+        sorted_t = _sort_runs(np.ascontiguousarray(img.transpose(1, 0, 2)),
+                              np.ascontiguousarray(key_map.T), np.ascontiguousarray(mask.T))
+        return np.ascontiguousarray(sorted_t.transpose(1, 0, 2))
+
+
+# Bits of a packed sort entry taken by the key: any non-negative float32 as uint32
+_KEY_BITS = 31
+# Rows sorted per np.sort call; keeps each band's entries in cache
+_BAND_ROWS = 64
+
+
+def _sort_runs(img: np.ndarray, key_map: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Sort the pixels of every contiguous in-mask run of each row of img by
+    key_map, all runs at once. Each in-mask pixel becomes one uint64
+    (run id, key bits, column): non-negative float32 keys order like their
+    bit patterns and the column makes entries unique, so one np.sort gives
+    every run in key order, equal keys in their original order. Rows are
+    processed in bands small enough for the run ids to fit.
+    """
+    h, w = mask.shape
+    col_bits = max(1, (w - 1).bit_length())
+    band = max(1, min(_BAND_ROWS, ((1 << (64 - _KEY_BITS - col_bits)) - 1) // (w // 2 + 1)))
+    columns = np.arange(w, dtype=np.uint64)
+    key_bits = np.ascontiguousarray(key_map, dtype=np.float32).view(np.uint32)
+
+    perm = np.arange(h * w)
+    for y0 in range(0, h, band):
+        in_run = mask[y0:y0 + band]
+        starts = in_run.copy()
+        starts[:, 1:] &= ~in_run[:, :-1]
+        run_id = np.cumsum(starts, dtype=np.uint64).reshape(in_run.shape)[in_run]
+        if len(run_id) < 2:
+            continue
+        cols = np.broadcast_to(columns, in_run.shape)[in_run]
+        packed = run_id << np.uint64(_KEY_BITS + col_bits)
+        packed |= key_bits[y0:y0 + band][in_run].astype(np.uint64) << np.uint64(col_bits)
+        packed |= cols
+        packed.sort()
+        # a run keeps its positions, so sorted entry i lands where in-run pixel i was
+        positions = np.flatnonzero(in_run) + y0 * w
+        perm[positions] = positions - cols.astype(np.int64) + (packed & np.uint64((1 << col_bits) - 1)).astype(np.int64)
+
+    return img.reshape(h * w, -1).take(perm, axis=0).reshape(img.shape)
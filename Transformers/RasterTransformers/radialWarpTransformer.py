@@ -1,8 +1,8 @@
 import cv2 
 import numpy as np 
-import random
 from typing import Optional, TypeAlias
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES
 
 OptionalInt: TypeAlias = Optional[int] 
 DEFAULT_COUNT = 1
@@ -14,25 +14,25 @@ class RadialWarpTransformer(RasterTransformer):
     """
     Applies localized radial push/pull warps to the image.
     """
+    NATIVE_DTYPE = None  # remaps either dtype
+    MAP_STEP = 1  # displacement steps at each rim and is undefined at each centre; already evaluated per ROI only
+
     def __init__(self):
         super().__init__()
         self.allowed_styles = ["push", "pull"]
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
-        img_np = self.to_uint8(img_np)
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("radialwarptransformer", {})
 
-        height, width = img_np.shape[:2]
-
         # --- Parameter Handling ---
         count = t_config.get("count", "?")
         if not isinstance(count, int):
-            count = random.randint(1, 3)
+            count = int(rng.integers(1, 3, endpoint=True))
 
         style = t_config.get("style", "?")
         if isinstance(style, str):
             if style == "?": 
-                style = [random.choice(self.allowed_styles) for _ in range(count)]
+                style = [str(rng.choice(self.allowed_styles)) for _ in range(count)]
             else: 
                 style = [style]
         elif not isinstance(style, list): 
@@ -40,7 +40,7 @@ class RadialWarpTransformer(RasterTransformer):
 
         strength = t_config.get("strength", "?")
         if isinstance(strength, str):
-            strength = [random.uniform(DEFAULT_STRENGTH // 2, DEFAULT_STRENGTH * 2) for _ in range(count)]
+            strength = [float(rng.uniform(DEFAULT_STRENGTH // 2, DEFAULT_STRENGTH * 2)) for _ in range(count)]
         elif not isinstance(strength, list):
             strength = [strength]
             
@@ -48,7 +48,7 @@ class RadialWarpTransformer(RasterTransformer):
         if isinstance(center_x, list):
             center_x = [float(v) for v in center_x]
         elif center_x is None or center_x == "?":
-            center_x = [random.uniform(0.0, 1.0) for _ in range(count)]
+            center_x = [float(rng.uniform(0.0, 1.0)) for _ in range(count)]
         else: 
             center_x = [float(center_x)]
 
@@ -56,7 +56,7 @@ class RadialWarpTransformer(RasterTransformer):
         if isinstance(center_y, list):
             center_y = [float(v) for v in center_y]
         elif center_y is None or center_y == "?":
-            center_y = [random.uniform(0.0, 1.0) for _ in range(count)]
+            center_y = [float(rng.uniform(0.0, 1.0)) for _ in range(count)]
         else: 
             center_y = [float(center_y)]
 
@@ -64,38 +64,39 @@ class RadialWarpTransformer(RasterTransformer):
         if isinstance(radius, list):
             radius = [float(v) for v in radius]
         elif radius is None or radius == "?":
-            radius = [random.uniform(0.08, 0.25) for _ in range(count)]
+            radius = [float(rng.uniform(0.08, 0.25)) for _ in range(count)]
         else: 
             radius = [float(radius)]
 
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["style"] = style
-        self.metadata_dictionary["strength"] = strength
-        self.metadata_dictionary["radius"] = radius
+        return TransformParams(count=count, style=tuple(style), strength=tuple(strength),
+                               center_x=tuple(center_x), center_y=tuple(center_y), radius=tuple(radius))
+
+    def describe(self, params: TransformParams) -> dict:
+        return {"style": list(params.style), "strength": list(params.strength), "radius": list(params.radius)}
+
+    def build_map(self, shape: tuple[int, int], params: TransformParams,
+                  rng: np.random.Generator, scale: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+        height, width = shape
 
         # Extend lists
-        strength = (strength * count)[:count]
-        center_x = (center_x * count)[:count]
-        center_y = (center_y * count)[:count]
-        radius = (radius * count)[:count]
-        style = (style * count)[:count]
+        count = params.count
+        strength = list(params.strength * count)[:count]
+        center_x = list(params.center_x * count)[:count]
+        center_y = list(params.center_y * count)[:count]
+        radius = list(params.radius * count)[:count]
+        style = list(params.style * count)[:count]
 
         # Convert to pixels
-        try:
-            px_center_x = np.clip([v * width for v in center_x], 0, width - 1).astype(int)
-            px_center_y = np.clip([v * height for v in center_y], 0, height - 1).astype(int)
-            px_radius = np.clip([v * min(height, width) for v in radius], 1, min(height, width)).astype(int)
-        except Exception as e:
-            self.log.error(f"Could not convert coordinate percentages: {e}")
-            return self.to_float32(img_np)
+        px_center_x = np.clip([v * width for v in center_x], 0, width - 1).astype(int)
+        px_center_y = np.clip([v * height for v in center_y], 0, height - 1).astype(int)
+        px_radius = np.clip([v * min(height, width) for v in radius], 1, min(height, width)).astype(int)
 
         # --- OPTIMIZED WARP LOGIC ---
-        map_x, map_y = np.meshgrid(np.arange(width, dtype=np.float32), 
-                                   np.arange(height, dtype=np.float32))
+        map_x, map_y = (field.copy() for field in COORDINATES.grid(height, width))  # displaced in place below
 
         for i in range(count):
             cx, cy, r = px_center_x[i], px_center_y[i], px_radius[i]
-            s = strength[i]
+            s = self.scale_px(float(strength[i]), scale, minimum=0.0)
             direction = 1.0 if style[i] == 'push' else -1.0
 
             x1, x2 = max(0, cx - r), min(width, cx + r + 1)
@@ -127,9 +128,4 @@ class RadialWarpTransformer(RasterTransformer):
             roi_map_x[mask] += (dx[mask] / dist) * shift
             roi_map_y[mask] += (dy[mask] / dist) * shift
 
-        try:
-            warped = cv2.remap(img_np, map_x, map_y, interpolation=cv2.INTER_LINEAR)
-            return self.to_float32(warped)
-        except Exception as e:
-            self.log.critical(f"Error during final remap: {e}")
-            return self.to_float32(img_np)
+        return map_x, map_y
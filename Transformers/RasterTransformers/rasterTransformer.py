@@ -1,26 +1,105 @@
+import cv2
 import numpy as np #type: ignore
+from collections.abc import Iterator, Mapping
+from typing import Any
 from ..transformer import Transformer
+from .coordinateCache import COORDINATES
+from .colorLut import ColorLUT, LutChain
+
+
+class TransformParams(Mapping):
+    """
+    Immutable, picklable set of parameters sampled by sample_params().
+    Read as a mapping (params["shift"]) or by attribute (params.shift).
+    Store sequences as tuples so the whole set stays hashable.
+    """
+    __slots__ = ("_items",)
+
+    def __init__(self, items: Mapping[str, Any] | None = None, **kwargs: Any):
+        object.__setattr__(self, "_items", {**(items or {}), **kwargs})
+
+    def __getitem__(self, key: str) -> Any:
+        return self._items[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._items[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("TransformParams is immutable")
+
+    def __hash__(self) -> int:
+        return hash(tuple(sorted(self._items.items())))
+
+    def __reduce__(self):
+        return (TransformParams, (dict(self._items),))
+
+    def __repr__(self) -> str:
+        return f"TransformParams({self._items!r})"
+
+
 class RasterTransformer(Transformer):
     """
     The concrete base class for all image/raster based transformers.
+
+    Contract: sample_params(rng) draws every random choice up front into an
+    immutable TransformParams, and apply(img, params, rng, scale) is pure —
+    it reads neither global RNG state nor instance attributes that change
+    per image, so one instance can serve many threads and a params/seed pair
+    replays exactly. run() is the one-call convenience built on the two.
+
+    Warps implement build_map() instead of apply(): it returns the remap
+    coordinates, apply() resamples with them, and the pipeline can compose
+    consecutive warps into a single cv2.remap. warp_map() evaluates smooth
+    fields on a coarse grid and upsamples them.
+
+    Point operations (each output pixel a function of its input colour and
+    whole-image statistics) implement point_lut() instead: it returns a
+    ColorLUT, and the pipeline composes consecutive ones into one table.
+
+    Transformers that draw noise sized to the frame set FRAME_NOISE and
+    draw it for noise_frame(), the full-resolution frame, resampling it to
+    the frame they render; a proxy pass or a replay at another size then
+    gets the same noise as the full render.
     """
+    # dtype apply() takes and returns: np.float32 ([0, 1]), np.uint8, or None for
+    # "either, returned as given" (remap warps). The pipeline carries the image in
+    # whatever dtype the next transformer wants and converts only on a mismatch.
+    NATIVE_DTYPE: type | None = np.float32
+    # (interpolation, border) used when a warp's map is applied; see remap_mode()
+    REMAP_INTERPOLATION = cv2.INTER_LINEAR
+    REMAP_BORDER = cv2.BORDER_CONSTANT
+    # warp_map() evaluates build_map() every MAP_STEP pixels and upsamples
+    # bicubically; warps whose field has seams or fine detail set 1 (opt out)
+    MAP_STEP = 4
+    # apply()/build_map() draw noise sized to the frame: the pipeline records the
+    # full-resolution (rows, cols) in their params as "noise_size"; see noise_frame()
+    FRAME_NOISE = False
+    # a proxy render (proxy_scale) grades like the full render; transformers whose
+    # detail is finer than a proxy pixel set False, and their chains skip the proxy
+    PROXY_SAFE = True
+
     def __init__(self):
         # 1. Call super() to get self.config and self.log from ScreenArt
         super().__init__()
         self.metadata_dictionary = {}
 
-    def get_image_metadata(self) -> str:
-        """Generically converts self.metadata_dictionary into a string.
-        Format: "Key:Value;Key:Value"
-        If empty, returns the Class Name.
-        """
-        if not self.metadata_dictionary:
-            self.log.warning(f"No metadata_dictionary for {self.__class__.__name__}")
-            return ""
-        
+    @staticmethod
+    def format_metadata(metadata: Mapping[str, Any]) -> str:
+        """Format a metadata mapping as "key=value,key=value" (sorted keys)."""
         # Sort keys to ensure consistent filename strings regardless of insertion order
         parts = []
-        for k, v in sorted(self.metadata_dictionary.items()):
+        for k, v in sorted(metadata.items()):
             # specialized formatting for lists/tuples to keep them short
             if isinstance(v, (list, tuple)):
                 val_str = ','.join(str(i) for i in v)
@@ -33,22 +112,245 @@ class RasterTransformer(Transformer):
             
         return ",".join(parts)
 
-    # In rasterTransformer.py — add these two helpers
-    def to_uint8(self, img_np: np.ndarray) -> np.ndarray:
+    def get_image_metadata(self) -> str:
+        """Generically converts self.metadata_dictionary into a string.
+        Format: "Key:Value;Key:Value"
+        If empty, returns the Class Name.
+        """
+        if not self.metadata_dictionary:
+            self.log.warning(f"No metadata_dictionary for {self.__class__.__name__}")
+            return ""
+        return self.format_metadata(self.metadata_dictionary)
+
+    @staticmethod
+    def to_uint8(img_np: np.ndarray) -> np.ndarray:
         """Convert float32 [0,1] pipeline format to uint8 for PIL/cv2 operations."""
         if img_np.dtype == np.float32 or img_np.dtype == np.float64:
             return np.clip(img_np * 255.0, 0, 255).astype(np.uint8)
         return img_np
 
-    def to_float32(self, img_np: np.ndarray) -> np.ndarray:
+    @staticmethod
+    def to_float32(img_np: np.ndarray) -> np.ndarray:
         """Convert uint8 back to float32 [0,1] for pipeline return."""
         if img_np.dtype == np.uint8:
             return img_np.astype(np.float32) / 255.0
         return img_np
 
+    @staticmethod
+    def scale_px(value, scale: float, minimum: float = 1):
+        """
+        Scale a pixel-unit parameter (shift, radius, dot size, spacing) chosen
+        for full resolution to an image rendered at `scale` times that size.
+        Integers stay integers and the result never drops below `minimum`.
+        """
+        if scale == 1.0:
+            return value
+        if isinstance(value, int):
+            return max(int(minimum), int(round(value * scale)))
+        return max(minimum, value * scale)
+
+    @staticmethod
+    def noise_frame(params: TransformParams, shape: tuple[int, ...],
+                    scale: float) -> tuple[tuple[int, int], float]:
+        """
+        ((rows, cols), scale) of the frame to draw frame-sized noise for:
+        the full-resolution frame the pipeline recorded as
+        params["noise_size"], at scale 1, so every render size draws the
+        same noise and resamples it to `shape`; for params recorded without
+        it, `shape` itself at `scale`, as they were rendered.
+        """
+        size = params.get("noise_size")
+        if size is None:
+            return (shape[0], shape[1]), scale
+        return (int(size[0]), int(size[1])), 1.0
+
+    @staticmethod
+    def cell_index(n: int, cell: float, cells: int) -> np.ndarray:
+        """For each of n pixels, the index of the `cell`-pixel cell its centre falls in, at most cells - 1."""
+        return np.minimum(((np.arange(n) + 0.5) / cell).astype(np.intp), cells - 1)
+
+    @classmethod
+    def block_maps(cls, h: int, w: int, block: float | tuple[float, float], dx: np.ndarray | None = None,
+                   dy: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        float32 (map_x, map_y) for a nearest-pixel cv2.remap: each pixel's
+        own coordinate plus the offsets (dx, dy) of the block its centre
+        falls in (cell_index()). dx and dy hold one value per block; `block`
+        is its size in pixels, one number or (rows, cols), and need not be
+        whole, so blocks drawn for another resolution resample by nearest
+        block. A map without offsets (None) is the cached read-only grid.
+        Only one row per block row is expanded, and it is broadcast down the
+        block's rows as it is added to the grid.
+        """
+        block_y, block_x = block if isinstance(block, tuple) else (block, block)
+        if float(block_y).is_integer() and block_y == block_x and all(
+                o is None or np.shape(o) == (-(-h // int(block_y)), -(-w // int(block_y))) for o in (dx, dy)):
+            return cls._whole_block_maps(h, w, int(block_y), dx, dy)
+        maps = []
+        for grid, offsets in zip(COORDINATES.grid(h, w), (dx, dy)):
+            if offsets is None:
+                maps.append(grid)
+                continue
+            offsets = np.asarray(offsets, dtype=np.float32)
+            rows = np.take(offsets, cls.cell_index(w, block_x, offsets.shape[1]), axis=1)
+            # cell_index() is non-decreasing, so each block row covers one run of pixel rows
+            starts = np.searchsorted(cls.cell_index(h, block_y, offsets.shape[0]), np.arange(len(rows) + 1))
+            field = np.empty((h, w), dtype=np.float32)
+            for row, (top, bottom) in enumerate(zip(starts[:-1], starts[1:])):
+                np.add(grid[top:bottom], rows[row], out=field[top:bottom])
+            maps.append(field)
+        return maps[0], maps[1]
+
+    @staticmethod
+    def _whole_block_maps(h: int, w: int, block: int, dx: np.ndarray | None,
+                          dy: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        """block_maps() for a whole-pixel square block and one offset per ceil(h / block) x ceil(w / block) tile."""
+        small_h, small_w = -(-h // block), -(-w // block)
+        maps = []
+        for grid, offsets in zip(COORDINATES.grid(small_h * block, small_w * block), (dx, dy)):
+            if offsets is None:
+                maps.append(grid[:h, :w])
+                continue
+            rows = np.repeat(np.asarray(offsets, dtype=np.float32), block, axis=1)
+            field = np.add(grid.reshape(small_h, block, small_w * block), rows[:, None])
+            maps.append(field.reshape(small_h * block, small_w * block)[:h, :w])
+        return maps[0], maps[1]
+
+    def with_noise_size(self, params: TransformParams, size: tuple[int, int]) -> TransformParams:
+        """`params` plus the full-resolution (rows, cols) as "noise_size" when FRAME_NOISE is set."""
+        if not self.FRAME_NOISE:
+            return params
+        return TransformParams(params, noise_size=(int(size[0]), int(size[1])))
+
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
+        """
+        Draw this transformer's parameters (config values win over random
+        ones). Every random choice that shapes the result belongs here, drawn
+        from `rng`, never from the global random/np.random state.
+        """
+        return TransformParams()
+
+    def warm_up(self) -> None:
+        """
+        Build now whatever is slow to build on first use (numba kernels), so
+        it is not paid by the first image. Pool workers call this from their
+        initializer.
+        """
+        return None
+
+    def describe(self, params: TransformParams) -> dict[str, Any]:
+        """The metadata logged for `params`; override to rename, round or hide keys."""
+        return {key: value for key, value in params.items() if key != "noise_size"}
+
+    def build_map(self, shape: tuple[int, int], params: TransformParams,
+                  rng: np.random.Generator, scale: float = 1.0) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        For warps: float32 (map_x, map_y) of shape (H, W) giving, for every
+        output pixel, the source coordinate to sample. None for transformers
+        that are not a pure coordinate remap.
+        """
+        return None
+
+    def map_step(self, params: TransformParams, scale: float) -> int:
+        """Coarse-grid spacing for warp_map(); override when it depends on params."""
+        return self.MAP_STEP
+
+    def warp_map(self, shape: tuple[int, int], params: TransformParams,
+                 rng: np.random.Generator, scale: float = 1.0) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        build_map() for the full frame, evaluated on a grid map_step() times
+        coarser (at the matching scale) and upsampled with bicubic
+        cv2.resize. Coarse index i stands for full pixel i * f, so a centre
+        at W/2 stays put, and only the displacement from the identity is
+        interpolated, so frame edges stay exact. Disabled by
+        "pipeline": {"coarse_maps": false}.
+        """
+        h, w = shape
+        step = self.map_step(params, scale) if self.config.get("pipeline", {}).get("coarse_maps", True) else 1
+        if step <= 1 or h < 8 * step or w < 8 * step:
+            return self.build_map(shape, params, rng, scale)
+
+        hc, wc = -(-h // step), -(-w // step)
+        maps = self.build_map((hc, wc), params, rng, scale * wc / w)
+        if maps is None:
+            return None
+        fx, fy = w / wc, h / hc
+        # cv2.resize samples coarse (x + 0.5) / f - 0.5; pre-shifting the small
+        # coarse field by (f - 1) / 2f makes that exactly x / f
+        shift = np.float32([[1.0, 0.0, (fx - 1.0) / (2.0 * fx)], [0.0, 1.0, (fy - 1.0) / (2.0 * fy)]])
+        upsampled = []
+        for coarse, coarse_grid, full_grid, f in zip(maps, COORDINATES.grid(hc, wc), COORDINATES.grid(h, w), (fx, fy)):
+            displacement = cv2.warpAffine(coarse - coarse_grid, shift, (wc, hc),
+                                          flags=cv2.INTER_CUBIC | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+            full = cv2.resize(displacement, (w, h), interpolation=cv2.INTER_CUBIC)
+            full *= f
+            full += full_grid
+            upsampled.append(full)
+        return upsampled[0], upsampled[1]
+
+    @property
+    def is_warp(self) -> bool:
+        return type(self).build_map is not RasterTransformer.build_map
+
+    def remap_mode(self) -> tuple[int, int]:
+        """(cv2 interpolation, cv2 border mode) this warp resamples with."""
+        return self.REMAP_INTERPOLATION, self.REMAP_BORDER
+
+    def remap(self, img_np: np.ndarray, map_x: np.ndarray, map_y: np.ndarray) -> np.ndarray:
+        """
+        Resample img_np with float32 maps. "pipeline": {"fixed_point_maps":
+        true} converts them to CV_16SC2 first (1/32 px), which pays off on
+        OpenCV builds where fixed-point remap is markedly faster.
+        """
+        interpolation, border = self.remap_mode()
+        if self.config.get("pipeline", {}).get("fixed_point_maps", False):
+            map_x, map_y = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2,
+                                           nninterpolation=interpolation == cv2.INTER_NEAREST)
+        return cv2.remap(img_np, map_x, map_y, interpolation=interpolation, borderMode=border)
+
+    def point_lut(self, params: TransformParams, stats: LutChain) -> ColorLUT | None:
+        """
+        For point operations: the uint8 colour mapping as a ColorLUT. Per-image
+        statistics (histogram equalisation, percentile stretch) are folded
+        into the table from stats.gray_histogram(), the histogram of the
+        image this step will see. None for everything else.
+        """
+        return None
+
+    @property
+    def is_point_op(self) -> bool:
+        return type(self).point_lut is not RasterTransformer.point_lut
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        """
+        Render `params` onto img_np and return a new image, both in
+        NATIVE_DTYPE (float32 [0,1] by default; warps take either).
+        `rng` feeds image-sized noise only. `scale` is the image's size
+        relative to the full-resolution render; pixel-unit parameters go
+        through scale_px(). Default: the point_lut() table, a remap with
+        warp_map(), or pass-through.
+        """
+        if self.is_point_op:
+            chain = LutChain(img_np)
+            chain.append(self.point_lut(params, chain))
+            return chain.apply()
+        maps = self.warp_map(img_np.shape[:2], params, rng, scale)
+        if maps is None:
+            return img_np
+        return self.remap(img_np, *maps)
+
     def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
         """
-        Replaces apply(). Takes an image array and returns an image array.
-        Default is pass-through; concrete children will override this.
+        Sample and apply in one call. kwargs: rng (np.random.Generator,
+        default a fresh one) and scale (default 1.0). Records the parameters
+        in metadata_dictionary, so unlike apply() it mutates the instance.
+        Accepts and returns float32 [0,1] whatever NATIVE_DTYPE is.
         """
-        return img_np
+        rng = kwargs.get("rng") or np.random.default_rng()
+        scale = kwargs.get("scale", 1.0)
+        h, w = img_np.shape[:2]
+        params = self.with_noise_size(self.sample_params(rng), (round(h / scale), round(w / scale)))
+        self.metadata_dictionary = self.describe(params)
+        img_np = self.to_uint8(img_np) if self.NATIVE_DTYPE == np.uint8 else self.to_float32(img_np)
+        return self.to_float32(self.apply(img_np, params, rng, scale=scale))
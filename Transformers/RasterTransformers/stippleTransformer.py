@@ -1,7 +1,23 @@
+import functools
+import math
+import os
+
 import numpy as np
 import cv2
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .imageContext import CONTEXTS
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is only in requirements-linux.txt; dots fall back to cv2.circle
+    njit = None
+    prange = range
+
+# Rows of the canvas per parallel work item of the splat kernel
+_BAND_ROWS = 64
+# Side of the tileable blue-noise jitter tile, and the file its ranks ship in
+_BLUE_NOISE_SIZE = 64
+_BLUE_NOISE_PATH = os.path.join(os.path.dirname(__file__), "Data", "blue_noise_64.npy")
 
 
 class StippleTransformer(RasterTransformer):
@@ -10,38 +26,61 @@ class StippleTransformer(RasterTransformer):
     Darker areas get more densely packed dots; bright areas are sparse.
     Each dot takes the colour of its source pixel.
     Produces a distinctive pointillist / screen-print aesthetic.
+
+    Dot centres, radii and colours are computed as arrays and splatted as
+    anti-aliased discs by a numba kernel, in parallel over bands of rows.
+    Jitter is white (independent per dot) or blue (read from a tileable
+    blue-noise tile, so neighbouring dots never clump).
     """
 
+    NATIVE_DTYPE = np.uint8
+    FRAME_NOISE = True
+    PROXY_SAFE = False  # dots a few px wide: a proxy cannot draw them
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("stippletransformer", {})
 
         # Dot radius in pixels
         dot_radius = t_config.get("dot_radius")
         if not isinstance(dot_radius, int):
-            dot_radius = random.randint(2, 6)
+            dot_radius = int(rng.integers(2, 6, endpoint=True))
 
         # Grid spacing: distance between dot centres
         spacing = t_config.get("spacing")
         if not isinstance(spacing, int):
-            spacing = random.randint(dot_radius * 2, dot_radius * 4)
+            spacing = int(rng.integers(dot_radius * 2, dot_radius * 4, endpoint=True))
 
         # Background colour: "white", "black", or "complement"
         bg = t_config.get("background")
         if not isinstance(bg, str) or bg not in ("white", "black", "complement"):
-            bg = random.choice(("white", "black", "complement"))
+            bg = str(rng.choice(("white", "black", "complement")))
 
         # Jitter: randomly offset each dot centre slightly
         jitter = t_config.get("jitter", True)
         if isinstance(jitter, str):
             jitter = True
 
-        self.metadata_dictionary["dot_radius"] = dot_radius
-        self.metadata_dictionary["spacing"]    = spacing
-        self.metadata_dictionary["bg"]         = bg
-        self.metadata_dictionary["jitter"]     = int(jitter)
+        # Jitter noise: "white" (independent per dot) or "blue" (blue-noise tile)
+        jitter_noise = t_config.get("jitter_noise")
+        if jitter_noise not in ("white", "blue"):
+            jitter_noise = "blue"
+
+        return TransformParams(dot_radius=dot_radius, spacing=spacing, bg=bg, jitter=int(jitter),
+                               jitter_noise=jitter_noise)
+
+    def warm_up(self) -> None:
+        # compiles _splat_discs, or loads it from the numba cache, for the types apply() passes
+        if njit is not None:
+            self.apply(np.zeros((16, 16, 3), dtype=np.uint8),
+                       TransformParams(dot_radius=2, spacing=4, bg="black", jitter=0), np.random.default_rng(0))
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        bg = params.bg
+        dot_radius = self.scale_px(params.dot_radius, scale)
 
         img = self.to_uint8(img_np)
         h, w = img.shape[:2]
@@ -54,25 +93,177 @@ class StippleTransformer(RasterTransformer):
         else:  # complement: invert the image as background
             canvas = (255 - img)
 
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
+        gray = CONTEXTS.of(img).gray(cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
 
+        # The grid and its jitter are laid out in full-resolution pixels, then scaled to this frame
+        (noise_h, noise_w), noise_scale = self.noise_frame(params, (h, w), scale)
+        spacing = self.scale_px(params.spacing, noise_scale, minimum=2)
         half = spacing // 2
-        for y in range(half, h - half, spacing):
-            for x in range(half, w - half, spacing):
-                # Brightness at this grid point (inverted: dark = big dot)
-                brightness = float(gray[y, x])
-                # Dot size scales inversely with brightness
-                r = max(1, int(dot_radius * (1.0 - brightness * 0.7)))
-
-                if jitter:
-                    jx = random.randint(-half // 2, half // 2)
-                    jy = random.randint(-half // 2, half // 2)
-                    px = max(0, min(w - 1, x + jx))
-                    py = max(0, min(h - 1, y + jy))
-                else:
-                    px, py = x, y
-
-                colour = img[py, px].tolist()
-                cv2.circle(canvas, (px, py), r, colour, -1, cv2.LINE_AA)
-
-        return self.to_float32(canvas)
+        grid_y = np.arange(half, noise_h - half, spacing)
+        grid_x = np.arange(half, noise_w - half, spacing)
+        if len(grid_y) == 0 or len(grid_x) == 0:
+            return canvas
+
+        # offsets in [-half // 2, half // 2]: one more to the left/top for odd half
+        low, high = -half // 2, half // 2
+        shape = (len(grid_y), len(grid_x))
+        if params.jitter and params.get("jitter_noise", "white") == "blue":
+            jx, jy = _blue_noise_jitter(shape, low, high, rng)
+        elif params.jitter:
+            # one draw per dot, x then y, in grid order
+            offsets = rng.integers(low, high, size=shape + (2,), endpoint=True)
+            jx, jy = offsets[..., 0], offsets[..., 1]
+        else:
+            jx = jy = np.zeros(shape, dtype=np.int64)
+            low = 0
+        if (noise_h, noise_w) != (h, w):
+            fy, fx = h / noise_h, w / noise_w
+            jy = np.rint((grid_y[:, None] + jy) * fy).astype(np.int64)
+            jx = np.rint((grid_x[None, :] + jx) * fx).astype(np.int64)
+            grid_y = np.rint(grid_y * fy).astype(np.int64)
+            grid_x = np.rint(grid_x * fx).astype(np.int64)
+            jy -= grid_y[:, None]
+            jx -= grid_x[None, :]
+            low = math.floor(low * max(fx, fy)) - 1
+        gy, gx = np.meshgrid(np.minimum(grid_y, h - 1), np.minimum(grid_x, w - 1), indexing="ij")
+
+        # Dot size scales inversely with brightness at the grid point (dark = big dot)
+        brightness = gray[gy, gx].astype(np.float64)
+        radii = np.maximum(1, (dot_radius * (1.0 - brightness * 0.7)).astype(np.int64)).ravel()
+
+        px = np.clip(gx + jx, 0, w - 1).ravel()
+        py = np.clip(gy + jy, 0, h - 1).ravel()
+        colours = img[py, px]
+
+        if njit is None:
+            for x, y, r, colour in zip(px.tolist(), py.tolist(), radii.tolist(), colours.tolist()):
+                cv2.circle(canvas, (x, y), r, colour, -1, cv2.LINE_AA)
+            return canvas
+
+        # dots of grid row k reach rows grid_y[k] ± extent; give each band the grid rows that reach it
+        extent = -low + int(radii.max()) + 1
+        band_top = np.arange(0, h, _BAND_ROWS)
+        first_row = np.searchsorted(grid_y + extent, band_top, side="left")
+        end_row = np.searchsorted(grid_y - extent, band_top + _BAND_ROWS, side="left")
+        _splat_discs(canvas, px, py, radii, colours.astype(np.float32),
+                     first_row * len(grid_x), end_row * len(grid_x), _BAND_ROWS)
+        return canvas
+
+
+def _splat_discs_py(canvas, xs, ys, radii, colours, dot_start, dot_end, band_rows):
+    """
+    Blend anti-aliased filled discs into a uint8 canvas, in dot order.
+    Band b covers canvas rows [b * band_rows, (b + 1) * band_rows) and
+    draws dots dot_start[b]..dot_end[b]; bands are independent, so they
+    run in parallel and the result does not depend on the thread count.
+    A pixel at distance d from a centre gets coverage r + 1 - d, clipped
+    to [0, 1]: the same area as cv2.circle's LINE_AA fill.
+    """
+    h, w, channels = canvas.shape
+    for band in prange(len(dot_start)):
+        y_lo = band * band_rows
+        y_hi = min(h, y_lo + band_rows)
+        for i in range(dot_start[band], dot_end[band]):
+            cx = xs[i]
+            cy = ys[i]
+            r = radii[i]
+            top = max(y_lo, cy - r - 1)
+            bottom = min(y_hi, cy + r + 2)
+            left = max(0, cx - r - 1)
+            right = min(w, cx + r + 2)
+            for y in range(top, bottom):
+                dy = y - cy
+                for x in range(left, right):
+                    dx = x - cx
+                    cover = r + 1.0 - math.sqrt(dx * dx + dy * dy)
+                    if cover <= 0.0:
+                        continue
+                    if cover > 1.0:
+                        cover = 1.0
+                    for c in range(channels):
+                        value = float(canvas[y, x, c])
+                        canvas[y, x, c] = np.uint8(value + cover * (colours[i, c] - value) + 0.5)
+
+
+if njit is not None:
+    _splat_discs = njit(parallel=True, cache=True)(_splat_discs_py)
+
+
+@functools.lru_cache(maxsize=1)
+def _blue_noise_tile() -> np.ndarray:
+    """
+    The tileable blue-noise tile as ranks in (0, 1), loaded from
+    _BLUE_NOISE_PATH (each pixel's uint16 rank). Rebuilt with
+    _void_and_cluster() only if the file is missing.
+    """
+    size = _BLUE_NOISE_SIZE
+    try:
+        ranks = np.load(_BLUE_NOISE_PATH)
+    except (OSError, ValueError):
+        ranks = None
+    if ranks is None or ranks.shape != (size, size):
+        ranks = _void_and_cluster(size)
+    return (ranks + 0.5) / (size * size)
+
+
+def _void_and_cluster(size: int) -> np.ndarray:
+    """
+    size×size tileable blue-noise ranks (0 .. size² - 1), by
+    void-and-cluster: starting from a relaxed sparse pattern, pixels are
+    switched on one at a time in the largest void (lowest Gaussian energy,
+    toroidally wrapped), and each pixel's rank is the order it was
+    switched on in. Fixed seed: this is how _BLUE_NOISE_PATH was made.
+    """
+    coords = np.minimum(np.arange(size), size - np.arange(size)).astype(np.float64)
+    kernel = np.exp(-(coords[:, None] ** 2 + coords[None, :] ** 2) / (2 * 1.9 ** 2))
+
+    def energy_of(pattern: np.ndarray) -> np.ndarray:
+        return np.real(np.fft.ifft2(np.fft.fft2(pattern) * np.fft.fft2(kernel)))
+
+    rng = np.random.default_rng(0)
+    pattern = np.zeros((size, size))
+    pattern.flat[rng.choice(size * size, size * size // 10, replace=False)] = 1.0
+    # relax: move the tightest cluster into the largest void until they coincide
+    energy = energy_of(pattern)
+    for _ in range(size * size):
+        cluster = np.argmax(np.where(pattern > 0, energy, -np.inf))
+        pattern.flat[cluster] = 0.0
+        energy -= np.roll(kernel, np.unravel_index(cluster, pattern.shape), axis=(0, 1))
+        void = np.argmin(np.where(pattern > 0, np.inf, energy))
+        pattern.flat[void] = 1.0
+        energy += np.roll(kernel, np.unravel_index(void, pattern.shape), axis=(0, 1))
+        if void == cluster:
+            break
+
+    ranks = np.empty(size * size, dtype=np.int64)
+    # initial points ranked by removing the tightest cluster first (it gets the highest rank)
+    ones = int(pattern.sum())
+    trial, trial_energy = pattern.copy(), energy.copy()
+    for rank in range(ones - 1, -1, -1):
+        cluster = np.argmax(np.where(trial > 0, trial_energy, -np.inf))
+        trial.flat[cluster] = 0.0
+        trial_energy -= np.roll(kernel, np.unravel_index(cluster, trial.shape), axis=(0, 1))
+        ranks[cluster] = rank
+    # the rest ranked by filling the largest void
+    for rank in range(ones, size * size):
+        void = np.argmin(np.where(pattern > 0, np.inf, energy))
+        pattern.flat[void] = 1.0
+        energy += np.roll(kernel, np.unravel_index(void, pattern.shape), axis=(0, 1))
+        ranks[void] = rank
+    return ranks.astype(np.uint16).reshape(size, size)
+
+
+def _blue_noise_jitter(shape: tuple[int, int], low: int, high: int,
+                       rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """Integer (jx, jy) offsets in [low, high] for a grid of dots, read from the blue-noise tile."""
+    tile = _blue_noise_tile()
+    size = tile.shape[0]
+    oy, ox = (int(v) for v in rng.integers(0, size, size=2))
+    rows = np.arange(shape[0])[:, None]
+    cols = np.arange(shape[1])[None, :]
+    # x and y read the tile half a tile apart, so they are not the same value
+    jx = tile[(rows + oy) % size, (cols + ox) % size]
+    jy = tile[(rows + oy + size // 2) % size, (cols + ox + size // 2) % size]
+    # ranks are uniform in (0, 1), so every offset in [low, high] is equally likely
+    return (low + np.floor(jx * (high - low + 1)).astype(np.int64),
+            low + np.floor(jy * (high - low + 1)).astype(np.int64))
@@ -1,6 +1,7 @@
 import cv2 
 import numpy as np 
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES
 from typing import Optional, Tuple
 
 DEFAULT_STRENGTH = 1.25
@@ -9,13 +10,16 @@ class SwirlWarpTransformer(RasterTransformer):
     """
     Applies a swirling distortion effect to an image.
     """
+    NATIVE_DTYPE = None  # remaps either dtype
+    REMAP_BORDER = cv2.BORDER_REFLECT_101
+
     def __init__(self) -> None:
         super().__init__()
 
-    def _compute_falloff(self, r: np.ndarray, R: float) -> np.ndarray:
-        if self.falloff == "none":
+    def _compute_falloff(self, r: np.ndarray, R: float, falloff: str) -> np.ndarray:
+        if falloff == "none":
             f = np.ones_like(r)
-        elif self.falloff == "exponential":
+        elif falloff == "exponential":
             f = np.exp(-r / (R / 3.0 + 1e-6))
         else:
             sigma = R / 2.0 if R > 0 else 1.0
@@ -23,44 +27,46 @@ class SwirlWarpTransformer(RasterTransformer):
         cutoff = np.exp(-(np.maximum(r - R, 0.0) ** 2) / (2.0 * (0.25 * R + 1e-6) ** 2))
         return f * cutoff
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
-        if img_np is None or img_np.ndim < 2:
-            raise ValueError("SwirlWarpTransformer.transform: expected HxW or HxWxC image array")
-
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("swirlwarptransformer", {})
 
         # Corrected config key from 'self.strength' to 'strength'
-        self.strength = t_config.get("strength")
-        if not isinstance(self.strength, (float, int)):
-            self.strength = DEFAULT_STRENGTH
-            
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["strength"] = round(float(self.strength), 2)
-
-        h, w = img_np.shape[:2]
-        self.radius: float = w / 2.0
-        self.center: Optional[Tuple[float, float]] = (h / 2.0, w / 2.0) 
-        self.band_period: Optional[float] = None
-        self.falloff: str = "gaussian"
-        cx, cy = (self.center if self.center is not None else (w * 0.5, h * 0.5))
-        R = float(self.radius if self.radius not in (None, 0) else min(w, h) * 0.5)
-
-        xs = np.arange(w, dtype=np.float32)
-        ys = np.arange(h, dtype=np.float32)
-        map_x, map_y = np.meshgrid(xs, ys)
-
-        dx = map_x - cx
-        dy = map_y - cy
-        r = np.sqrt(dx * dx + dy * dy).astype(np.float32)
-        theta = np.arctan2(dy, dx).astype(np.float32)
-
-        fall = self._compute_falloff(r, R).astype(np.float32)
-        swirl_amount = self.strength * fall
+        strength = t_config.get("strength")
+        if not isinstance(strength, (float, int)):
+            strength = DEFAULT_STRENGTH
 
         # Band modulation is optional — without config it defaults off because sin can zero out the swirl
-        self.band_period = t_config.get("band_period", None)
-        if self.band_period and isinstance(self.band_period, (int, float)) and self.band_period > 0:
-            band = np.sin((2.0 * np.pi * r) / float(self.band_period)).astype(np.float32)
+        band_period = t_config.get("band_period", None)
+        if not (band_period and isinstance(band_period, (int, float)) and band_period > 0):
+            band_period = None
+        return TransformParams(strength=float(strength), band_period=band_period)
+
+    def map_step(self, params: TransformParams, scale: float) -> int:
+        if params.band_period is None:
+            return self.MAP_STEP
+        # Keep at least 8 samples per band
+        return max(1, min(self.MAP_STEP, int(self.scale_px(float(params.band_period), scale, minimum=0.0) / 8)))
+
+    def describe(self, params: TransformParams) -> dict:
+        return {"strength": round(params.strength, 2)}
+
+    def build_map(self, shape: tuple[int, int], params: TransformParams,
+                  rng: np.random.Generator, scale: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+        h, w = shape
+        radius: float = w / 2.0
+        center: Optional[Tuple[float, float]] = (h / 2.0, w / 2.0) 
+        falloff: str = "gaussian"
+        cx, cy = (center if center is not None else (w * 0.5, h * 0.5))
+        R = float(radius if radius not in (None, 0) else min(w, h) * 0.5)
+
+        r, theta = COORDINATES.polar(h, w, cx, cy)
+
+        fall = self._compute_falloff(r, R, falloff).astype(np.float32)
+        swirl_amount = params.strength * fall
+
+        if params.band_period is not None:
+            band_period = self.scale_px(float(params.band_period), scale, minimum=1e-3)
+            band = np.sin((2.0 * np.pi * r) / band_period).astype(np.float32)
             swirl_amount = swirl_amount * band
 
         theta_new = theta + swirl_amount
@@ -68,13 +74,4 @@ class SwirlWarpTransformer(RasterTransformer):
         map_x_new = (cx + r * np.cos(theta_new)).astype(np.float32)
         map_y_new = (cy + r * np.sin(theta_new)).astype(np.float32)
 
-        img_np = self.to_uint8(img_np)
-        warped = cv2.remap(
-            img_np,
-            map_x_new,
-            map_y_new,
-            interpolation=cv2.INTER_LINEAR,
-            borderMode=cv2.BORDER_REFLECT_101
-        )
-
-        return self.to_float32(warped)
+        return map_x_new, map_y_new
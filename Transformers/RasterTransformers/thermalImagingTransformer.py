@@ -1,12 +1,15 @@
 import numpy as np
-import cv2 
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .colorLut import ColorLUT, LutChain
+from .imageContext import percentile_from_histogram
 
 class ThermalImagingTransformer(RasterTransformer):
     """
     Applies a thermal imaging effect to the input image by
     converting it to grayscale and applying a custom colormap.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
         self.colormap = self._create_thermal_colormap()
@@ -29,19 +32,16 @@ class ThermalImagingTransformer(RasterTransformer):
         
         return colormap
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
-        img_np = self.to_uint8(img_np)
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
+        return TransformParams(thermal=True)
 
-        if img_np.ndim == 3 and img_np.shape[2] == 3:
-            grayscale_img = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
-        else:
-            grayscale_img = img_np
+    def point_lut(self, params: TransformParams, stats: LutChain) -> ColorLUT:
+        levels = np.arange(256, dtype=np.uint8)
 
         # Histogram stretch so the full thermal palette is used regardless of source brightness
-        p_low, p_high = np.percentile(grayscale_img, (2, 98))
+        histogram = stats.gray_histogram()
+        p_low, p_high = percentile_from_histogram(histogram, 2), percentile_from_histogram(histogram, 98)
         if p_high > p_low:
-            grayscale_img = np.clip((grayscale_img.astype(np.float32) - p_low) / (p_high - p_low) * 255, 0, 255).astype(np.uint8)
-
-        self.metadata_dictionary["thermal"] = True
+            levels = np.clip((levels.astype(np.float32) - p_low) / (p_high - p_low) * 255, 0, 255).astype(np.uint8)
 
-        return self.to_float32(self.colormap[grayscale_img])
+        return ColorLUT.from_gray(self.colormap[levels])
@@ -1,7 +1,7 @@
 import cv2 
 import numpy as np 
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .imageContext import CONTEXTS
 
 DEFAULT_EXTRUSION_INTENSITY = 0.5
 
@@ -10,10 +10,12 @@ class ThreeDExtrusionTransformer(RasterTransformer):
     Converts image brightness into depth to create a pseudo-3D bas-relief effect.
     Optimized using vectorized NumPy and OpenCV operations.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("threedextrusiontransformer", {})
 
         # --- Parameter Handling ---
@@ -26,18 +28,20 @@ class ThreeDExtrusionTransformer(RasterTransformer):
 
         ambient_light = t_config.get("ambient_light")
         if isinstance(ambient_light, str) or not isinstance(ambient_light, (int, float)):
-            ambient_light = random.uniform(0.25, 0.6)  # was 0.0-1.0; extremes → black or flat
-             
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["intensity"] = round(extrusion_intensity, 3)
-        self.metadata_dictionary["ambient"] = round(ambient_light, 2)
-        
+            ambient_light = rng.uniform(0.25, 0.6)  # was 0.0-1.0; extremes → black or flat
+
+        return TransformParams(intensity=extrusion_intensity, ambient=float(ambient_light))
+
+    def describe(self, params: TransformParams) -> dict:
+        return {"intensity": round(params.intensity, 3), "ambient": params.ambient}
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        extrusion_intensity, ambient_light = params.intensity, params.ambient
+
         # --- Optimized Pipeline ---
         img_np = self.to_uint8(img_np)
-        if img_np.ndim == 3:
-            gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = img_np
+        gray = CONTEXTS.of(img_np).gray(cv2.COLOR_RGB2GRAY)
 
         # Gaussian/Mean Blur
         blurred = cv2.blur(gray, (3, 3))
@@ -65,4 +69,4 @@ class ThreeDExtrusionTransformer(RasterTransformer):
         shading = np.maximum(shading, ambient_light * 0.5)
         output_np = (img_np * shading[..., np.newaxis]).astype(np.uint8)
 
-        return self.to_float32(output_np)
+        return output_np
@@ -1,17 +1,18 @@
 import numpy as np 
-import cv2
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .colorLut import ColorLUT, LutChain
 
 class TritoneTransformer(RasterTransformer):
     """
     Applies a tritone colorization effect to an image.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
-    def get_random_hex(self) -> str:
-        return '#{:06x}'.format(random.randint(0, 0xFFFFFF))
+    def get_random_hex(self, rng: np.random.Generator) -> str:
+        return '#{:06x}'.format(int(rng.integers(0, 0xFFFFFF, endpoint=True)))
 
     def _hex_to_rgb(self, hex_str: str) -> tuple:
         """Helper to replace the external hex_to_rgb dependency."""
@@ -20,7 +21,7 @@ class TritoneTransformer(RasterTransformer):
             return tuple(int(hex_str[i:i+2], 16) for i in (0, 2, 4))
         return (255, 255, 255) 
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("tritonetransformer", {})
 
         shadow_hex  = t_config.get("shadow_hex")
@@ -29,30 +30,21 @@ class TritoneTransformer(RasterTransformer):
         if not all(isinstance(x, str) for x in [shadow_hex, mid_hex, hilight_hex]):
             # Ensure the 3 stops are spread across the color wheel
             for _ in range(20):
-                shadow_hex  = self.get_random_hex()
-                mid_hex     = self.get_random_hex()
-                hilight_hex = self.get_random_hex()
+                shadow_hex  = self.get_random_hex(rng)
+                mid_hex     = self.get_random_hex(rng)
+                hilight_hex = self.get_random_hex(rng)
                 s, m, h = self._hex_to_rgb(shadow_hex), self._hex_to_rgb(mid_hex), self._hex_to_rgb(hilight_hex)
                 spread = sum(abs(a-b) for a,b in zip(s,h)) + sum(abs(a-b) for a,b in zip(s,m))
                 if spread > 300:
                     break
         
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["shadow"] = shadow_hex
-        self.metadata_dictionary["mid"] = mid_hex
-        self.metadata_dictionary["highlight"] = hilight_hex
+        return TransformParams(shadow=shadow_hex, mid=mid_hex, highlight=hilight_hex)
 
+    def point_lut(self, params: TransformParams, stats: LutChain) -> ColorLUT:
         # Convert hex codes to RGB tuples natively
-        self.shadow_rgb = self._hex_to_rgb(shadow_hex)
-        self.mid_rgb = self._hex_to_rgb(mid_hex)
-        self.highlight_rgb = self._hex_to_rgb(hilight_hex)
-
-        if img_np.ndim < 3 or img_np.shape[2] < 3:
-            raise ValueError("Input image must have at least 3 channels (RGB).")
-
-        shadow_np    = np.array(self.shadow_rgb,    dtype=np.float32)
-        mid_np       = np.array(self.mid_rgb,       dtype=np.float32)
-        highlight_np = np.array(self.highlight_rgb, dtype=np.float32)
+        shadow_np    = np.array(self._hex_to_rgb(params.shadow),    dtype=np.float32)
+        mid_np       = np.array(self._hex_to_rgb(params.mid),       dtype=np.float32)
+        highlight_np = np.array(self._hex_to_rgb(params.highlight), dtype=np.float32)
 
         # Build a 256-entry RGB LUT: shadow->mid for dark half, mid->highlight for light half.
         # Cost: ~0.04ms. Avoids expensive per-pixel np.where across full-image arrays.
@@ -65,6 +57,4 @@ class TritoneTransformer(RasterTransformer):
         lut[dark]  = shadow_np * (1 - t2_dark[dark])  + mid_np       * t2_dark[dark]
         lut[~dark] = mid_np    * (1 - t2_light[~dark]) + highlight_np * t2_light[~dark]
 
-        # Convert to grayscale and apply LUT via fancy indexing
-        gray = cv2.cvtColor(self.to_uint8(img_np), cv2.COLOR_RGB2GRAY)
-        return np.clip(lut[gray] / 255.0, 0.0, 1.0).astype(np.float32)  # [0,1] contract
+        return ColorLUT.from_gray(np.clip(lut, 0, 255).astype(np.uint8))
@@ -1,62 +1,184 @@
 import numpy as np
 import cv2
-import random
-from scipy.spatial import KDTree
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
+from .imageContext import CONTEXTS
+
+
+# Fixed-point fraction bits of the facet vertices handed to cv2.fillConvexPoly
+_FACET_SHIFT = 8
+# Side of the pixel blocks whose facet labels are verified by their corners
+_CHECK_BLOCK = 4
 
 
 class VoronoiTransformer(RasterTransformer):
     """
     Tessellates the image into Voronoi cells, each filled with the average
     colour of its source pixels. Produces a stained-glass / low-poly mosaic.
-    Works at a downscaled canvas for speed, upscales with nearest-neighbour.
+    Works on a canvas_scale canvas (0.35 by default, 1.0 for full
+    resolution) and upscales with nearest-neighbour.
+
+    Pixels are labelled with their nearest seed by one of two backends:
+    "facets" (default) rasterises cv2.Subdiv2D's Voronoi facets and
+    corrects them against the Delaunay neighbours of each seed; "kdtree"
+    queries a scipy KDTree for every pixel. They agree except where a
+    pixel is equidistant from two seeds.
     """
 
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("voronoitransformer", {})
 
         num_points = t_config.get("num_points")
         if not isinstance(num_points, int):
-            num_points = random.randint(60, 350)
+            num_points = int(rng.integers(60, 350, endpoint=True))
 
         edge_blend = t_config.get("edge_blend", True)
         if isinstance(edge_blend, str):
             edge_blend = True
 
-        self.metadata_dictionary["num_points"] = num_points
-        self.metadata_dictionary["edge_blend"] = int(edge_blend)
+        canvas_scale = t_config.get("canvas_scale")
+        if not isinstance(canvas_scale, (int, float)) or not 0 < canvas_scale <= 1:
+            canvas_scale = 0.35
+
+        labels = t_config.get("labels")
+        if labels not in ("facets", "kdtree"):
+            labels = "facets"
 
+        return TransformParams(num_points=num_points, edge_blend=int(edge_blend),
+                               canvas=float(canvas_scale), labels=labels)
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        num_points = params.num_points
         img = self.to_uint8(img_np)
         h, w = img.shape[:2]
 
-        scale = 0.35
-        sh, sw = max(1, int(h * scale)), max(1, int(w * scale))
-        small = cv2.resize(img, (sw, sh))
+        # entries recorded before canvas/labels were parameters replay as they were made
+        canvas_scale = params.get("canvas", 0.35)
+        sh, sw = max(1, int(h * canvas_scale)), max(1, int(w * canvas_scale))
+        small = img if (sh, sw) == (h, w) else CONTEXTS.of(img).downscaled((sw, sh))
 
         pts = np.column_stack([
-            np.random.uniform(0, sw, num_points),
-            np.random.uniform(0, sh, num_points),
+            rng.uniform(0, sw, num_points),
+            rng.uniform(0, sh, num_points),
         ]).astype(np.float32)
 
-        yy, xx = np.mgrid[0:sh, 0:sw]
-        pixel_coords = np.stack([xx.ravel(), yy.ravel()], axis=1).astype(np.float32)
-        _, nearest = KDTree(pts).query(pixel_coords, workers=-1)
-        nearest = nearest.reshape(sh, sw)
+        if params.get("labels", "kdtree") == "kdtree":
+            nearest = _kdtree_labels(pts, sh, sw)
+        else:
+            nearest = _facet_labels(pts, sh, sw)
 
-        out_small = np.empty_like(small)
-        for i in range(num_points):
-            mask = nearest == i
-            if mask.any():
-                out_small[mask] = small[mask].mean(axis=0).astype(np.uint8)
+        # mean colour of every cell: one bincount per channel over the label image
+        flat_labels = nearest.ravel()
+        counts = np.bincount(flat_labels, minlength=num_points)
+        sums = np.stack([np.bincount(flat_labels, weights=small[..., c].ravel(), minlength=num_points)
+                         for c in range(small.shape[2])], axis=1)
+        means = (sums / np.maximum(counts, 1)[:, None]).astype(np.uint8)
+        out_small = means[nearest]
 
-        if edge_blend:
+        if params.edge_blend:
             edge_map = cv2.Laplacian(nearest.astype(np.float32), cv2.CV_32F)
             edge_mask = (np.abs(edge_map) > 0).astype(np.uint8)
             edge_mask_3 = cv2.cvtColor(edge_mask * 160, cv2.COLOR_GRAY2BGR)
             out_small = cv2.subtract(out_small, edge_mask_3)
 
-        out = cv2.resize(out_small, (w, h), interpolation=cv2.INTER_NEAREST)
-        return self.to_float32(out)
+        if (sh, sw) == (h, w):
+            return out_small
+        return cv2.resize(out_small, (w, h), interpolation=cv2.INTER_NEAREST)
+
+
+def _kdtree_labels(pts: np.ndarray, sh: int, sw: int) -> np.ndarray:
+    """Index of the nearest seed for every pixel of an sh×sw canvas, by KDTree query."""
+    yy, xx = np.mgrid[0:sh, 0:sw]
+    pixel_coords = np.stack([xx.ravel(), yy.ravel()], axis=1).astype(np.float32)
+    from scipy.spatial import KDTree  # deferred: scipy is only paid for when this backend is used
+    _, nearest = KDTree(pts).query(pixel_coords, workers=-1)
+    return nearest.reshape(sh, sw)
+
+
+def _facet_labels(pts: np.ndarray, sh: int, sw: int) -> np.ndarray:
+    """
+    Index of the nearest seed for every pixel of an sh×sw canvas. Each
+    seed's Voronoi facet is clipped to the canvas and filled with its
+    index. fillConvexPoly also paints pixels the facet's edges only
+    touch, and Subdiv2D's float32 facets can be off by more than a pixel
+    where its triangles are thin, so the labels are then checked against
+    each seed's Delaunay neighbours and moved to the nearest seed where
+    they fail.
+    """
+    subdiv = cv2.Subdiv2D((0, 0, sw, sh))
+    ids = [subdiv.insert((float(x), float(y))) for x, y in pts]
+    facets, _ = subdiv.getVoronoiFacetList(ids)
+    canvas = np.array([[-1, -1], [sw + 1, -1], [sw + 1, sh + 1], [-1, sh + 1]], dtype=np.float32)
+
+    labels = np.full((sh, sw), -1, dtype=np.int32)
+    owner = {}
+    for i, (vertex_id, facet) in enumerate(zip(ids, facets)):
+        if vertex_id in owner:
+            continue  # duplicate seed: the first one owns the facet
+        owner[vertex_id] = i
+        _, polygon = cv2.intersectConvexConvex(facet.astype(np.float32), canvas)
+        if polygon is not None:
+            cv2.fillConvexPoly(labels, np.round(polygon.reshape(-1, 2) * (1 << _FACET_SHIFT)).astype(np.int32),
+                               i, cv2.LINE_8, _FACET_SHIFT)
+
+    # A point is in seed i's cell exactly when no Delaunay neighbour of i is
+    # nearer, and from any seed, stepping to the nearest neighbour that is
+    # nearer still ends at the nearest seed. Cells are convex, so a block
+    # of one label whose corners pass that test is right throughout; the
+    # pixels of every other block walk until their label passes.
+    neighbours = _delaunay_neighbours(subdiv, owner, len(pts))
+    px, py = pts[:, 0], pts[:, 1]
+    bh, bw = -(-sh // _CHECK_BLOCK), -(-sw // _CHECK_BLOCK)
+    padded = np.pad(labels, ((0, bh * _CHECK_BLOCK - sh), (0, bw * _CHECK_BLOCK - sw)), mode="edge")
+    blocks = padded.reshape(bh, _CHECK_BLOCK, bw, _CHECK_BLOCK)
+    label = blocks[:, 0, :, 0]
+    suspect = (blocks.min(axis=(1, 3)) != blocks.max(axis=(1, 3))) | (label < 0)
+    by, bx = np.nonzero(~suspect)
+    candidates = neighbours[label[by, bx]]
+    for cy, cx in ((0, 0), (0, 1), (1, 0), (1, 1)):
+        ys = ((by + cy) * _CHECK_BLOCK - cy).astype(np.float32)
+        xs = ((bx + cx) * _CHECK_BLOCK - cx).astype(np.float32)
+        dist = np.square(px[candidates] - xs[:, None]) + np.square(py[candidates] - ys[:, None])
+        suspect[by, bx] |= dist.min(axis=1) < dist[:, 0]
+    suspect = np.repeat(np.repeat(suspect, _CHECK_BLOCK, axis=0), _CHECK_BLOCK, axis=1)[:sh, :sw]
+
+    flat = labels.ravel()
+    todo = np.flatnonzero(suspect).astype(np.int32)
+    flat[flat < 0] = 0
+    while todo.size:
+        ys, xs = (v.astype(np.float32) for v in np.divmod(todo, sw))
+        current = flat[todo]
+        candidates = neighbours[current]
+        dist = np.square(px[candidates] - xs[:, None]) + np.square(py[candidates] - ys[:, None])
+        best = candidates[np.arange(len(todo)), dist.argmin(axis=1)]
+        moved = best != current
+        todo = todo[moved]
+        flat[todo] = best[moved]
+    return labels
+
+
+def _delaunay_neighbours(subdiv: cv2.Subdiv2D, owner: dict[int, int], n: int) -> np.ndarray:
+    """
+    (n, 1 + degree) table of every labelled seed followed by its Delaunay
+    neighbours (by label), padded with the seed itself; rows of
+    unlabelled seeds hold only themselves.
+    """
+    adjacent = [[i] for i in range(n)]
+    for vertex_id, i in owner.items():
+        first = edge = subdiv.getVertex(vertex_id)[1]
+        while True:
+            other = owner.get(subdiv.edgeDst(edge)[0])  # None for the outer virtual vertices
+            if other is not None:
+                adjacent[i].append(other)
+            edge = subdiv.getEdge(edge, cv2.SUBDIV2D_NEXT_AROUND_ORG)
+            if edge == first:
+                break
+    table = np.arange(n, dtype=np.int32)[:, None].repeat(max(map(len, adjacent)), axis=1)
+    for i, row in enumerate(adjacent):
+        table[i, :len(row)] = row
+    return table
@@ -1,7 +1,6 @@
 import cv2 
 import numpy as np 
-import random
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
 
 DEFAULT_DOWNSCALE_FACTOR = 0.5 
 
@@ -9,29 +8,38 @@ class WatercolorTransformer(RasterTransformer):
     """
     Applies a stylized watercolor filter using OpenCV edge-preserving smoothing.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
         self.allowed_styles = ['monet', 'psychedelic']
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         t_config = self.config.get("watercolortransformer", {})
 
-        self.style_name = t_config.get("style_name")
-        if self.style_name not in self.allowed_styles:
-            self.style_name = random.choice(self.allowed_styles)
+        style_name = t_config.get("style_name")
+        if style_name not in self.allowed_styles:
+            style_name = str(rng.choice(self.allowed_styles))
 
         scale_factor = t_config.get("scale_factor", 0.85)
-        
-        # --- POPULATE METADATA ---
-        self.metadata_dictionary["style"] = self.style_name
-        self.metadata_dictionary["scale"] = scale_factor
-        
-        if self.style_name == 'monet':
-            sigma_s = random.uniform(60 * 0.8, 60 * 1.2)
-            sigma_r = random.uniform(0.45 * 0.8, 0.45 * 1.2)
+
+        if style_name == 'monet':
+            sigma_s = float(rng.uniform(60 * 0.8, 60 * 1.2))
+            sigma_r = float(rng.uniform(0.45 * 0.8, 0.45 * 1.2))
         else: # psychedelic
-            sigma_s = random.uniform(150, 200)
-            sigma_r = random.uniform(0.8, 0.95)
+            sigma_s = float(rng.uniform(150, 200))
+            sigma_r = float(rng.uniform(0.8, 0.95))
+
+        return TransformParams(style=style_name, scale_factor=scale_factor, sigma_s=sigma_s, sigma_r=sigma_r)
+
+    def describe(self, params: TransformParams) -> dict:
+        return {"style": params.style, "scale": params.scale_factor}
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        scale_factor = params.scale_factor
+        sigma_r = params.sigma_r
+        sigma_s = self.scale_px(params.sigma_s, scale, minimum=1.0)
 
         img_np = self.to_uint8(img_np)
         h, w = img_np.shape[:2]
@@ -48,7 +56,7 @@ class WatercolorTransformer(RasterTransformer):
 
         hsv = cv2.cvtColor(stylized, cv2.COLOR_BGR2HSV).astype(np.float32)
         
-        if self.style_name == 'monet':
+        if params.style == 'monet':
             hsv[..., 1] *= 1.15
             hsv[..., 2] = hsv[..., 2] * 1.05 + 10
         else: # psychedelic
@@ -68,4 +76,4 @@ class WatercolorTransformer(RasterTransformer):
         else:
             output_np = result_small
 
-        return self.to_float32(output_np)
+        return output_np
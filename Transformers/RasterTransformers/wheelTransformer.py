@@ -1,76 +1,114 @@
-from .rasterTransformer import RasterTransformer 
-import numpy as np 
-from PIL import Image, ImageChops 
-import random
+import cv2
+import numpy as np
+from .rasterTransformer import RasterTransformer, TransformParams
+from .coordinateCache import COORDINATES
+
+# Map coordinate for output pixels a layer leaves empty: far outside the
+# spoke, so cv2.remap returns the black border value on its fast path
+_OUTSIDE = -16.0
+
 
 class WheelTransformer(RasterTransformer):
     """
-    Creates a wheel-like pattern by rotating half-height copies of the image 
+    Creates a wheel-like pattern by rotating half-height copies of the image
     around the canvas center.
+
+    Each copy ("spoke") is the image squeezed to half height and rotated by
+    i * 360 / copies degrees. Every output pixel reads its spokes straight
+    from the squeezed image through cached remap coordinates; sampling
+    outside the spoke returns black, which anti-aliases the spoke edges.
+    "normal" stacks the spokes in order with one remap for the topmost
+    spoke under each pixel and one for what shows through its edges;
+    "add" and "lighter" remap all spokes in one call and sum or max them.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
-        
-        self.num_copies = random.randint(3, 5)  # capped from 7 to bound max runtime
-        self.blend_mode = random.choice(["normal", "add", "lighter"])
-
-        self.metadata_dictionary["copies"] = self.num_copies
-        self.metadata_dictionary["blend"] = self.blend_mode
-
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
-
-        # 1. Convert incoming Numpy Array to PIL Image
-        if isinstance(img_np, np.ndarray):
-            img = Image.fromarray(self.to_uint8(img_np))
-        elif isinstance(img_np, Image.Image):
-            img = img_np.copy()
-        else:
-            self.log.warning(f"WheelTransformer received unknown type: {type(img_np)}")
-            return img_np
-        
-        w, h = img.size
-        
-        # "Half height": Resize original to w, h/2
-        spoke_h = h // 2
-        spoke = img.resize((w, spoke_h), resample=Image.LANCZOS)
-        spoke = spoke.convert("RGBA")
-
-        # 3. Setup Canvas
-        if self.blend_mode in ['add', 'lighter']:
-            canvas = Image.new("RGBA", (w, h), (0, 0, 0, 255))
-        else:
-            canvas = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-        
-        cx, cy = w // 2, h // 2
-        step_angle = 360.0 / self.num_copies
-
-        # 4. Create the Wheel
-        for i in range(self.num_copies):
-            angle = i * step_angle
-            
-            rotated_spoke = spoke.rotate(angle, expand=True, resample=Image.BILINEAR)
-            
-            rw, rh = rotated_spoke.size
-            paste_x = cx - (rw // 2)
-            paste_y = cy - (rh // 2)
-            
-            if self.blend_mode == 'normal':
-                canvas.paste(rotated_spoke, (paste_x, paste_y), rotated_spoke)
-            else:
-                # Crop to the affected region only — avoids allocating a full (w,h) layer per copy
-                rw, rh = rotated_spoke.size
-                x1, y1 = max(0, paste_x), max(0, paste_y)
-                x2, y2 = min(w, paste_x + rw), min(h, paste_y + rh)
-                bg_crop  = canvas.crop((x1, y1, x2, y2))
-                rot_crop = rotated_spoke.crop((x1-paste_x, y1-paste_y, x1-paste_x+(x2-x1), y1-paste_y+(y2-y1)))
-                if self.blend_mode == 'add':
-                    merged = ImageChops.add(bg_crop, rot_crop)
-                elif self.blend_mode == 'lighter':
-                    merged = ImageChops.lighter(bg_crop, rot_crop)
-                canvas.paste(merged, (x1, y1))
-
-        # 5. Convert to RGB to safely return to numpy pipeline
-        bg = Image.new("RGB", (w, h), (0, 0, 0))
-        bg.paste(canvas, (0, 0), mask=canvas)
-        
-        return self.to_float32(np.array(bg))
+
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
+        return TransformParams(
+            copies=int(rng.integers(3, 5, endpoint=True)),  # capped from 7 to bound max runtime
+            blend=str(rng.choice(["normal", "add", "lighter"])),
+        )
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
+        if img_np.ndim == 2 or img_np.shape[2] == 1:
+            img_np = cv2.cvtColor(img_np, cv2.COLOR_GRAY2BGR)
+        elif img_np.shape[2] == 4:
+            img_np = cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
+        h, w = img_np.shape[:2]
+        spoke = cv2.resize(img_np, (w, max(1, h // 2)), interpolation=cv2.INTER_AREA)
+
+        if params.blend == "normal":
+            top_x, top_y, under_x, under_y, show_through = _stacked_maps(h, w, params.copies)
+            top = self.remap(spoke, top_x, top_y)
+            under = self.remap(spoke, under_x, under_y)
+            return cv2.add(top, cv2.multiply(under, show_through, scale=1.0 / 255.0))
+
+        combine = cv2.add if params.blend == "add" else cv2.max
+        copies = params.copies
+        if copies % 2 == 0:
+            # spoke k + copies/2 is spoke k turned half a circle: the same map
+            # over the spoke flipped both ways, so each pair costs one remap
+            spoke = combine(spoke, cv2.flip(spoke, -1))
+            copies //= 2
+        layers = self.remap(spoke, *_spoke_maps(h, w, params.copies, copies))
+        out = layers[:h].copy()
+        for k in range(1, copies):
+            combine(out, layers[k * h:(k + 1) * h], dst=out)
+        return out
+
+
+def _spoke_maps(h: int, w: int, copies: int, spokes: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    float32 (map_x, map_y) of shape (spokes * h, w) for the first `spokes`
+    (default all) of `copies` spokes: rows k*h to (k+1)*h give, for each
+    output pixel, where spoke k samples the half-height image.
+    """
+    spokes = copies if spokes is None else spokes
+    spoke_h = max(1, h // 2)
+
+    def build():
+        x, y = COORDINATES.normalised(h, w, (w - 1) / 2.0, (h - 1) / 2.0)
+        maps_x = np.empty((spokes * h, w), dtype=np.float32)
+        maps_y = np.empty((spokes * h, w), dtype=np.float32)
+        for k in range(spokes):
+            # spoke k is turned counter-clockwise on screen; sample it by turning back
+            angle = 2.0 * np.pi * k / copies
+            cos, sin = float(np.cos(angle)), float(np.sin(angle))
+            rows = slice(k * h, (k + 1) * h)
+            cv2.addWeighted(x, cos, y, -sin, (w - 1) / 2.0, dst=maps_x[rows])
+            cv2.addWeighted(x, sin, y, cos, (spoke_h - 1) / 2.0, dst=maps_y[rows])
+        return maps_x, maps_y
+    return COORDINATES.fields(("wheel", h, w, copies, spokes), build)
+
+
+def _stacked_maps(h: int, w: int, copies: int) -> tuple[np.ndarray, ...]:
+    """
+    For "normal" blending: the maps of the topmost spoke covering each
+    pixel, the maps of the next spoke down where the top one only partly
+    covers the pixel (_OUTSIDE elsewhere), and the uint8 BGR share
+    (255 - coverage of the top spoke) through which the lower one shows.
+    """
+    spoke_h = max(1, h // 2)
+
+    def build():
+        maps_x, maps_y = (m.reshape(copies, h, w) for m in _spoke_maps(h, w, copies))
+        # a bilinear sample is non-zero while it is within a pixel of the spoke
+        inside = (maps_x > -1.0) & (maps_x < w) & (maps_y > -1.0) & (maps_y < spoke_h)
+        order = np.arange(copies)[:, None, None]
+        top = np.where(inside, order, -1).max(axis=0)
+        top_x = np.take_along_axis(maps_x, np.maximum(top, 0)[None], axis=0)[0]
+        top_y = np.take_along_axis(maps_y, np.maximum(top, 0)[None], axis=0)[0]
+
+        coverage = cv2.remap(np.full((spoke_h, w), 255, dtype=np.uint8), top_x, top_y,
+                             interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+        under = np.where(inside & (order < top), order, -1).max(axis=0)
+        shows = (under >= 0) & (coverage < 255)
+        under_x = np.where(shows, np.take_along_axis(maps_x, np.maximum(under, 0)[None], axis=0)[0], _OUTSIDE)
+        under_y = np.where(shows, np.take_along_axis(maps_y, np.maximum(under, 0)[None], axis=0)[0], _OUTSIDE)
+        show_through = cv2.merge([255 - coverage] * 3)
+        return top_x, top_y, under_x.astype(np.float32), under_y.astype(np.float32), show_through
+    return COORDINATES.fields(("wheel-normal", h, w, copies), build)
@@ -1,8 +1,7 @@
 import cv2 
 import numpy as np 
-import random
 from PIL import Image 
-from .rasterTransformer import RasterTransformer
+from .rasterTransformer import RasterTransformer, TransformParams
 
 POSSIBLE_NUM_COLORS: list[int] = [1, 2, 4, 8, 16, 32, 64, 128, 256]
 
@@ -10,15 +9,20 @@ class XrayTransformer(RasterTransformer):
     """
     Quantizes the image down to a limited palette of colors.
     """
+    NATIVE_DTYPE = np.uint8
+
     def __init__(self):
         super().__init__()
 
-    def run(self, img_np: np.ndarray, *args, **kwargs) -> np.ndarray:
+    def sample_params(self, rng: np.random.Generator) -> TransformParams:
         POSSIBLE_NUM_COLORS: list[int] = [64, 128, 256]
         WEIGHTS:             list[int] = [ 5,   4,   1]  # low counts → flat bands → F
 
-        self.num_colors = random.choices(POSSIBLE_NUM_COLORS, weights=WEIGHTS, k=1)[0]
-        self.metadata_dictionary["colors"] = self.num_colors
+        p = np.array(WEIGHTS, dtype=np.float64) / sum(WEIGHTS)
+        return TransformParams(colors=int(rng.choice(POSSIBLE_NUM_COLORS, p=p)))
+
+    def apply(self, img_np: np.ndarray, params: TransformParams,
+              rng: np.random.Generator, scale: float = 1.0) -> np.ndarray:
 
         img_np = self.to_uint8(img_np)
 
@@ -28,8 +32,8 @@ class XrayTransformer(RasterTransformer):
         else:
             img_rgb_pil = Image.fromarray(cv2.cvtColor(img_np, cv2.COLOR_BGR2RGB))
 
-        quantized_img_pil = img_rgb_pil.quantize(colors=self.num_colors)
+        quantized_img_pil = img_rgb_pil.quantize(colors=params.colors)
         quantized_img_np = cv2.cvtColor(np.array(quantized_img_pil), cv2.COLOR_RGB2BGR)
 
-        return self.to_float32(quantized_img_np)
+        return quantized_img_np
 
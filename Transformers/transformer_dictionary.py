@@ -1,64 +1,36 @@
-from .RasterTransformers import (
-    AnamorphicTransformer,
-    ChromaticAberrationTransformer,
-    ColormapTransformer,
-    DataMoshTransformer,
-    DuotoneTransformer,
-    FisheyeTransformer,
-    FlipWilsonTransformer,
-    FluidWarpTransformer,
-    FractalWarpTransformer,
-    GlitchWarpTransformer,
-    HalftoneTransformer,
-    InvertRGBTransformer,
-    KaleidoscopeTransformer,
-    MeltMorphTransformer,
-    NullTransformer,
-    OilPaintingTransformer,
-    PixelSortTransformer,
-    PosterizationTransformer,
-    RadialWarpTransformer,
-    StippleTransformer,
-    SwirlWarpTransformer,
-    ThermalImagingTransformer,
-    ThreeDExtrusionTransformer,
-    TritoneTransformer,
-    VoronoiTransformer,
-    WatercolorTransformer,
-    WheelTransformer,
-    XrayTransformer
-)
+from ..lazy_registry import LazyRegistry
 
-transformer_registry = {
-    "anamorphic": AnamorphicTransformer,
-    "chromaticaberration": ChromaticAberrationTransformer,
-    "colormap": ColormapTransformer,
-    "datamosh": DataMoshTransformer,
-    "duotone": DuotoneTransformer,
-    "fisheye": FisheyeTransformer,
-    "flipwilson": FlipWilsonTransformer,
-    "fluidwarp": FluidWarpTransformer,
-    "fractalwarp": FractalWarpTransformer,
-    "glitchwarp": GlitchWarpTransformer,
-    "halftone": HalftoneTransformer,
-    "invertrgb": InvertRGBTransformer,
-    "meltmorph": MeltMorphTransformer,
-    "null": NullTransformer,
-    "kaleidoscope": KaleidoscopeTransformer,
-    "oilpainting": OilPaintingTransformer,
-    "pixelsort": PixelSortTransformer,
-    "stipple": StippleTransformer,
-    "voronoi": VoronoiTransformer,
-    "posterization": PosterizationTransformer,
-    "radialwarp": RadialWarpTransformer,
-    "swirlwarp": SwirlWarpTransformer,
-    "thermalimaging": ThermalImagingTransformer,
-    "threedextrusion": ThreeDExtrusionTransformer,
-    "tritone": TritoneTransformer,
-    "watercolor": WatercolorTransformer,
-    "wheel": WheelTransformer,
-    "xray": XrayTransformer,
-}
+# Classes are imported on first lookup; keys are unchanged.
+transformer_registry = LazyRegistry(__package__, {
+    "anamorphic": ".RasterTransformers.anamorphicTransformer:AnamorphicTransformer",
+    "chromaticaberration": ".RasterTransformers.chromaticAberrationTransformer:ChromaticAberrationTransformer",
+    "colormap": ".RasterTransformers.colormapTransformer:ColormapTransformer",
+    "datamosh": ".RasterTransformers.dataMoshTransformer:DataMoshTransformer",
+    "duotone": ".RasterTransformers.duotoneTransformer:DuotoneTransformer",
+    "fisheye": ".RasterTransformers.fisheyeTransformer:FisheyeTransformer",
+    "flipwilson": ".RasterTransformers.flipWilsonTransformer:FlipWilsonTransformer",
+    "fluidwarp": ".RasterTransformers.fluidWarpTransformer:FluidWarpTransformer",
+    "fractalwarp": ".RasterTransformers.fractalWarpTransformer:FractalWarpTransformer",
+    "glitchwarp": ".RasterTransformers.glitchWarpTransformer:GlitchWarpTransformer",
+    "halftone": ".RasterTransformers.halftoneTransformer:HalftoneTransformer",
+    "invertrgb": ".RasterTransformers.invertRGBTransformer:InvertRGBTransformer",
+    "meltmorph": ".RasterTransformers.meltMorphTransformer:MeltMorphTransformer",
+    "null": ".RasterTransformers.nullTransformer:NullTransformer",
+    "kaleidoscope": ".RasterTransformers.kaleidoscopeTransformer:KaleidoscopeTransformer",
+    "oilpainting": ".RasterTransformers.oilPaintingTransformer:OilPaintingTransformer",
+    "pixelsort": ".RasterTransformers.pixelSortTransformer:PixelSortTransformer",
+    "stipple": ".RasterTransformers.stippleTransformer:StippleTransformer",
+    "voronoi": ".RasterTransformers.voronoiTransformer:VoronoiTransformer",
+    "posterization": ".RasterTransformers.posterizationTransformer:PosterizationTransformer",
+    "radialwarp": ".RasterTransformers.radialWarpTransformer:RadialWarpTransformer",
+    "swirlwarp": ".RasterTransformers.swirlWarpTransformer:SwirlWarpTransformer",
+    "thermalimaging": ".RasterTransformers.thermalImagingTransformer:ThermalImagingTransformer",
+    "threedextrusion": ".RasterTransformers.threeDExtrusionTransformer:ThreeDExtrusionTransformer",
+    "tritone": ".RasterTransformers.tritoneTransformer:TritoneTransformer",
+    "watercolor": ".RasterTransformers.watercolorTransformer:WatercolorTransformer",
+    "wheel": ".RasterTransformers.wheelTransformer:WheelTransformer",
+    "xray": ".RasterTransformers.xrayTransformer:XrayTransformer",
+})
 
 transformer_ids = {
     "AnamorphicTransformer": "an",
@@ -0,0 +1,136 @@
+"""
+Fit the fast Grader's per-level calibration against the full-resolution
+reference grader and report how often the two agree.
+
+    python -m ScreenArt.calibrate_grader DIR [DIR ...] [--grades logs/grades.csv]
+
+Every image in the given directories (graded outputs, rejects, or any
+rendered corpus) is graded both ways. grades.csv only keeps letters and
+chains, not pixels, so it cannot be re-graded; its grade distribution is
+printed next to the corpus's for comparison. Paste the printed
+CALIBRATION table into grader.py.
+"""
+import argparse
+import csv
+import os
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from .grader import GRADES, Grader, calibrate, full_res_stats, letter, score
+from .image_reader import decode_image
+from .pipeline import list_images
+from .Transformers.RasterTransformers.imageContext import freeze
+
+IDENTITY = (0.0, 1.0, 0.0, 1.0)
+
+
+def _fit(samples: list) -> tuple[float, float, float, float]:
+    """(a, b, c, s) for one pyramid level, by least squares over its samples."""
+    x = np.log1p([level_stats.lap_var for _, _, level_stats, _, _, _ in samples])
+    x_coarser = np.log1p([coarser for _, _, _, coarser, _, _ in samples])
+    y = np.log1p([reference.lap_var for reference, *_ in samples])
+    (a, b, c), *_ = np.linalg.lstsq(np.column_stack([np.ones_like(x), x, x - x_coarser]), y, rcond=None)
+    level_std = np.array([level_stats.std for _, _, level_stats, _, _, _ in samples])
+    full_std = np.array([reference.std for reference, *_ in samples])
+    s = full_std @ level_std / (level_std @ level_std) if level_std.any() else 1.0
+    return tuple(round(float(v), 4) for v in (a, b, c, s))
+
+
+def _fit_all(samples: list) -> dict[int, tuple[float, float, float, float]]:
+    by_level = defaultdict(list)
+    for sample in samples:
+        by_level[sample[1]].append(sample)
+    return {level: IDENTITY if level == 0 or len(by_level[level]) < 4 else _fit(by_level[level])
+            for level in sorted(by_level)}
+
+
+def _grades(samples: list, calibration: dict) -> list[tuple[str, str]]:
+    """(reference, fast) grade of each sample under calibration."""
+    pairs = []
+    for reference, level, level_stats, coarser, _, _ in samples:
+        fast = level_stats if level == 0 else calibrate(level_stats, coarser, calibration.get(level, IDENTITY))
+        pairs.append((letter(score(reference)), letter(score(fast))))
+    return pairs
+
+
+def _measure(path: str, grader: Grader):
+    img = decode_image(path)
+    if img is None:
+        return None
+    # each grader gets its own frozen copy, so neither finds planes the other computed
+    copy = freeze(img.copy())
+    start = time.perf_counter()
+    reference = full_res_stats(freeze(img))
+    reference_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    level, level_stats, coarser = grader.level_stats(copy)
+    fast_ms = (time.perf_counter() - start) * 1000
+    return reference, level, level_stats, coarser, reference_ms, fast_ms
+
+
+def _print_confusion(title: str, pairs: list[tuple[str, str]]):
+    agree = sum(ref == fast for ref, fast in pairs)
+    passing = sum((ref != "F") == (fast != "F") for ref, fast in pairs)
+    print(f"\n{title}: {agree}/{len(pairs)} exact ({100 * agree / max(1, len(pairs)):.1f}%), "
+          f"pass/reject {passing}/{len(pairs)} ({100 * passing / max(1, len(pairs)):.1f}%)")
+    counts = Counter(pairs)
+    print("  reference \\ fast  " + "  ".join(f"{g:>4}" for g in GRADES))
+    for ref in GRADES:
+        print(f"  {ref:>17}  " + "  ".join(f"{counts[(ref, fast)]:>4}" for fast in GRADES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the fast grader against the full-resolution grader.")
+    parser.add_argument("dirs", nargs="+", help="directories of images to grade")
+    parser.add_argument("--grades", default=os.path.join(os.path.dirname(__file__), "logs", "grades.csv"),
+                        help="grades.csv whose grade distribution is shown for comparison")
+    parser.add_argument("--max-pixels", type=int, default=Grader.MAX_PIXELS,
+                        help="largest pyramid level the fast grader measures on, in pixels")
+    args = parser.parse_args()
+
+    paths = [os.path.join(source_dir, name) for source_dir in args.dirs for name in list_images(source_dir)]
+    grader = Grader(max_pixels=args.max_pixels)
+    samples = [s for s in map(lambda p: _measure(p, grader), paths) if s is not None]
+    if not samples:
+        print("No images found.")
+        return
+
+    calibration = _fit_all(samples)
+    levels = Counter(level for _, level, *_ in samples)
+    print(f"{len(samples)} images; images per pyramid level: "
+          + ", ".join(f"{level}: {levels[level]}" for level in sorted(levels)))
+    print("CALIBRATION = {")
+    for level, constants in calibration.items():
+        print(f"    {level}: {constants},")
+    print("}")
+
+    # agreement on images the constants were not fitted to: fit on one half, grade the other
+    halves = samples[0::2], samples[1::2]
+    held_out = _grades(halves[1], _fit_all(halves[0])) + _grades(halves[0], _fit_all(halves[1]))
+    pairs = _grades(samples, calibration)
+    _print_confusion("Uncalibrated", _grades(samples, {}))
+    _print_confusion("Calibrated, held out", held_out)
+    _print_confusion("Calibrated", pairs)
+
+    print("\nPer level: exact agreement, mean ms per image (reference / fast)")
+    for level in sorted(levels):
+        at_level = [(pair, sample) for pair, sample in zip(pairs, samples) if sample[1] == level]
+        agree = sum(ref == fast for (ref, fast), _ in at_level)
+        reference_ms = sum(sample[4] for _, sample in at_level) / len(at_level)
+        fast_ms = sum(sample[5] for _, sample in at_level) / len(at_level)
+        print(f"  level {level}: {agree}/{len(at_level)}, {reference_ms:.1f} / {fast_ms:.1f} ms")
+
+    corpus = Counter(ref for ref, _ in pairs)
+    print("\nGrade distribution   " + "  ".join(f"{g:>6}" for g in GRADES))
+    print("  corpus (reference) " + "  ".join(f"{100 * corpus[g] / len(pairs):>5.1f}%" for g in GRADES))
+    if os.path.exists(args.grades):
+        with open(args.grades, newline="") as f:
+            logged = Counter(row["grade"] for row in csv.DictReader(f))
+        total = sum(logged.values()) or 1
+        print("  grades.csv         " + "  ".join(f"{100 * logged[g] / total:>5.1f}%" for g in GRADES))
+
+
+if __name__ == "__main__":
+    main()
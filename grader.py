@@ -0,0 +1,203 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Sequence
+
+import cv2
+import numpy as np
+
+from .Transformers.RasterTransformers.imageContext import CONTEXTS
+
+# Hue check: pixels with saturation above VIVID_SATURATION are "vivid"; the check
+# needs VIVID_MIN_FRAC of them and bins their hue in 5° (36-bin) steps
+VIVID_SATURATION = 80
+VIVID_MIN_FRAC = 0.15
+HUE_BINS = 36
+HUE_SAMPLE = (320, 213)
+
+GRADES = ("A", "B", "C", "F")
+
+
+class GradeStats(NamedTuple):
+    """Everything a grade is computed from, in full-resolution units."""
+    lap_var: float        # variance of the Laplacian of the gray image
+    mean: float           # gray mean, 0-255
+    std: float            # gray standard deviation
+    vivid_frac: float     # share of pixels with HSV saturation > VIVID_SATURATION
+    dominant_frac: float  # share of vivid pixels in the most common 5° hue bin
+    hue_std: float        # standard deviation of vivid hues (OpenCV units, 0-180)
+
+
+def score(stats: GradeStats) -> float:
+    """
+    Composite of sharpness, contrast, highlights, clipping and hue
+    diversity, in [0, 1].
+    """
+    PEAK = 150.0
+    if stats.lap_var < 2.0:
+        sharpness = 0.0
+    elif stats.lap_var <= PEAK:
+        sharpness = ((stats.lap_var - 2.0) / (PEAK - 2.0)) ** 0.7
+    else:
+        log_ratio = math.log(stats.lap_var / PEAK)
+        sharpness = math.exp(-0.5 * (log_ratio / 3.0) ** 2)
+
+    contrast = min(max(stats.std / 50.0, 0.0), 1.0)
+
+    mean, std_dev = stats.mean, stats.std
+    if std_dev < 1:
+        hi_frac = 1.0 if mean > 220 else 0.0
+    else:
+        hi_frac = 0.5 * (1.0 - math.tanh((220.0 - mean) / (std_dev * 1.4142)))
+    if hi_frac < 0.15:
+        hi_penalty = 1.0
+    elif hi_frac > 0.55:
+        hi_penalty = 0.55
+    else:
+        hi_penalty = 1.0 - (hi_frac - 0.15) / 0.40 * 0.45
+
+    is_clipped = (mean < 15 and std_dev < 20) or (mean > 240 and std_dev < 20)
+    clip_mult  = 0.35 if is_clipped else 1.0
+
+    result = (sharpness * 0.60 + contrast * 0.40) * clip_mult * hi_penalty
+
+    if std_dev < 25:
+        result = min(result, 0.49)
+
+    # --- Hue diversity penalty ---
+    # Fires when >80% of vividly-saturated pixels (sat>80) share a single
+    # 5° hue bin AND hue std-dev is <12 (truly monochromatic, not biased).
+    # Requires 15% vivid pixels to avoid greyscale false positives.
+    # Caps at B — catches solid-colour blobs without penalising gradients,
+    # dark space images, or naturally hue-biased photos and auroras.
+    if stats.vivid_frac >= VIVID_MIN_FRAC and stats.dominant_frac > 0.80 and stats.hue_std < 12.0:
+        result = min(result, 0.49)  # cap at B
+    return result
+
+
+def letter(value: float) -> str:
+    if value >= 0.65:   return "A"
+    elif value >= 0.50: return "B"
+    elif value >= 0.35: return "C"
+    else:               return "F"
+
+
+def _hue_stats(hsv: np.ndarray) -> tuple[float, float, float]:
+    """(vivid_frac, dominant_frac, hue_std) of a uint8 HSV image."""
+    vivid = (hsv[:, :, 1] > VIVID_SATURATION).astype(np.uint8)
+    counts = cv2.calcHist([hsv], [0], vivid, [180], [0, 180]).ravel()
+    vivid_count = float(counts.sum())
+    if vivid_count == 0:
+        return 0.0, 0.0, 0.0
+    hues = np.arange(180, dtype=np.float64)
+    hue_mean = float(counts @ hues) / vivid_count
+    hue_std = math.sqrt(max(float(counts @ (hues - hue_mean) ** 2) / vivid_count, 0.0))
+    dominant = float(counts.reshape(HUE_BINS, -1).sum(axis=1).max())
+    return vivid_count / (hsv.shape[0] * hsv.shape[1]), dominant / vivid_count, hue_std
+
+
+def full_res_stats(img_np: np.ndarray) -> GradeStats:
+    """
+    The statistics as the original grader measures them: gray, Laplacian
+    and moments at full resolution, hue on a 320×213 resize.
+    """
+    context = CONTEXTS.of(img_np)
+    gray = context.gray().astype(np.float32)
+    lap_var = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    return GradeStats(lap_var, float(gray.mean()), float(gray.std()), *_hue_stats(_hue_sample(img_np)))
+
+
+def _hue_sample(img_np: np.ndarray) -> np.ndarray:
+    return CONTEXTS.of(CONTEXTS.of(img_np).downscaled(HUE_SAMPLE)).hsv()
+
+
+def reference_grade(img_np: np.ndarray) -> str:
+    """The full-resolution grade the fast Grader is calibrated against."""
+    return letter(score(full_res_stats(img_np)))
+
+
+def _gray_moments(gray: np.ndarray) -> tuple[float, float, float]:
+    """(Laplacian variance, mean, std) of a uint8 gray image."""
+    _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+    mean, std = cv2.meanStdDev(gray)
+    return float(lap_std[0, 0]) ** 2, float(mean[0, 0]), float(std[0, 0])
+
+
+class Grader:
+    """
+    Grades a uint8 BGR image from one level of its gray Gaussian pyramid:
+    the finest level with at most max_pixels pixels, so typical 1080p
+    renders are measured at full resolution and 4K ones one level down.
+    Laplacian variance, mean and std come from that level in one pass of
+    OpenCV reductions; the vivid-hue histogram is read from the same
+    320×213 sample the full-resolution grader uses.
+
+    Below level 0 the Laplacian variance and std lose the detail of the
+    finer octaves. They are mapped back to full-resolution units with
+    per-level constants, extrapolating from the next coarser level, and the
+    A/B/C/F boundaries of the full-resolution grader then apply unchanged.
+    `python -m ScreenArt.calibrate_grader DIR` refits the constants against
+    reference_grade() and reports agreement.
+    """
+    MAX_PIXELS = 2_500_000
+    # level: (a, b, c, s) with
+    #   log1p(full lap_var) = a + b * log1p(lap_var[level]) + c * (log1p(lap_var[level]) - log1p(lap_var[level + 1]))
+    #   full std = s * std[level]
+    # Levels beyond the table use its last entry.
+    CALIBRATION: dict[int, tuple[float, float, float, float]] = {
+        0: (0.0, 1.0, 0.0, 1.0),
+        1: (0.4318, 1.0527, 1.1457, 1.0325),
+    }
+
+    def __init__(self, max_pixels: int | None = None,
+                 calibration: dict[int, tuple[float, float, float, float]] | None = None,
+                 threads: int | None = None):
+        self.max_pixels = self.MAX_PIXELS if max_pixels is None else max_pixels
+        self.calibration = self.CALIBRATION if calibration is None else calibration
+        self.threads = max(1, threads if threads is not None else min(4, os.cpu_count() or 1))
+
+    def level_for(self, shape: tuple[int, ...]) -> int:
+        height, width = shape[:2]
+        level = 0
+        while height * width > self.max_pixels and min(height, width) > 1:
+            height, width = (height + 1) // 2, (width + 1) // 2
+            level += 1
+        return level
+
+    def level_stats(self, img_np: np.ndarray) -> tuple[int, GradeStats, float]:
+        """
+        (level, uncalibrated statistics measured on that level, Laplacian
+        variance of the next level, or 0.0 at level 0).
+        """
+        level = self.level_for(img_np.shape)
+        gray = CONTEXTS.of(img_np).gray()
+        pyramid = CONTEXTS.of(gray)
+        lap_var, mean, std = _gray_moments(pyramid.pyramid(level))
+        coarser = _gray_moments(pyramid.pyramid(level + 1))[0] if level else 0.0
+        return level, GradeStats(lap_var, mean, std, *_hue_stats(_hue_sample(img_np))), coarser
+
+    def stats(self, img_np: np.ndarray) -> GradeStats:
+        """The statistics of img_np in full-resolution units."""
+        level, stats, coarser = self.level_stats(img_np)
+        if level == 0:
+            return stats
+        return calibrate(stats, coarser, self.calibration.get(level) or self.calibration[max(self.calibration)])
+
+    def grade(self, img_np: np.ndarray) -> str:
+        return letter(score(self.stats(img_np)))
+
+    def grade_batch(self, images: Sequence[np.ndarray]) -> list[str]:
+        """Grade several images at once on `threads` threads (OpenCV releases the GIL)."""
+        if self.threads == 1 or len(images) < 2:
+            return [self.grade(img) for img in images]
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(images)), thread_name_prefix="grader") as pool:
+            return list(pool.map(self.grade, images))
+
+
+def calibrate(stats: GradeStats, coarser_lap_var: float,
+              constants: tuple[float, float, float, float]) -> GradeStats:
+    """Map statistics measured on a pyramid level to full-resolution units."""
+    a, b, c, s = constants
+    x = math.log1p(stats.lap_var)
+    lap_var = math.expm1(a + b * x + c * (x - math.log1p(coarser_lap_var)))
+    return stats._replace(lap_var=max(lap_var, 0.0), std=s * stats.std)
@@ -0,0 +1,98 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+
+def decode_image(path: str) -> np.ndarray | None:
+    """
+    Read and decode an image file to uint8 BGR, or None if it cannot be
+    decoded. The pipeline converts to float32 only if a transformer needs it.
+    """
+    try:
+        data = np.fromfile(path, dtype=np.uint8)
+    except OSError:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+class ImagePrefetcher:
+    """
+    Read-ahead decoder. A feeder thread keeps up to `depth` images decoding
+    on background threads (cv2.imdecode releases the GIL) while the caller
+    transforms the current one. Decoded-but-unconsumed images are also capped
+    at `max_bytes`; at least one is always allowed so progress never stalls.
+
+    Iterating yields (path, image or None) in input order. `hits` counts
+    images that were already decoded when asked for, `stalls` those the
+    caller had to wait on — a high stall count means decode is still on the
+    critical path.
+    """
+    def __init__(self, paths: list[str], depth: int = 4, max_bytes: int = 512 * 2**20):
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stalls = 0
+
+        self._paths = paths
+        self._decoder = ThreadPoolExecutor(max_workers=min(self.depth, 4), thread_name_prefix="decoder")
+        self._ready: queue.Queue[tuple[str, Future] | None] = queue.Queue()
+        self._slots = threading.Semaphore(self.depth)
+        self._budget = threading.Condition()
+        self._held_bytes = 0
+        self._closed = False
+        self._feeder = threading.Thread(target=self._feed, name="prefetch", daemon=True)
+        self._feeder.start()
+
+    def _decode(self, path: str) -> np.ndarray | None:
+        img = decode_image(path)
+        if img is not None:
+            with self._budget:
+                self._held_bytes += img.nbytes
+        return img
+
+    def _feed(self):
+        try:
+            for path in self._paths:
+                self._slots.acquire()
+                with self._budget:
+                    while self._held_bytes >= self.max_bytes and not self._closed:
+                        self._budget.wait()
+                if self._closed:
+                    break
+                try:
+                    future = self._decoder.submit(self._decode, path)
+                except RuntimeError:  # closed between the check and the submit
+                    break
+                self._ready.put((path, future))
+        finally:
+            self._ready.put(None)
+
+    def __iter__(self) -> Iterator[tuple[str, np.ndarray | None]]:
+        try:
+            while (item := self._ready.get()) is not None:
+                path, future = item
+                if future.done():
+                    self.hits += 1
+                else:
+                    self.stalls += 1
+                img = future.result()
+                with self._budget:
+                    if img is not None:
+                        self._held_bytes -= img.nbytes
+                    self._budget.notify()
+                self._slots.release()
+                yield path, img
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop reading ahead; safe to call more than once."""
+        with self._budget:
+            self._closed = True
+            self._budget.notify_all()
+        self._slots.release()  # unblock a feeder waiting for a slot
+        self._decoder.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,88 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def write_image_atomic(path: str, img_np: np.ndarray, encode_params: list[int]) -> None:
+    """
+    Encode img_np and publish it at `path` in one step: the bytes go to a
+    hidden temp file in the same directory, which is then os.replace()d over
+    the final name. Readers (SASS) only ever see a complete file.
+    """
+    ext = os.path.splitext(path)[1] or ".png"
+    ok, buf = cv2.imencode(ext, img_np, encode_params)
+    if not ok:
+        raise IOError(f"Could not encode {path}")
+
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{name}.part")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(buf.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ImageWriter:
+    """
+    Write-behind output stage: a small thread pool that encodes and writes
+    finished images while the caller moves on to the next one. cv2.imencode
+    and file I/O release the GIL, so this overlaps with transforming. At most
+    2×threads images are queued; submit() blocks beyond that so memory stays
+    bounded. threads <= 0 writes synchronously on the calling thread.
+    """
+    def __init__(self, threads: int, log: logging.Logger):
+        self.threads = max(0, threads)
+        self.log = log
+        self.failed = 0
+        self._pool: ThreadPoolExecutor | None = None
+        self._slots = threading.BoundedSemaphore(max(1, 2 * self.threads))
+        self._pending: set[Future] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, path: str, img_np: np.ndarray, encode_params: list[int]) -> None:
+        if self.threads <= 0:
+            self._write(path, img_np, encode_params)
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="encoder")
+        self._slots.acquire()
+        future = self._pool.submit(self._write, path, img_np, encode_params)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._release)
+
+    def _release(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def _write(self, path: str, img_np: np.ndarray, encode_params: list[int]) -> None:
+        try:
+            write_image_atomic(path, img_np, encode_params)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            self.log.error(f"Failed to write {path}: {e}")
+
+    def flush(self):
+        """Block until every queued image has been written (or has failed)."""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result()
+
+    def shutdown(self):
+        self.flush()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
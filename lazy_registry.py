@@ -0,0 +1,61 @@
+import importlib
+import importlib.util
+import time
+from collections.abc import Iterator, Mapping
+
+# module name -> milliseconds spent importing it on first use (for --import-profile)
+IMPORT_TIMES: dict[str, float] = {}
+
+def timed_import(module: str, package: str | None = None):
+    """importlib.import_module that records the first-import cost in IMPORT_TIMES."""
+    name = importlib.util.resolve_name(module, package)
+    start = time.perf_counter()
+    mod = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, round((time.perf_counter() - start) * 1000, 2))
+    return mod
+
+
+class LazyRegistry(Mapping):
+    """
+    A read-only {key: class} mapping whose classes are imported on first lookup.
+    Entries are "module:ClassName" strings; relative modules resolve against
+    `package`. Iterating keys never imports anything, so a run that only needs
+    one generator (or none, with -f) only pays for what it uses.
+    """
+    def __init__(self, package: str | None, entries: dict[str, str]):
+        self._package = package
+        self._entries = entries
+        self._resolved: dict[str, type] = {}
+
+    def __getitem__(self, key: str) -> type:
+        if key not in self._resolved:
+            module, _, class_name = self._entries[key].partition(":")
+            self._resolved[key] = getattr(timed_import(module, self._package), class_name)
+        return self._resolved[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def subset(self, keys) -> "LazyRegistry":
+        """A registry restricted to `keys`, still resolving lazily."""
+        sub = LazyRegistry(self._package, {k: self._entries[k] for k in keys if k in self._entries})
+        sub._resolved = self._resolved  # share resolutions with the parent
+        return sub
+
+
+def format_import_profile(eager: dict[str, float] | None = None) -> list[str]:
+    """Lines for --import-profile: eager startup imports, then lazy ones by cost."""
+    lines = ["Import profile (ms, includes each module's own dependencies):"]
+    for name, ms in (eager or {}).items():
+        lines.append(f"{name:64s} -> {round(ms):5d}ms (eager)")
+    for name, ms in sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"{name:64s} -> {round(ms):5d}ms")
+    total = sum((eager or {}).values()) + sum(IMPORT_TIMES.values())
+    lines.append(f"{'total':64s} -> {round(total):5d}ms")
+    return lines
@@ -1,63 +1,89 @@
+import time
+_IMPORT_START = time.perf_counter()  # for --import-profile: cost of the eager imports below
+
 from .Transformers.RasterTransformers.rasterTransformer import RasterTransformer
-from .screenArt import ScreenArt
+from .screenArt import ScreenArt, init_worker_process
+from .lazy_registry import LazyRegistry, format_import_profile
 import argparse 
 import os
 from pathlib import Path
 import sys
-from multiprocessing import freeze_support 
+from multiprocessing import freeze_support, get_context
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable
 import glob
+import queue
 import random
-import time
+import threading
 from datetime import datetime
 from tqdm import tqdm
 
-# 1. Import your Generators
-from .Generators import (
-    asciiScreenArt,
-    bible,
-    bubbles,
-    cubes,
-    goes,
-    lojong,
-    mandala_draw,
-    maps,
-    nasa,
-    peace,
-    peripheral_drift_illusion,
-    staticFavorites,
-    staticMandala,
-    wiki
-)
-
-# 1. GENERATOR REGISTRY (Map the string key directly to the Class)
-GENERATOR_REGISTRY = {
-    "ascii_screen_art": asciiScreenArt.AsciiScreenArt,
-    "bible": bible.Bible,
-    "bubbles": bubbles.Bubbles,
-    "cubes": cubes.Cubes,
-    "goes": goes.GoesGenerator,
-    "lojong": lojong.Lojong,
-    "mandala_draw": mandala_draw.MandalaDraw,
-    "maps": maps.NasaMapGenerator,
-    "nasa": nasa.Nasa,
-    "peace": peace.Peace,
-    "peripheraldriftillusion": peripheral_drift_illusion.PeripheralDriftIllusion,
-    "static_favorites": staticFavorites.StaticFavorites,
-    "static_mandala": staticMandala.StaticMandala,
-    "wiki": wiki.Wiki,
+# 1. GENERATOR REGISTRY (string key -> "module:Class", imported on first lookup
+#    so a run only pays for the generators it actually uses)
+GENERATOR_REGISTRY = LazyRegistry(__package__, {
+    "ascii_screen_art": ".Generators.asciiScreenArt:AsciiScreenArt",
+    "bible": ".Generators.bible:Bible",
+    "bubbles": ".Generators.bubbles:Bubbles",
+    "cubes": ".Generators.cubes:Cubes",
+    "goes": ".Generators.goes:GoesGenerator",
+    "lojong": ".Generators.lojong:Lojong",
+    "mandala_draw": ".Generators.mandala_draw:MandalaDraw",
+    "maps": ".Generators.maps:NasaMapGenerator",
+    "nasa": ".Generators.nasa:Nasa",
+    "peace": ".Generators.peace:Peace",
+    "peripheraldriftillusion": ".Generators.peripheral_drift_illusion:PeripheralDriftIllusion",
+    "static_favorites": ".Generators.staticFavorites:StaticFavorites",
+    "static_mandala": ".Generators.staticMandala:StaticMandala",
+    "wiki": ".Generators.wiki:Wiki",
     # kochSnowflake and hilbert excluded — linear generators, not raster
-}
+})
 
 # Explicitly Import your Raster Transformers for the Pipeline
 
 from .Transformers.transformer_dictionary import transformer_registry
-from .pipeline import ImageProcessingPipeline
+from .pipeline import ImageProcessingPipeline, list_images
+EAGER_IMPORT_MS = round((time.perf_counter() - _IMPORT_START) * 1000, 2)
+
+# (generator class name, elapsed ms, error message or None)
+GeneratorOutcome = tuple[str, float, str | None]
+
+def _run_generator_group(jobs: list[tuple[type, str]],
+                         config: dict[str, Any] | None = None,
+                         log_file: str | None = None) -> list[GeneratorOutcome]:
+    """
+    Run generators that share one output directory, in order. Executed on a
+    thread for I/O-bound groups or in a spawned process for CPU-bound ones
+    (config/log_file are only passed in the process case). A failure is
+    reported in the outcome rather than raised so the rest of the group runs.
+    """
+    if config is not None:
+        init_worker_process(config, log_file)
+    outcomes: list[GeneratorOutcome] = []
+    for GeneratorClass, out_dir in jobs:
+        start = time.perf_counter()
+        error = None
+        try:
+            GeneratorClass(out_dir).run()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        outcomes.append((GeneratorClass.__name__, round((time.perf_counter() - start) * 1000, 2), error))
+    return outcomes
 
 class ScreenArtMain(ScreenArt):
-    def __init__(self):
+    def __init__(self, workers: int | None = None, stream: bool = False):
         super().__init__("ScreenArt")
         random.seed(time.time())
 
+        # Command-line overrides, re-applied whenever the config is reloaded
+        self.cli_workers = workers
+        self.cli_stream = stream
+        # Generator pools, started on first use and kept across daemon cycles
+        self._io_pool: ThreadPoolExecutor | None = None
+        self._cpu_pool: ProcessPoolExecutor | None = None
+        self._configure()
+
+    def _configure(self):
+        """Build generators, transformers and the pipeline from the current config."""
         self.generators, self.generator_classes = self._build_generators()
 
         # Pull requested transformers from screenArt.conf, default to colormap
@@ -71,30 +97,41 @@ class ScreenArtMain(ScreenArt):
             else:
                 self.log.warning(f"Transformer '{t_key}' not found in registry. Skipping.")
 
-        # Initialize the pipeline
+        # Initialize the pipeline (stopping the previous pools, whose workers hold the old config)
+        self.shutdown_generator_pools()
+        previous: ImageProcessingPipeline | None = getattr(self, "pipeline", None)
+        if previous is not None:
+            previous.shutdown()
         self.pipeline = ImageProcessingPipeline()
+        if self.cli_workers is not None:
+            self.pipeline.workers = max(0, self.cli_workers)
         self.generator_stats: dict[str, float] = {}
 
-    # A method that builds both dicts, skipping missing config entries
-    def _build_generators(self) -> tuple[dict[str, str], dict[str, type]]:
+        # Streaming overlaps Phase 1 and Phase 2 through a bounded queue of published files
+        pipeline_config = self.config.get("pipeline", {})
+        self.stream: bool = self.cli_stream or bool(pipeline_config.get("stream", False))
+        self.stream_queue_size: int = int(pipeline_config.get("stream_queue", 16))
+        # Run network generators on threads and render generators on processes, all at once
+        self.concurrent_generators: bool = bool(pipeline_config.get("concurrent_generators", True))
+
+    # A method that builds both dicts, skipping missing config entries.
+    # Only keys are inspected here; classes stay unimported until a generator runs.
+    def _build_generators(self) -> tuple[dict[str, str], LazyRegistry]:
         paths: dict[str, str] = {}
-        classes: dict[str, type] = {}
 
-        for name, cls in GENERATOR_REGISTRY.items():
+        for name in GENERATOR_REGISTRY:
             config_key = f"{name}_out"
             if config_key in self.config["paths"]:
                 path = self.config["paths"][config_key]
-                classes[name] = cls
                 # check that the subdirectory exists
                 if os.path.isdir(os.path.expanduser(path)):
                     paths[name] = path
-                    classes[name] = cls
                 else:
                     self.log.warning(f"{path} not found")
             else:
                 self.log.warning(f"key {config_key} not found in conf")
 
-        return paths, classes
+        return paths, GENERATOR_REGISTRY.subset(paths)
 
     def erase_image_dir(self, directory: str):
         for dirpath, _, filenames in os.walk(directory):
@@ -147,30 +184,209 @@ class ScreenArtMain(ScreenArt):
         else:
             self.log.warning(f"Generator class for key '{key}' not mapped in registry.")
 
+    def _group_by_out_dir(self, keys: list[str]) -> list[list[str]]:
+        """
+        Group generator keys that share an output directory (e.g. bubbles/cubes),
+        preserving order. Generator.__init__ wipes its out_dir, so a directory is
+        only complete once every generator in its group has run.
+        """
+        groups: dict[str, list[str]] = {}
+        for key in keys:
+            groups.setdefault(os.path.normpath(self.generators[key]), []).append(key)
+        return list(groups.values())
+
+    def _generator_pools(self) -> tuple[ThreadPoolExecutor, ProcessPoolExecutor]:
+        """
+        The thread pool for I/O-bound generator jobs and the process pool for
+        the rest, started on first use and kept until shutdown_generator_pools(),
+        so daemon cycles reuse workers that already imported cv2/numba, filled
+        their JIT caches and scanned fonts. Process workers start on demand.
+        """
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=max(1, len(self.generators)),
+                                               thread_name_prefix="generator")
+        if self._cpu_pool is None:
+            # spawn, not fork: this may run beside the streaming consumer thread
+            self._cpu_pool = ProcessPoolExecutor(max_workers=max(1, min(len(self.generators), os.cpu_count() or 1)),
+                                                 mp_context=get_context("spawn"))
+        return self._io_pool, self._cpu_pool
+
+    def shutdown_generator_pools(self):
+        """Stop the generator pools (dropping jobs not yet started); the next run_generators() starts new ones."""
+        for pool in (self._io_pool, self._cpu_pool):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        self._io_pool = self._cpu_pool = None
+
+    def shutdown(self):
+        """Stop the generator pools and the pipeline."""
+        self.shutdown_generator_pools()
+        self.pipeline.shutdown()
+
+    def run_generators(self, keys: list[str], on_done: Callable[[str], None] | None = None):
+        """
+        Phase 1. Generators sharing an output directory form one job so they
+        never wipe each other's files mid-run. With concurrent_generators,
+        jobs made only of WORKLOAD == "io" generators go to a thread pool and
+        the rest to a process pool (both kept across runs; see
+        _generator_pools()), all submitted at once; otherwise they run in
+        order. on_done(out_dir) fires as each directory is finished.
+        """
+        groups = self._group_by_out_dir(keys)
+        progress = tqdm(total=len(groups), desc="Generators  ", unit="gen", ncols=80, position=0)
+
+        if not self.concurrent_generators:
+            for group in groups:
+                for key in group:
+                    self.erase_image_dir(self.generators[key])
+                    self.run_generator(key)
+                progress.update()
+                if on_done:
+                    on_done(self.generators[group[0]])
+            progress.close()
+            return
+
+        io_groups, cpu_groups = [], []
+        for group in groups:
+            jobs = [(self.generator_classes[k], self.generators[k]) for k in group if k in self.generator_classes]
+            for key in group:
+                self.erase_image_dir(self.generators[key])
+            if all(getattr(cls, "WORKLOAD", "cpu") == "io" for cls, _ in jobs):
+                io_groups.append(jobs)
+            else:
+                cpu_groups.append(jobs)
+
+        futures: dict[Future, str] = {}
+        config, log_file = self.worker_state()
+        io_pool, cpu_pool = self._generator_pools()
+        for jobs in io_groups:
+            futures[io_pool.submit(_run_generator_group, jobs)] = jobs[0][1]
+        for jobs in cpu_groups:
+            futures[cpu_pool.submit(_run_generator_group, jobs, config, log_file)] = jobs[0][1]
+
+        broken = False
+        for future in as_completed(futures):
+            out_dir = futures[future]
+            try:
+                outcomes = future.result()
+            except Exception as e:
+                self.log.error(f"Generator job for {out_dir} failed: {e}")
+                broken = broken or isinstance(e, BrokenExecutor)
+                outcomes = []
+            for name, elapsed, error in outcomes:
+                self.generator_stats[name] = elapsed
+                if error:
+                    self.log.error(f"{name} failed: {error}")
+            progress.update()
+            if on_done:
+                on_done(out_dir)
+        if broken:
+            # a worker died and took the pool with it; start fresh next run
+            self.shutdown_generator_pools()
+        progress.close()
+
+    def _produce(self, keys: list[str], items: "queue.Queue[tuple[str, str] | None]", errors: list[BaseException]):
+        """Producer thread: run generators and publish each finished directory's images."""
+        def publish(out_dir: str):
+            for filename in list_images(out_dir):
+                items.put((out_dir, filename))  # blocks while the queue is full
+
+        try:
+            self.run_generators(keys, on_done=publish)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            items.put(None)
+
+    def run_streaming(self, keys_to_process: list[str]):
+        """
+        Overlap generation and transformation: generators publish completed
+        output directories onto a bounded queue and the pipeline consumes them
+        immediately, so wall time tends to max(generate, transform).
+        """
+        items: queue.Queue[tuple[str, str] | None] = queue.Queue(maxsize=max(1, self.stream_queue_size))
+        errors: list[BaseException] = []
+        self.pipeline.start_pool(self.active_transformers)
+        producer = threading.Thread(target=self._produce, args=(keys_to_process, items, errors),
+                                    name="generators", daemon=True)
+        producer.start()
+        self.pipeline.run_stream(items, transformers=self.active_transformers)
+        producer.join()
+        if errors:
+            raise errors[0]
+
     def run(self) -> str:
         elapsed = None
         with self.timer("Total", "s") as t:
             self.trim_images(self.config["paths"]["transformers_out"], 50)
             self.trim_images(self.config["paths"]["rejected_out"], 50)
             self.trim_images(self.config["paths"]["wiki_out"], 10)
+            if self.pipeline.manifest is not None:
+                self.trim_images(self.pipeline.manifest.sources_dir,
+                                 int(self.config.get("pipeline", {}).get("manifest_sources", 500)))
 
             keys_to_process = self._get_keys_to_process()
-            
-            # Phase 1: Run Generators
-
             self.generator_stats: dict[str, float] = {}
-            for key in (_ := tqdm(keys_to_process, desc="Generators  ", unit="gen", ncols=80)):
-                self.erase_image_dir(self.generators[key])
-                self.run_generator(key)
 
-            # Phase 2: Run Transformers
-            for key in (_ := tqdm(keys_to_process, desc="Transformers", unit="tra", ncols=80)):
-                self.pipeline.run(self.generators[key], transformers=self.active_transformers)
+            if self.stream:
+                self.run_streaming(keys_to_process)
+            else:
+                # Fork the pipeline's workers before the generator pools start threads
+                self.pipeline.start_pool(self.active_transformers)
+                # Phase 1: Run Generators
+                self.run_generators(keys_to_process)
+
+                # Phase 2: Run Transformers (with workers, every directory is queued before waiting)
+                for key in (_ := tqdm(keys_to_process, desc="Transformers", unit="tra", ncols=80)):
+                    self.pipeline.run(self.generators[key], transformers=self.active_transformers, wait=False)
+                self.pipeline.wait()
 
         elapsed = str(t.elapsed)
         self.log.debug("----------------------------")
         return elapsed
 
+    def run_daemon(self, interval: float):
+        """
+        Resident mode: keep this process (imports, numba caches, fonts,
+        generator and pipeline pool workers, transformer instances) alive and
+        run a generate/transform cycle every `interval` seconds. screenArt.conf is re-read only when
+        its mtime changes. A failed cycle is logged and the loop carries on.
+        """
+        config_mtime = self.config_mtime()
+        cycle = 0
+        self.log.info(f"Daemon started: interval={interval}s")
+        try:
+            while True:
+                cycle += 1
+                mtime = self.config_mtime()
+                if mtime != config_mtime:
+                    self.log.info("screenArt.conf changed; reloading")
+                    try:
+                        self.reload_config()
+                        self._configure()
+                        config_mtime = mtime
+                    except Exception as e:
+                        self.log.error(f"Config reload failed, keeping previous config: {e}")
+
+                self.pipeline.reset_counters()
+                try:
+                    elapsed = self.run() or ""
+                    self.pipeline.wait()
+                    self.write_outcome(elapsed, True, self.pipeline.get_accepted_rejected(),
+                                       self.pipeline.get_performance_stats())
+                except Exception as e:
+                    import traceback
+                    self.log.error(f"Daemon cycle {cycle} failed: {e}")
+                    self.log.error(traceback.format_exc())
+                    self.write_outcome("0.0", False, "", None)
+
+                print(f"{cycle}: Waiting for {interval} second(s)...")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.log.info("Daemon stopped")
+        finally:
+            self.shutdown()
+
     def format_stats(self, stats: dict[str, list[float] | float], strip_word: str = "") -> list[str]:
         formatted_lines = []
         
@@ -266,6 +482,12 @@ class ScreenArtMain(ScreenArt):
             os.system("clear")
             print("\n".join(panel2_lines))
 
+    def report_import_profile(self):
+        """Print and log what each lazily imported generator/transformer module cost."""
+        lines = format_import_profile({f"{__package__}.main (startup)": EAGER_IMPORT_MS})
+        self.log.info("\n".join(lines))
+        print("\n".join(lines))
+
     def run_files(self, file_paths: list[str], count: int = 1) -> str:
         """
         Transform a list of explicit file paths, bypassing all generators.
@@ -302,28 +524,58 @@ class ScreenArtMain(ScreenArt):
 
         return str(t.elapsed)
 
+def _parse_size(value: str) -> tuple[int, int]:
+    """argparse type for --size: "3840x2160" -> (3840, 2160)."""
+    try:
+        width, height = (int(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{value}'")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive, got '{value}'")
+    return width, height
+
 def run_main():
     parser = argparse.ArgumentParser(description="Run the image processing and transformation pipeline.")
     parser.add_argument('-c', '--config', type=str, help='Override the transformation file specified in the config.')
     parser.add_argument('-t', '--test', type=str, help='Path to a CSV file for test mode.')
     parser.add_argument('-f', '--files', type=str, nargs='+', help='One or more image file paths to transform directly, bypassing generators.')
     parser.add_argument('-n', '--count', type=int, default=1, help='Number of transformed outputs to produce per input file (default: 1).')
+    parser.add_argument('-w', '--workers', type=int, help='Transform images in a pool of N worker processes (overrides "pipeline": {"workers": N}).')
+    parser.add_argument('-s', '--stream', action='store_true', help='Transform each generator\'s images while later generators are still running.')
+    parser.add_argument('-d', '--daemon', action='store_true', help='Stay resident and run a cycle every --interval seconds.')
+    parser.add_argument('-i', '--interval', type=float, default=3600, help='Seconds to sleep between daemon cycles (default: 3600).')
+    parser.add_argument('--import-profile', action='store_true', help='Report per-module import cost after the run.')
+    parser.add_argument('--replay', type=str, metavar='ID', help='Re-render a saved image from its manifest entry (id or unique prefix) and exit.')
+    parser.add_argument('--size', type=_parse_size, metavar='WxH', help='Output size for --replay (default: the source size).')
     args, _ = parser.parse_known_args()
 
-    s = ScreenArtMain()
+    s = ScreenArtMain(workers=args.workers, stream=args.stream)
+    if args.daemon:
+        s.run_daemon(args.interval)
+        sys.exit(0)
+    if args.replay:
+        out_path = s.pipeline.replay(args.replay, args.size)
+        s.pipeline.shutdown()
+        if out_path:
+            print(out_path)
+        sys.exit(0 if out_path else 1)
     try:
         if args.files:
             elapsed = s.run_files(args.files, args.count) or ""
         else:
             elapsed = s.run() or ""
+        s.shutdown()
         accepted_rejected = s.pipeline.get_accepted_rejected()
         pipeline_stats = s.pipeline.get_performance_stats()
         s.write_outcome(elapsed, True, accepted_rejected, pipeline_stats)
+        if args.import_profile:
+            s.report_import_profile()
         sys.exit(0)
     except Exception as e:
         import traceback
         s.log.error(f"An error occurred during run: {e}")
         s.log.error(traceback.format_exc())
+        s.shutdown_generator_pools()
         s.write_outcome("0.0", False, "", None)
         sys.exit(1)
 
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+from .Transformers.RasterTransformers.rasterTransformer import TransformParams
+
+MANIFEST_FILE = "manifest.jsonl"
+SOURCES_DIR = "sources"
+
+
+def _thaw(value: Any) -> Any:
+    """TransformParams values -> JSON-friendly (tuples become lists)."""
+    if isinstance(value, (tuple, list)):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _freeze(value: Any) -> Any:
+    """Inverse of _thaw: JSON lists back to the tuples sample_params() produces."""
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def params_to_json(params: TransformParams) -> dict[str, Any]:
+    return {key: _thaw(value) for key, value in params.items()}
+
+
+def params_from_json(data: dict[str, Any]) -> TransformParams:
+    return TransformParams({key: _freeze(value) for key, value in data.items()})
+
+
+class Manifest:
+    """
+    Append-only record of how every saved image was made: one JSON line per
+    image with its id, grade, output path, source hash, RNG seed and the
+    sampled chain with full parameters. Sources of passing images are kept
+    in a content-addressed store (sources/<hash><ext>) so `--replay` can
+    re-render them later, at any size.
+
+    Lines are written with a single O_APPEND write, so pool workers can
+    share the file.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.sources_dir = os.path.join(directory, SOURCES_DIR)
+        os.makedirs(self.sources_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()[:16]
+
+    def source_path(self, entry: dict[str, Any]) -> str:
+        return os.path.join(self.sources_dir, entry["source"] + entry.get("source_ext", ".png"))
+
+    def keep_source(self, data: bytes, digest: str, ext: str) -> None:
+        """Store the source bytes under their hash unless already present."""
+        path = os.path.join(self.sources_dir, digest + ext)
+        if os.path.exists(path):
+            os.utime(path)  # keep recently reused sources out of the trim
+            return
+        tmp_path = os.path.join(self.sources_dir, f".{digest}{ext}.part")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def append(self, entry: dict[str, Any]) -> None:
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def find(self, manifest_id: str) -> dict[str, Any] | None:
+        """Return the newest entry whose id starts with manifest_id."""
+        if not os.path.exists(self.path):
+            return None
+        found = None
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if str(entry.get("id", "")).startswith(manifest_id):
+                    found = entry
+        return found
@@ -1,22 +1,98 @@
 import json
+import math
 import os
+import queue
 import random
+import time
 import cv2
 import numpy as np
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed, wait as wait_futures
 from .source_type_map import SOURCE_TYPE_MAP
 
-from .screenArt import ScreenArt
-from .Transformers.RasterTransformers.rasterTransformer import RasterTransformer
+from .screenArt import ScreenArt, init_worker_process
+from .image_writer import ImageWriter
+from .image_reader import ImagePrefetcher, decode_image
+from .grader import Grader, reference_grade
+from .manifest import Manifest, params_from_json, params_to_json
+from .Transformers.RasterTransformers.rasterTransformer import RasterTransformer, TransformParams
+from .Transformers.RasterTransformers.coordinateCache import COORDINATES
+from .Transformers.RasterTransformers.colorLut import LutChain
+from .Transformers.RasterTransformers.imageContext import CONTEXTS, freeze
+
+# (grade or None if the image could not be read/saved, [(transformer_name, elapsed_ms), ...],
+#  {counter_name: increment} folded into ImageProcessingPipeline.counters)
+ImageResult = tuple[str | None, list[tuple[str, float]], dict[str, int]]
+
+PASSING_GRADES = ('A', 'B', 'C')
 
 def _source_type_from_dir(source_dir: str) -> str:
     """Derive source type key from the last component of the source directory."""
     folder = os.path.basename(os.path.normpath(source_dir)).lower()
     return SOURCE_TYPE_MAP.get(folder, "photo")
 
+# Map value for "outside the previous warp's frame" when composing a BORDER_CONSTANT
+# warp: far enough out that the final remap also lands on its constant border.
+_OUTSIDE = -1e6
+
+def _can_compose(first: RasterTransformer, transformer: RasterTransformer) -> bool:
+    """
+    A warp can be folded onto a pending run unless it has a constant border
+    and the run's final remap does not: its out-of-frame pixels must stay
+    black, which only a constant-border final resample reproduces.
+    """
+    return transformer.remap_mode()[1] != cv2.BORDER_CONSTANT or first.remap_mode()[1] == cv2.BORDER_CONSTANT
+
+def _to_dtype(img: np.ndarray, dtype: type | None, counters: dict[str, int] | None = None) -> np.ndarray:
+    """Convert between uint8 and float32 [0, 1] only if `dtype` asks for the other one."""
+    if dtype is None or img.dtype == dtype:
+        return img
+    if counters is not None:
+        counters["dtype_conversions"] = counters.get("dtype_conversions", 0) + 1
+    return freeze(RasterTransformer.to_uint8(img) if dtype == np.uint8 else RasterTransformer.to_float32(img))
+
+def _to_output(img: np.ndarray, counters: dict[str, int] | None = None) -> np.ndarray:
+    """The uint8 image that is graded and written."""
+    return _to_dtype(img, np.uint8, counters)
+
+def _encode_params(ext: str) -> list[int]:
+    if ext.lower() in ('.jpg', '.jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, 95]
+    return [cv2.IMWRITE_PNG_COMPRESSION, 3]
+
+def list_images(source_dir: str) -> list[str]:
+    """Filenames in source_dir the pipeline knows how to decode."""
+    return [f for f in os.listdir(source_dir)
+            if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+
+
+# --- Process-pool worker state ---
+# Each worker builds its own pipeline and transformer instances once, in the
+# pool initializer, so every job after the first runs with warm objects.
+_worker_pipeline: "ImageProcessingPipeline | None" = None
+_worker_transformers: dict[str, RasterTransformer] = {}
+
+def _init_worker(config, log_file, transformer_classes: list[type]) -> None:
+    global _worker_pipeline, _worker_transformers
+    init_worker_process(config, log_file)
+    # Write synchronously in workers: the pool already overlaps images, and a
+    # result must not be reported before its file exists.
+    _worker_pipeline = ImageProcessingPipeline(encoder_threads=0)
+    _worker_transformers = {cls.__name__: cls() for cls in transformer_classes}
+    for transformer in _worker_transformers.values():
+        transformer.warm_up()
+
+def _worker_ready() -> None:
+    return None
+
+def _process_in_worker(source_dir: str, filename: str, transformer_names: list[str]) -> ImageResult:
+    assert _worker_pipeline is not None, "worker pool was not initialised"
+    selected = [_worker_transformers[name] for name in transformer_names]
+    return _worker_pipeline._process_image(source_dir, filename, selected)
+
 
 class ImageProcessingPipeline(ScreenArt):
-    def __init__(self):
+    def __init__(self, encoder_threads: int | None = None):
         super().__init__("ScreenArt")
         self.out_dir    = os.path.expanduser(self.config["paths"]["transformers_out"])
         self.reject_dir = os.path.expanduser(self.config["paths"]["rejected_out"])
@@ -25,8 +101,52 @@ class ImageProcessingPipeline(ScreenArt):
         self.accepted = 0
         self.rejected = 0
         self.stats: defaultdict[str, list[float]] = defaultdict(list)
+        self.counters: defaultdict[str, int] = defaultdict(int)  # e.g. prefetch hits/stalls
         self._weight_cache: dict[str, dict[str, float]] = {}  # source_type -> {t_name: weight}
 
+        # workers > 0 sends each image's decode→chain→grade→save to a process pool
+        self.workers: int = int(self.config.get("pipeline", {}).get("workers", 0))
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_classes: tuple[type, ...] = ()
+        self._pending: list[Future] = []
+
+        # Encode+write of graded outputs happens on a write-behind thread pool
+        if encoder_threads is None:
+            encoder_threads = int(self.config.get("pipeline", {}).get("encoder_threads", 2))
+        self.writer = ImageWriter(encoder_threads, self.log)
+
+        # Serial mode decodes the next images on background threads (0 disables)
+        pipeline_config = self.config.get("pipeline", {})
+        self.prefetch_depth: int = int(pipeline_config.get("prefetch", 4))
+        self.prefetch_bytes: int = int(pipeline_config.get("prefetch_mb", 512)) * 2**20
+
+        # proxy_scale in (0, 1): grade the chain on a downscaled copy first and
+        # only re-render at full resolution when the proxy reaches C or better.
+        # proxy_audit is the share of proxy rejects rendered anyway to measure false rejects.
+        self.proxy_scale: float = float(pipeline_config.get("proxy_scale", 0.0))
+        self.proxy_audit: float = float(pipeline_config.get("proxy_audit", 0.05))
+        self._seed_rng = random.Random()
+
+        # Consecutive warps (build_map transformers) are composed into one cv2.remap
+        self.fuse_warps: bool = bool(pipeline_config.get("fuse_warps", True))
+        # Consecutive point operations (point_lut transformers) are composed into one table
+        self.fuse_luts: bool = bool(pipeline_config.get("fuse_luts", True))
+
+        # "fast" grades on one level of the gray pyramid (grader.py); "full" keeps the
+        # original full-resolution grader the fast one is calibrated against
+        self.grader: Grader | None = None
+        if pipeline_config.get("grader", "fast") == "fast":
+            self.grader = Grader(max_pixels=pipeline_config.get("grader_max_pixels"))
+
+        # Process-wide cache of coordinate grids shared by the warp transformers
+        COORDINATES.max_bytes = int(pipeline_config.get("coord_cache_mb", 256)) * 2**20
+
+        # Every saved image gets a manifest line (seed + full chain) so --replay can re-render it
+        self.manifest: Manifest | None = None
+        if pipeline_config.get("manifest", True):
+            manifest_dir = self.config["paths"].get("manifest_dir") or os.path.join(os.path.dirname(self.out_dir), "Manifest")
+            self.manifest = Manifest(os.path.expanduser(manifest_dir))
+
     def _get_transformer_weights(self, source_type: str) -> dict[str, float]:
         """
         Return {transformer_name: weight} for the given source type.
@@ -92,9 +212,13 @@ class ImageProcessingPipeline(ScreenArt):
 
         return selected
 
-    def run(self, source_dir: str, transformers: list[RasterTransformer]):
-        image_files = [f for f in os.listdir(source_dir)
-                       if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+    def run(self, source_dir: str, transformers: list[RasterTransformer], wait: bool = True):
+        """
+        Transform every image in source_dir. With workers > 0 the images are
+        submitted to the process pool; pass wait=False to queue several
+        directories back to back and collect them all with wait().
+        """
+        image_files = list_images(source_dir)
 
         if not image_files:
             self.log.debug(f"No images found in {source_dir} to process.")
@@ -103,100 +227,348 @@ class ImageProcessingPipeline(ScreenArt):
         source_type = _source_type_from_dir(source_dir)
         self.log.debug(f"Pipeline source_type={source_type} for {source_dir}")
 
-        for filename in image_files:
+        if self.workers > 0:
+            pool = self._get_pool(transformers)
+            for filename in image_files:
+                selected = self._sample_transformers(transformers, source_type)
+                names = [t.__class__.__name__ for t in selected]
+                self._pending.append(pool.submit(_process_in_worker, source_dir, filename, names))
+            if wait:
+                self.wait()
+            return
+
+        if self.prefetch_depth <= 0:
+            for filename in image_files:
+                selected = self._sample_transformers(transformers, source_type)
+                self._record(*self._process_image(source_dir, filename, selected))
+            return
+
+        reader = ImagePrefetcher([os.path.join(source_dir, f) for f in image_files],
+                                 depth=self.prefetch_depth, max_bytes=self.prefetch_bytes)
+        for path, img in reader:
             selected = self._sample_transformers(transformers, source_type)
+            self._record(*self._process_image(source_dir, os.path.basename(path), selected, img))
+        self.counters["prefetch_hits"] += reader.hits
+        self.counters["prefetch_stalls"] += reader.stalls
 
-            input_path = os.path.join(source_dir, filename)
-            img_bgr = cv2.imread(input_path)
-            if img_bgr is None:
-                self.log.error(f"Failed to read image: {input_path}")
+    def run_stream(self, items: "queue.Queue[tuple[str, str] | None]", transformers: list[RasterTransformer]):
+        """
+        Consume (source_dir, filename) items until a None sentinel arrives,
+        transforming each one as soon as it is published. With workers > 0 at
+        most 2×workers images are in flight, so a slow pool stops draining the
+        queue and its bound pushes back on the producer.
+        """
+        max_in_flight = max(1, 2 * self.workers)
+        while (item := items.get()) is not None:
+            source_dir, filename = item
+            selected = self._sample_transformers(transformers, _source_type_from_dir(source_dir))
+
+            if self.workers <= 0:
+                self._record(*self._process_image(source_dir, filename, selected))
                 continue
 
-            img_f32 = img_bgr.astype(np.float32) / 255.0
+            if len(self._pending) >= max_in_flight:
+                done, not_done = wait_futures(self._pending, return_when=FIRST_COMPLETED)
+                self._pending = list(not_done)
+                for future in done:
+                    self._collect(future)
+
+            names = [t.__class__.__name__ for t in selected]
+            self._pending.append(self._get_pool(transformers).submit(_process_in_worker, source_dir, filename, names))
+        self.wait()
+
+    def wait(self):
+        """Collect results of every image submitted to the pool and fold them into the counters."""
+        pending, self._pending = self._pending, []
+        for future in as_completed(pending):
+            self._collect(future)
+
+    def _collect(self, future: Future):
+        try:
+            self._record(*future.result())
+        except Exception as e:
+            self.log.error(f"Worker failed: {e}")
+
+    def _get_pool(self, transformers: list[RasterTransformer]) -> ProcessPoolExecutor:
+        classes = tuple(t.__class__ for t in transformers)
+        if self._pool is not None and classes != self._pool_classes:
+            self.shutdown()
+        if self._pool is None:
+            config, log_file = self.worker_state()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(config, log_file, list(classes)),
+            )
+            self._pool_classes = classes
+            self.log.info(f"Started pipeline pool with {self.workers} workers")
+        return self._pool
+
+    def start_pool(self, transformers: list[RasterTransformer]):
+        """
+        Launch and initialise every worker now. Call before starting other
+        threads so forked workers never inherit a lock held mid-operation.
+        """
+        if self.workers <= 0:
+            return
+        pool = self._get_pool(transformers)
+        wait_futures([pool.submit(_worker_ready) for _ in range(self.workers)])
+
+    def shutdown(self):
+        """Drain outstanding work and stop the worker pool and encoder threads."""
+        self.wait()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.writer.shutdown()
+
+    def _record(self, grade: str | None, timings: list[tuple[str, float]], counters: dict[str, int]):
+        for t_name, elapsed in timings:
+            self.stats[t_name].append(elapsed)
+        for name, value in counters.items():
+            self.counters[name] += value
+        if grade is None:
+            return
+        if grade in PASSING_GRADES:
+            self.accepted += 1
+        else:
+            self.rejected += 1
 
-            for transformer in selected:
-                t_name = transformer.__class__.__name__
+    def _process_image(self, source_dir: str, filename: str,
+                       selected: list[RasterTransformer],
+                       img: np.ndarray | None = None) -> ImageResult:
+        """
+        Decode one image (unless a prefetched img is passed), run the
+        sampled chain, then grade and save it. In proxy mode the chain first
+        runs on a downscaled copy with the same parameters and noise streams;
+        a proxy graded below C is saved to the reject dir as is, skipping the
+        full-resolution pass. Chains with a transformer that is not
+        PROXY_SAFE go straight to the full-resolution pass. Image-context hits and misses for the whole
+        image are added to its counters.
+        """
+        hits, handed, misses = CONTEXTS.hits, CONTEXTS.handed, CONTEXTS.misses
+        grade, timings, counters = self._render_image(source_dir, filename, selected, img)
+        counters["context_hits"] = CONTEXTS.hits - hits
+        counters["context_handed"] = CONTEXTS.handed - handed
+        counters["context_misses"] = CONTEXTS.misses - misses
+        return grade, timings, counters
+
+    def _render_image(self, source_dir: str, filename: str,
+                      selected: list[RasterTransformer],
+                      img: np.ndarray | None) -> ImageResult:
+        timings: list[tuple[str, float]] = []
+        counters: dict[str, int] = {}
+
+        if img is None:
+            input_path = os.path.join(source_dir, filename)
+            img = decode_image(input_path)
+            if img is None:
+                self.log.error(f"Failed to read image: {input_path}")
+                return None, timings, counters
+        # frozen images keep their derived planes (ImageContext) for the whole chain
+        freeze(img)
+
+        seed = self._seed_rng.getrandbits(48)
+        chain = self._sample_chain(selected, seed, img.shape[:2])
+        entry = self._manifest_entry(os.path.join(source_dir, filename), img, seed, chain)
+        proxy_grade = None
+        if 0.0 < self.proxy_scale < 1.0 and not all(t.PROXY_SAFE for t, _ in chain):
+            counters["proxy_skipped"] = 1
+        elif 0.0 < self.proxy_scale < 1.0:
+            h, w = img.shape[:2]
+            size = (max(1, round(w * self.proxy_scale)), max(1, round(h * self.proxy_scale)))
+            with self.timer() as t:
+                proxy = CONTEXTS.of(img).downscaled(size, cv2.INTER_AREA)
+                proxy, _, applied = self._run_chain(proxy, chain, seed, scale=self.proxy_scale, counters=counters)
+                proxy_out = _to_output(proxy, counters)
+                proxy_grade = self._calculate_grade(proxy_out)
+            timings.append(("ProxyPass", t.elapsed))
+
+            if proxy_grade not in PASSING_GRADES and random.random() >= self.proxy_audit:
+                counters["proxy_rejected"] = 1
+                self._log_applied(applied)
                 try:
-                    with self.timer(custom_name=t_name) as t:
-                        img_f32 = transformer.run(img_f32)
-                    self.log.info(f'"{t_name}","{transformer.get_image_metadata()}"')
+                    if entry is not None:
+                        entry["scale"] = self.proxy_scale
+                    return self._evaluate_and_save(proxy_out, filename, source_dir, grade=proxy_grade,
+                                                   entry=entry), timings, counters
                 except Exception as e:
-                    self.log.error(f"{t_name}: {e}")
-                    continue
-                self.stats[t_name].append(t.elapsed)
+                    self.log.error(f"Failed to save image: {e}")
+                    return None, timings, counters
+
+        img, chain_timings, applied = self._run_chain(img, chain, seed, counters=counters)
+        timings.extend(chain_timings)
+        self._log_applied(applied)
+
+        img_out = _to_output(img, counters)
+        try:
+            grade = self._evaluate_and_save(img_out, filename, source_dir, entry=entry)
+        except Exception as e:
+            self.log.error(f"Failed to save image: {e}")
+            return None, timings, counters
+
+        if proxy_grade is not None:
+            counters["proxy_checked"] = 1
+            counters["proxy_agree"] = int(proxy_grade == grade)
+            counters["proxy_false_pass"] = int(proxy_grade in PASSING_GRADES and grade not in PASSING_GRADES)
+            counters["proxy_false_reject"] = int(proxy_grade not in PASSING_GRADES and grade in PASSING_GRADES)
+        return grade, timings, counters
+
+    def _manifest_entry(self, input_path: str, img: np.ndarray, seed: int,
+                        chain: list[tuple[RasterTransformer, TransformParams]]) -> dict | None:
+        """Everything needed to re-render this image; completed and written by _evaluate_and_save."""
+        if self.manifest is None:
+            return None
+        try:
+            with open(input_path, "rb") as f:
+                source_bytes = f.read()
+        except OSError as e:
+            self.log.warning(f"Manifest: could not read {input_path}: {e}")
+            return None
+        h, w = img.shape[:2]
+        return {
+            "id": f"{seed:012x}",
+            "source": Manifest.hash_bytes(source_bytes),
+            "source_name": os.path.basename(input_path),
+            "source_ext": os.path.splitext(input_path)[1].lower() or ".png",
+            "size": [w, h],
+            "seed": seed,
+            "scale": 1.0,
+            "chain": [{"t": t.__class__.__name__, "params": params_to_json(params)} for t, params in chain],
+            "_bytes": source_bytes,
+        }
+
+    def _sample_chain(self, selected: list[RasterTransformer], seed: int,
+                      size: tuple[int, int]) -> list[tuple[RasterTransformer, TransformParams]]:
+        """
+        Draw every transformer's parameters up front from a generator keyed on
+        (seed, step), so the proxy and full passes share one set. Steps that
+        draw frame-sized noise also get the full-resolution (rows, cols)
+        `size` as "noise_size", so both passes, and any replay, draw the same
+        noise. A transformer whose sampling fails is logged and dropped from
+        the chain.
+        """
+        chain: list[tuple[RasterTransformer, TransformParams]] = []
+        for step, transformer in enumerate(selected):
+            try:
+                params = transformer.sample_params(np.random.default_rng([seed, step]))
+                chain.append((transformer, transformer.with_noise_size(params, size)))
+            except Exception as e:
+                self.log.error(f"{transformer.__class__.__name__}: {e}")
+        return chain
 
-            img_out = np.clip(img_f32 * 255.0, 0, 255).astype(np.uint8)
+    def _run_chain(self, img: np.ndarray, chain: list[tuple[RasterTransformer, TransformParams]],
+                   seed: int, scale: float = 1.0,
+                   counters: dict[str, int] | None = None) -> tuple[np.ndarray, list[tuple[str, float]], list[tuple[str, str]]]:
+        """
+        Apply a sampled chain. Each step gets a fresh generator keyed on
+        (seed, step, 1) for its per-pixel noise, so repeated passes draw the
+        same streams and no global RNG state is touched. With fuse_warps,
+        runs of consecutive warps are composed into one map and resampled
+        once (timed as "WarpRemap"); `counters["warps_fused"]` counts the
+        remaps saved; coordinate-cache hits and misses are added there too.
+        With fuse_luts, runs of point operations are likewise composed into
+        one colour table and applied once ("LutApply"; `luts_fused`), and
+        the run hands the gray planes it knows of its result on to the
+        result's ImageContext (LutChain.hand_on()).
+        The image is converted only when the next transformer's NATIVE_DTYPE
+        differs from the current one; `dtype_conversions` counts those and
+        `dtype_baseline` what converting around every uint8 transformer (plus
+        float32 entry and uint8 exit) would have cost.
+        Returns the image, per-transformer timings and the (name, metadata)
+        of every transformer that ran.
+        """
+        coord_hits, coord_misses = COORDINATES.hits, COORDINATES.misses
+        if counters is not None:
+            counters["dtype_baseline"] = counters.get("dtype_baseline", 0) + 2
+        timings: list[tuple[str, float]] = []
+        applied: list[tuple[str, str]] = []
+        # (first warp of the run, composed map_x, composed map_y), not yet applied
+        pending: tuple[RasterTransformer, np.ndarray, np.ndarray] | None = None
+        # point operations composed over the image as it was before the run, not yet applied
+        lut_chain: LutChain | None = None
+
+        def flush(img: np.ndarray) -> np.ndarray:
+            nonlocal pending, lut_chain
+            if lut_chain is not None:
+                with self.timer(custom_name="LutApply") as t:
+                    img = freeze(lut_chain.apply())
+                    lut_chain.hand_on(CONTEXTS.of(img))
+                timings.append(("LutApply", t.elapsed))
+                lut_chain = None
+            if pending is None:
+                return img
+            first, map_x, map_y = pending
+            pending = None
+            with self.timer(custom_name="WarpRemap") as t:
+                img = freeze(first.remap(img, map_x, map_y))
+            timings.append(("WarpRemap", t.elapsed))
+            return img
+
+        for step, (transformer, params) in enumerate(chain):
+            t_name = transformer.__class__.__name__
+            rng = np.random.default_rng([seed, step, 1])
             try:
-                self._evaluate_and_save(img_out, filename, source_dir)
+                if self.fuse_warps and transformer.is_warp:
+                    with self.timer(custom_name=t_name) as t:
+                        map_x, map_y = transformer.warp_map(img.shape[:2], params, rng, scale)
+                        if pending is not None and _can_compose(pending[0], transformer):
+                            # out(p) = prev(map_b(p)) = src(map_a(map_b(p))): sample map_a at map_b
+                            first, prev_x, prev_y = pending
+                            interpolation, border = transformer.remap_mode()
+                            pending = (first,
+                                       cv2.remap(prev_x, map_x, map_y, interpolation, borderMode=border, borderValue=_OUTSIDE),
+                                       cv2.remap(prev_y, map_x, map_y, interpolation, borderMode=border, borderValue=_OUTSIDE))
+                            if counters is not None:
+                                counters["warps_fused"] = counters.get("warps_fused", 0) + 1
+                        else:
+                            img = flush(img)
+                            pending = (transformer, map_x, map_y)
+                elif self.fuse_luts and transformer.is_point_op:
+                    if lut_chain is None:
+                        lut_chain = LutChain(_to_dtype(flush(img), np.uint8, counters))
+                        img = lut_chain.img
+                    with self.timer(custom_name=t_name) as t:
+                        lut_chain.append(transformer.point_lut(params, lut_chain))
+                    if counters is not None:
+                        counters["dtype_baseline"] = counters.get("dtype_baseline", 0) + 2
+                        if lut_chain.stages > 1:
+                            counters["luts_fused"] = counters.get("luts_fused", 0) + 1
+                else:
+                    img = _to_dtype(flush(img), transformer.NATIVE_DTYPE, counters)
+                    with self.timer(custom_name=t_name) as t:
+                        img = freeze(transformer.apply(img, params, rng, scale=scale))
+                    if counters is not None and transformer.NATIVE_DTYPE == np.uint8:
+                        counters["dtype_baseline"] = counters.get("dtype_baseline", 0) + 2
+                applied.append((t_name, transformer.format_metadata(transformer.describe(params))))
             except Exception as e:
-                self.log.error(f"Failed to save image: {e}")
+                self.log.error(f"{t_name}: {e}")
+                continue
+            timings.append((t_name, t.elapsed))
+        img = flush(img)
+        if counters is not None:
+            counters["coord_hits"] = counters.get("coord_hits", 0) + COORDINATES.hits - coord_hits
+            counters["coord_misses"] = counters.get("coord_misses", 0) + COORDINATES.misses - coord_misses
+        return img, timings, applied
+
+    def _log_applied(self, applied: list[tuple[str, str]]):
+        for t_name, metadata in applied:
+            self.log.info(f'"{t_name}","{metadata}"')
 
     def _calculate_grade(self, img_np: np.ndarray) -> str:
         """
         Scores image quality as a composite of sharpness, contrast, highlights,
-        hue diversity, and uniform region detection.
+        hue diversity, and uniform region detection (see grader.py).
         Returns a grade letter: A, B, C, or F.
         """
-        gray    = cv2.cvtColor(img_np, cv2.COLOR_BGR2GRAY).astype(np.float32)
-        lap_var = float(cv2.Laplacian(gray, cv2.CV_32F).var())
-        mean    = float(gray.mean())
-        std_dev = float(gray.std())
-
-        PEAK = 150.0
-        if lap_var < 2.0:
-            sharpness = 0.0
-        elif lap_var <= PEAK:
-            sharpness = ((lap_var - 2.0) / (PEAK - 2.0)) ** 0.7
-        else:
-            log_ratio = np.log(lap_var / PEAK)
-            sharpness = float(np.exp(-0.5 * (log_ratio / 3.0) ** 2))
-
-        contrast = float(np.clip(std_dev / 50.0, 0.0, 1.0))
-
-        if std_dev < 1:
-            hi_frac = 1.0 if mean > 220 else 0.0
-        else:
-            hi_frac = float(0.5 * (1.0 - float(np.tanh((220.0 - mean) / (std_dev * 1.4142)))))
-        if hi_frac < 0.15:
-            hi_penalty = 1.0
-        elif hi_frac > 0.55:
-            hi_penalty = 0.55
-        else:
-            hi_penalty = 1.0 - (hi_frac - 0.15) / 0.40 * 0.45
-
-        is_clipped = (mean < 15 and std_dev < 20) or (mean > 240 and std_dev < 20)
-        clip_mult  = 0.35 if is_clipped else 1.0
-
-        score = (sharpness * 0.60 + contrast * 0.40) * clip_mult * hi_penalty
-
-        if std_dev < 25:
-            score = min(score, 0.49)
-
-        # --- Hue diversity penalty ---
-        # Fires when >80% of vividly-saturated pixels (sat>80) share a single
-        # 5° hue bin AND hue std-dev is <12 (truly monochromatic, not biased).
-        # Requires 15% vivid pixels to avoid greyscale false positives.
-        # Caps at B — catches solid-colour blobs without penalising gradients,
-        # dark space images, or naturally hue-biased photos and auroras.
-        small = cv2.resize(img_np, (320, 213))
-        hsv   = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
-        vivid_mask  = hsv[:, :, 1] > 80
-        vivid_count = int(vivid_mask.sum())
-        if vivid_count >= (320 * 213 * 0.15):
-            hues = hsv[:, :, 0][vivid_mask]
-            counts, _ = np.histogram(hues, bins=36, range=(0, 180))
-            dominant_frac = float(counts.max()) / vivid_count
-            hue_std = float(hues.std())
-            if dominant_frac > 0.80 and hue_std < 12.0:
-                score = min(score, 0.49)  # cap at B
-
-        if score >= 0.65:   return "A"
-        elif score >= 0.50: return "B"
-        elif score >= 0.35: return "C"
-        else:               return "F"
-
-    def _evaluate_and_save(self, img_np: np.ndarray, filename: str, source_dir: str):
-        grade = self._calculate_grade(img_np)
+        if self.grader is None:
+            return reference_grade(img_np)
+        return self.grader.grade(img_np)
+
+    def _evaluate_and_save(self, img_np: np.ndarray, filename: str, source_dir: str,
+                           grade: str | None = None, entry: dict | None = None) -> str:
+        if grade is None:
+            grade = self._calculate_grade(img_np)
         stem, ext = os.path.splitext(filename)
         if not ext:
             ext = '.png'
@@ -217,26 +589,120 @@ class ImageProcessingPipeline(ScreenArt):
 
         mode_tag = f"-{layout_mode}" if layout_mode else ""
         graded_filename = f"{stem}-{grade}{mode_tag}{ext}"
-        uid = f"_{random.randbytes(2).hex()}"                      # e.g. _3f9a
+        uid = f"_{entry['id']}" if entry else f"_{random.randbytes(2).hex()}"  # manifest id, e.g. _0c41d2f39a7e
         graded_filename = f"{stem}-{grade}{mode_tag}{uid}{ext}"
 
-        if grade in ('A', 'B', 'C'):
+        if grade in PASSING_GRADES:
             final_path = os.path.join(self.out_dir, graded_filename)
-            self.accepted += 1
         else:
             final_path = os.path.join(self.reject_dir, graded_filename)
-            self.rejected += 1
 
-        if ext.lower() in ('.jpg', '.jpeg'):
-            encode_params = [cv2.IMWRITE_JPEG_QUALITY, 95]
-        else:
-            encode_params = [cv2.IMWRITE_PNG_COMPRESSION, 3]
-
-        cv2.imwrite(final_path, img_np, encode_params)
+        self.writer.submit(final_path, img_np, _encode_params(ext))
         self.log.info(f"[Grade: {grade}] Saved to: {final_path}")
+        if entry is not None:
+            self._write_manifest(entry, grade, final_path)
+        return grade
+
+    def _write_manifest(self, entry: dict, grade: str, final_path: str):
+        """Append the entry; passing images also keep their source for --replay."""
+        source_bytes = entry.pop("_bytes")
+        entry.update(grade=grade, file=final_path, time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        try:
+            if grade in PASSING_GRADES:
+                self.manifest.keep_source(source_bytes, entry["source"], entry["source_ext"])
+            self.manifest.append(entry)
+        except OSError as e:
+            self.log.error(f"Manifest: could not record {entry['id']}: {e}")
+
+    def replay(self, manifest_id: str, size: tuple[int, int] | None = None) -> str | None:
+        """
+        Re-render a manifest entry from its kept source with the recorded seed
+        and parameters, optionally at another size (W, H). Pixel-unit
+        parameters are scaled by the size change, and frame noise is drawn
+        for the recorded noise_size, so it matches the original render.
+        Returns the output path.
+        """
+        from .Transformers.transformer_dictionary import transformer_registry
+
+        if self.manifest is None:
+            self.log.error("Replay: the manifest is disabled (\"pipeline\": {\"manifest\": false})")
+            return None
+        entry = self.manifest.find(manifest_id)
+        if entry is None:
+            self.log.error(f"Replay: no manifest entry for '{manifest_id}' in {self.manifest.path}")
+            return None
+
+        source_path = self.manifest.source_path(entry)
+        img = decode_image(source_path)
+        if img is None:
+            self.log.error(f"Replay: source {source_path} is gone (only passing grades keep theirs, and old ones are trimmed)")
+            return None
+
+        chain: list[tuple[RasterTransformer, TransformParams]] = []
+        for step in entry["chain"]:
+            TransformerClass = transformer_registry.get(step["t"].lower().replace("transformer", ""))
+            if TransformerClass is None:
+                self.log.error(f"Replay: transformer '{step['t']}' is not in the registry")
+                return None
+            chain.append((TransformerClass(), params_from_json(step["params"])))
+
+        h, w = img.shape[:2]
+        if size is None:
+            size = (w, h)
+        width, height = size
+        if (width, height) != (w, h):
+            upscale = width * height > w * h
+            img = cv2.resize(img, (width, height), interpolation=cv2.INTER_CUBIC if upscale else cv2.INTER_AREA)
+        scale = math.sqrt((width / w) * (height / h))
+
+        img, timings, applied = self._run_chain(freeze(img), chain, entry["seed"], scale=scale)
+        for t_name, elapsed in timings:
+            self.stats[t_name].append(elapsed)
+        self._log_applied(applied)
+        img_out = _to_output(img)
+        grade = self._calculate_grade(img_out)
+
+        replay_dir = os.path.expanduser(self.config["paths"].get("replay_out", self.out_dir))
+        os.makedirs(replay_dir, exist_ok=True)
+        stem = os.path.splitext(entry["source_name"])[0]
+        ext = os.path.splitext(entry.get("file", ""))[1] or entry["source_ext"]
+        out_path = os.path.join(replay_dir, f"{stem}_{entry['id']}_{width}x{height}{ext}")
+        self.writer.submit(out_path, img_out, _encode_params(ext))
+        self.writer.flush()
+        self.log.info(f"[Replay {entry['id']}] Grade {grade} (originally {entry.get('grade')}) at {width}x{height}: {out_path}")
+        return out_path
+
+    def reset_counters(self):
+        """Start a fresh tally for the next run while keeping the worker pool warm."""
+        self.accepted = 0
+        self.rejected = 0
+        self.stats = defaultdict(list)
+        self.counters = defaultdict(int)
 
     def get_accepted_rejected(self) -> str:
-        return f"Accepted: {self.accepted}\nRejected: {self.rejected}"
+        self.writer.flush()  # every counted image is on disk before it is reported
+        lines = [f"Accepted: {self.accepted}", f"Rejected: {self.rejected}"]
+        if self.counters.get("prefetch_hits", 0) + self.counters.get("prefetch_stalls", 0):
+            lines.append(f"Prefetch: {self.counters['prefetch_hits']} hit / {self.counters['prefetch_stalls']} stall")
+        if self.counters.get("proxy_checked", 0) + self.counters.get("proxy_rejected", 0) + self.counters.get("proxy_skipped", 0):
+            lines.append(f"Proxy: {self.counters['proxy_rejected']} gated, "
+                         f"{self.counters['proxy_agree']}/{self.counters['proxy_checked']} agree "
+                         f"({self.counters['proxy_false_pass']} false pass, "
+                         f"{self.counters['proxy_false_reject']} false reject), "
+                         f"{self.counters['proxy_skipped']} skipped")
+        if self.counters.get("warps_fused", 0):
+            lines.append(f"Warp fusion: {self.counters['warps_fused']} remaps saved")
+        if self.counters.get("luts_fused", 0):
+            lines.append(f"LUT fusion: {self.counters['luts_fused']} passes saved")
+        if self.counters.get("dtype_baseline", 0):
+            done = self.counters.get("dtype_conversions", 0)
+            lines.append(f"Dtype conversions: {done} done, {self.counters['dtype_baseline'] - done} avoided")
+        if self.counters.get("coord_hits", 0) + self.counters.get("coord_misses", 0):
+            lines.append(f"Coordinate cache: {self.counters['coord_hits']} hit / {self.counters['coord_misses']} miss")
+        if self.counters.get("context_hits", 0) + self.counters.get("context_misses", 0):
+            lines.append(f"Image context: {self.counters['context_hits']} hit / "
+                         f"{self.counters['context_handed']} handed on / {self.counters['context_misses']} miss")
+        return "\n".join(lines)
 
     def get_performance_stats(self) -> dict[str, list[float]]:
         return self.stats
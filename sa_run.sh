@@ -3,20 +3,36 @@
 # --- 1. Set Defaults ---
 num_times=""
 sleep_seconds=3600
+daemon=""
 
 # --- 2. Parse Command Line Arguments ---
-# n: (num_times), s: (sleep_seconds)
-while getopts "n:s:" opt; do
+# n: (num_times), s: (sleep_seconds), d: (resident daemon, one warm process)
+while getopts "n:s:d" opt; do
 	case ${opt} in
 		n) num_times=${OPTARG} ;;
 		s) sleep_seconds=${OPTARG} ;;
-		*) echo "Usage: $0 [-n num_times] [-s sleep_seconds]" >&2
+		d) daemon=1 ;;
+		*) echo "Usage: $0 [-n num_times] [-s sleep_seconds] [-d]" >&2
 			exit 1 ;;
 	esac
 done
 
 rm ./logs/*.log
 
+if [ -n "${daemon}" ]; then
+	if [[ "$OSTYPE" == "linux"* ]]; then
+		SCRIPTS=~/mac/Scripts
+		VENV=~/.venvs/screenart
+	else
+		SCRIPTS=~/Scripts
+		VENV=$SCRIPTS/.venv
+	fi
+	echo "Starting resident ScreenArt daemon with ${sleep_seconds}s interval..."
+	cd $SCRIPTS
+	source $VENV/bin/activate
+	exec python3 -m ScreenArt.main --daemon --interval "${sleep_seconds}"
+fi
+
 if [ -z "${num_times}" ]; then
 	echo "Starting ScreenArt loop infinitely with ${sleep_seconds}s sleep..."
 else
@@ -7,8 +7,12 @@ from datetime import datetime
 from abc import ABC, abstractmethod
 from typing import Any, Optional
 import time
+import random
+import numpy as np
 from contextlib import contextmanager
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+
 class TimeResult:
     def __init__(self):
         self.elapsed = 0.0
@@ -17,6 +21,8 @@ class ScreenArt(ABC):
     # Class-level singleton storage for the configuration
     _global_config: Optional[dict[str, Any]] = None
     _logging_configured: bool = False  # add alongside _global_config
+    _log_file: Optional[str] = None     # shared with pool workers so they log to the same file
+    _config_path: Optional[str] = None  # remembered so a long-lived process can reload it
 
     def __init__(self, project_name="ScreenArt"):
         self.project_name = project_name
@@ -59,13 +65,14 @@ class ScreenArt(ABC):
 
         logging.basicConfig(
             level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
+            format=LOG_FORMAT,
             handlers=[
                 logging.FileHandler(self.log_file),
             ]
         )
         self.log = logging.getLogger(self.project_name)
         ScreenArt._logging_configured = True
+        ScreenArt._log_file = self.log_file
         self.log.debug(f"ScreenArt superclass initialized on {self.os_type}. Paths expanded.")
 
     def _setup_config(self) -> dict[str, Any]:
@@ -78,6 +85,7 @@ class ScreenArt(ABC):
                 config_path = sys.argv[i + 1]
                 break
 
+        ScreenArt._config_path = config_path
         try:
             with open(config_path, 'r') as f:
                 return json.load(f)
@@ -86,6 +94,24 @@ class ScreenArt(ABC):
             print(f"CRITICAL: Could not load config at {config_path}: {e}")
             sys.exit(1)
 
+    def config_mtime(self) -> float:
+        """Modification time of the loaded config file, or 0.0 if it cannot be stat'ed."""
+        try:
+            return os.path.getmtime(ScreenArt._config_path or "")
+        except OSError:
+            return 0.0
+
+    def reload_config(self):
+        """
+        Re-read the config file into the shared singleton dict in place, so
+        every ScreenArt instance holding self.config sees the new values.
+        """
+        with open(ScreenArt._config_path or "", 'r') as f:
+            fresh = json.load(f)
+        self.config.clear()
+        self.config.update(fresh)
+        self._expand_and_ensure_paths()
+
     def _expand_and_ensure_paths(self):
         """Pulls paths from the config, expands tildes, handles OS quirks, and creates directories."""
         raw_paths = self.config.get("paths", {})
@@ -145,6 +171,11 @@ class ScreenArt(ABC):
 #        log_name = custom_name or self.__class__.__name__
 #        self.log.info(f"{log_name}: {display}")
 
+    @staticmethod
+    def worker_state() -> tuple[Optional[dict[str, Any]], Optional[str]]:
+        """Return (config, log_file) for handing to init_worker_process() in a pool initializer."""
+        return ScreenArt._global_config, ScreenArt._log_file
+
     @abstractmethod
     def run(self, *args, **kwargs) -> Any:
         """
@@ -153,3 +184,26 @@ class ScreenArt(ABC):
         to share this exact same contract.
         """
         pass
+
+
+def init_worker_process(config: Optional[dict[str, Any]], log_file: Optional[str]) -> None:
+    """
+    Pool initializer: adopt the parent's already-expanded config and append to
+    its log file instead of loading screenArt.conf and starting a new log.
+    Forked workers inherit the parent's RNG state, random and np.random
+    alike, so reseed both to keep generator and transformer noise
+    independent across workers.
+    """
+    if config is not None:
+        ScreenArt._global_config = config
+    if log_file and not ScreenArt._logging_configured:
+        logging.basicConfig(
+            level=logging.INFO,
+            format=LOG_FORMAT,
+            handlers=[logging.FileHandler(log_file)],
+            force=True,
+        )
+        ScreenArt._logging_configured = True
+        ScreenArt._log_file = log_file
+    random.seed()
+    np.random.seed()
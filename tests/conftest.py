@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+# The code imports itself as the ScreenArt package (python -m ScreenArt.main).
+# Register this checkout under that name, whatever its directory is called,
+# so the tests run from the repo root without PYTHONPATH set by hand.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "ScreenArt" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "ScreenArt", os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["ScreenArt"] = package
+    spec.loader.exec_module(package)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+numba = pytest.importorskip("numba")
+
+from ScreenArt.Transformers.RasterTransformers import fractalWarpTransformer as fractal
+
+
+@numba.njit
+def _atan2_all(y, x, out):
+    for i in range(len(x)):
+        out[i] = fractal._atan2f(y[i], x[i])
+
+
+@numba.njit
+def _sincos_all(d, sin, cos):
+    for i in range(len(d)):
+        sin[i], cos[i] = fractal._sincosf(d[i])
+
+
+def test_atan2f_matches_numpy_over_every_angle_and_magnitude():
+    rng = np.random.default_rng(0)
+    angle = rng.uniform(-np.pi, np.pi, 1_000_000)
+    magnitude = 10.0 ** rng.uniform(-30, 30, angle.size)
+    x = (magnitude * np.cos(angle)).astype(np.float32)
+    y = (magnitude * np.sin(angle)).astype(np.float32)
+    # axes, diagonals and signed zeros
+    edges = np.array([0.0, -0.0, 1.0, -1.0, 1e-30, -1e30], dtype=np.float32)
+    x = np.concatenate([x, np.repeat(edges, edges.size)])
+    y = np.concatenate([y, np.tile(edges, edges.size)])
+    keep = ~((x == 0) & (y == 0))  # atan2(±0, -0) is π for numpy; the kernel never needs it
+    x, y = x[keep], y[keep]
+
+    out = np.empty_like(x)
+    _atan2_all(y, x, out)
+    reference = np.arctan2(y.astype(np.float64), x.astype(np.float64))
+    ulp = np.spacing(np.abs(reference).astype(np.float32)).astype(np.float64)
+    assert np.max(np.abs(out - reference) / ulp) <= 3.0
+
+
+@pytest.mark.parametrize("limit", [np.pi, 10.0, 1000.0])
+def test_sincosf_matches_numpy(limit):
+    d = np.random.default_rng(1).uniform(-limit, limit, 1_000_000).astype(np.float32)
+    sin, cos = np.empty_like(d), np.empty_like(d)
+    _sincos_all(d, sin, cos)
+    assert np.max(np.abs(sin - np.sin(d.astype(np.float64)))) < 1e-7
+    assert np.max(np.abs(cos - np.cos(d.astype(np.float64)))) < 1e-7